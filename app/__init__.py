@@ -1,6 +1,6 @@
 from flask import Flask
 from .config import Config
-from .extensions import db, migrate , jwt
+from .extensions import db, migrate , jwt, session_cache, roster_cache, checkin_journal, revocation_checker, course_stats, semester_stats, password_hasher, import_jobs
 from .models import *  # or explicitly import all models
 
 
@@ -11,6 +11,14 @@ def create_app():
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
+    session_cache.init_app(app)
+    roster_cache.init_app(app)
+    checkin_journal.init_app(app)
+    revocation_checker.init_app(app)
+    course_stats.init_app(app)
+    semester_stats.init_app(app)
+    password_hasher.init_app(app)
+    import_jobs.init_app(app)
 
     from flask_jwt_extended import JWTManager
     from .jwt_callbacks import is_token_revoked
@@ -29,6 +37,25 @@ def create_app():
     from .routes import register_blueprints
     register_blueprints(app)
 
+    from .commands import register_commands
+    register_commands(app)
+
+    from .utils.blocklist import prune
+    from .utils.periodic import start_periodic
+    start_periodic(
+        app, "blocklist-prune", app.config["BLOCKLIST_PRUNE_INTERVAL_SEC"],
+        lambda: prune(app.config["BLOCKLIST_PRUNE_CHUNK"]),
+    )
+
+    from .utils.session_sweeper import sweep_expired
+    start_periodic(
+        app, "session-sweep", app.config["SESSION_SWEEP_INTERVAL_SEC"],
+        lambda: sweep_expired(app.config["SESSION_SWEEP_BATCH"], app.config["SESSION_SWEEP_GRACE_SEC"]),
+    )
+
+    from .utils.at_risk import project
+    start_periodic(app, "at-risk-projection", app.config["AT_RISK_REFRESH_INTERVAL_SEC"], project)
+
 
     @app.get("/routes")
     def show_routes():
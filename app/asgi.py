@@ -0,0 +1,253 @@
+"""ASGI app for ``POST /api/attendance/checkin`` only, on an async engine.
+
+Same config, tokens and check-in rules as the Flask route; any other path
+gets 404, so route just this one here and everything else to the WSGI app::
+
+    uvicorn app.asgi:application --port 8001 --workers 4
+    gunicorn run:app -b :8000 -w 4
+
+    # nginx
+    location = /api/attendance/checkin { proxy_pass http://127.0.0.1:8001; }
+    location /                         { proxy_pass http://127.0.0.1:8000; }
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+
+from flask_jwt_extended import decode_token
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import ExpiredSignatureError, PyJWTError
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import raiseload
+
+from . import create_app
+from .extensions import checkin_journal, revocation_checker, roster_cache, session_cache
+from .models import AttendanceRecord, AttendanceSession, Enrollment, UserRole
+from .routes.attendance import (
+    _ensure_tz,
+    _utc_now,
+    evaluate_checkin,
+    journal_checkin,
+    open_session,
+    parse_checkin_payload,
+    verify_signed_qr,
+)
+from .utils import attendance_stats, qr_tokens
+
+CHECKIN_PATH = "/api/attendance/checkin"
+
+
+class AsyncCheckinApp:
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        config = flask_app.config
+
+        url = config.get("ASYNC_DATABASE_URL") or make_url(config["SQLALCHEMY_DATABASE_URI"]).set(
+            drivername="postgresql+asyncpg"
+        )
+        self.engine = create_async_engine(
+            url,
+            pool_size=config.get("ASYNC_DB_POOL_SIZE", 20),
+            max_overflow=config.get("ASYNC_DB_MAX_OVERFLOW", 20),
+            pool_pre_ping=True,
+        )
+        self.sessionmaker = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.identity_claim = config.get("JWT_IDENTITY_CLAIM", "sub")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        if scope["path"] != CHECKIN_PATH:
+            await _send_json(send, {"error": "not found"}, 404)
+            return
+        if scope["method"] != "POST":
+            await _send_json(send, {"error": "method not allowed"}, 405)
+            return
+
+        body = await _read_body(receive)
+        authorization = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+        payload, code = await self.checkin(authorization, body)
+        await _send_json(send, payload, code)
+
+    # ---- auth (same tokens, secret and claims as @jwt_required()) ----
+    async def _authenticate(self, authorization: str):
+        scheme, _, token = authorization.partition(" ")
+        if scheme != "Bearer" or not token:
+            return None, ({"msg": "Missing Authorization Header"}, 401)
+
+        try:
+            with self.flask_app.app_context():
+                claims = decode_token(token)
+        except ExpiredSignatureError:
+            return None, ({"msg": "Token has expired"}, 401)
+        except (PyJWTError, JWTExtendedException) as e:
+            return None, ({"msg": str(e)}, 422)
+
+        if claims.get("type") != "access":
+            return None, ({"msg": "Only non-refresh tokens are allowed"}, 422)
+
+        # same in-process revocation set as the WSGI app; the periodic sync runs off the loop
+        if revocation_checker.sync_due():
+            await asyncio.to_thread(self._sync_revocations)
+        if revocation_checker.is_revoked(claims["jti"], sync=False):
+            return None, ({"msg": "Token has been revoked"}, 401)
+
+        user_id = int(claims[self.identity_claim])
+        version = revocation_checker.cached_user_version(user_id)
+        if version is None:
+            version = await asyncio.to_thread(self._load_user_version, user_id)
+        if claims.get("tv", 0) < version:
+            return None, ({"msg": "Token has been revoked"}, 401)
+
+        return claims, None
+
+    def _sync_revocations(self) -> None:
+        with self.flask_app.app_context():
+            revocation_checker.sync()
+
+    def _open_session(self, session_id: int):
+        with self.flask_app.app_context():
+            return open_session(session_id)
+
+    def _load_user_version(self, user_id: int) -> int:
+        with self.flask_app.app_context():
+            return revocation_checker.user_version(user_id)
+
+    # ---- check-in (mirrors attendance.checkin) ----
+    async def checkin(self, authorization: str, body: bytes):
+        claims, error = await self._authenticate(authorization)
+        if error:
+            return error
+
+        if claims.get("role") != UserRole.student.value:
+            return {"error": "forbidden (student only)"}, 403
+        student_id = int(claims[self.identity_claim])
+
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            data = {}
+        parsed, error = parse_checkin_payload(data if isinstance(data, dict) else {})
+        if error:
+            return error
+        qr_token, lat, lng = parsed
+
+        async with self.sessionmaker() as db:
+            now = _utc_now()
+
+            if qr_tokens.is_signed(qr_token):
+                session, error = verify_signed_qr(qr_token, now, self.flask_app.config, confirm_open=False)
+                if error:
+                    return error
+                # the payload can outlive an early close; the session row has the last word
+                session = session_cache.get_by_id(session.id) or await asyncio.to_thread(self._open_session, session.id)
+                if session is None:
+                    return {"error": "session is closed"}, 400
+            else:
+                if self.flask_app.config.get("QR_REQUIRE_SIGNED"):
+                    return {"error": "signed qr code required"}, 400
+
+                session = session_cache.get(qr_token)
+                if session is None:
+                    row = await db.scalar(
+                        select(AttendanceSession)
+                        .options(raiseload("*"))
+                        .where(AttendanceSession.qr_token == qr_token)
+                    )
+                    if not row:
+                        return {"error": "invalid qr_token"}, 404
+                    session = session_cache.put(row)
+
+            if not session.is_active:
+                return {"error": "session is closed"}, 400
+
+            if now > _ensure_tz(session.ends_at):
+                return {"error": "session expired"}, 400
+
+            if not await _is_enrolled(db, session.course_id, student_id):
+                return {"error": "not enrolled in this course"}, 403
+
+            evaluated, error = evaluate_checkin(session, lat, lng, now)
+            if error:
+                return error
+            status, distance = evaluated
+
+            if checkin_journal.enabled:
+                # fsync'd append; keep it off the event loop
+                return await asyncio.to_thread(journal_checkin, session, student_id, status, now, lat, lng, distance)
+
+            record = AttendanceRecord(
+                session_id=session.id,
+                student_id=student_id,
+                status=status,
+                checked_in_at=now,
+                student_lat=lat,
+                student_lng=lng,
+                distance_m=distance,
+                note=None,
+            )
+            db.add(record)
+            try:
+                await db.flush()
+                await db.execute(attendance_stats.increment_stmt([(session.id, student_id, status)]))
+                await db.commit()
+            except IntegrityError:
+                await db.rollback()
+                return {"error": "already checked in"}, 409
+
+            return {"message": "checked in", "record": record.to_dict()}, 201
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+async def _is_enrolled(db, course_id: int, student_id: int) -> bool:
+    roster = roster_cache.peek(course_id)
+    if roster is not None and student_id in roster:
+        return True
+    found = await db.scalar(
+        select(Enrollment.id)
+        .where(Enrollment.course_id == course_id, Enrollment.student_id == student_id)
+        .limit(1)
+    )
+    return found is not None
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def _send_json(send, payload: dict, status: int) -> None:
+    body = json.dumps(payload).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+application = AsyncCheckinApp(create_app())
@@ -0,0 +1,84 @@
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+blocklist_cli = AppGroup("blocklist", help="token_blocklist housekeeping")
+
+
+@blocklist_cli.command("prune")
+@click.option("--chunk-size", type=int, default=None, help="rows per DELETE (plain table layout)")
+def blocklist_prune(chunk_size):
+    """Remove revocations whose tokens have expired."""
+    from .utils.blocklist import prune
+
+    result = prune(chunk_size or current_app.config["BLOCKLIST_PRUNE_CHUNK"])
+    click.echo(result)
+
+
+@blocklist_cli.command("partition")
+def blocklist_partition():
+    """Convert token_blocklist to monthly partitions on expires_at (one-off)."""
+    from .utils.blocklist import is_partitioned, partition_table
+
+    if is_partitioned():
+        click.echo("token_blocklist is already partitioned")
+        return
+    partition_table()
+    click.echo("token_blocklist partitioned by expires_at")
+
+
+@blocklist_cli.command("upgrade")
+def blocklist_upgrade():
+    """Add expires_at and the current keys to a token_blocklist from before they existed (one-off)."""
+    from .utils.blocklist import is_partitioned, upgrade_table
+
+    if is_partitioned():
+        click.echo("token_blocklist is partitioned, nothing to upgrade")
+        return
+    upgrade_table()
+    click.echo("token_blocklist upgraded")
+
+
+stats_cli = AppGroup("stats", help="course_student_stats counters")
+
+
+@stats_cli.command("rebuild")
+@click.option("--course-id", type=int, default=None, help="only this course")
+def stats_rebuild(course_id):
+    """Recompute attendance counters from attendance_records."""
+    from .utils.attendance_stats import rebuild
+
+    written = rebuild(course_id)
+    click.echo(f"rebuilt {written} counter rows")
+
+
+@stats_cli.command("at-risk")
+@click.option("--course-id", type=int, default=None, help="only this course")
+def stats_at_risk(course_id):
+    """Recompute attendance_projections (best reachable % per enrollment)."""
+    from .utils.at_risk import project
+
+    click.echo(project(course_id))
+
+
+sessions_cli = AppGroup("sessions", help="attendance session housekeeping")
+
+
+@sessions_cli.command("sweep")
+@click.option("--batch-size", type=int, default=None, help="sessions closed per transaction")
+@click.option("--grace-sec", type=float, default=None, help="how long after ends_at a session is left open")
+def sessions_sweep(batch_size, grace_sec):
+    """Close expired sessions and mark their absentees."""
+    from .utils.session_sweeper import sweep_expired
+
+    result = sweep_expired(
+        batch_size or current_app.config["SESSION_SWEEP_BATCH"],
+        current_app.config["SESSION_SWEEP_GRACE_SEC"] if grace_sec is None else grace_sec,
+    )
+    click.echo(result)
+
+
+def register_commands(app):
+    app.cli.add_command(blocklist_cli)
+    app.cli.add_command(stats_cli)
+    app.cli.add_command(sessions_cli)
@@ -16,3 +16,81 @@ class Config:
 
     # We’ll blacklist tokens on logout (recommended)
     JWT_BLACKLIST_ENABLED = True
+
+    # process-local cache of open sessions used by check-in
+    SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "1024"))
+    SESSION_CACHE_TTL_SEC = int(os.getenv("SESSION_CACHE_TTL_SEC", "60"))
+
+    # per-course enrolled-student roster cache (versioned by Course.roster_version)
+    ROSTER_CACHE_SIZE = int(os.getenv("ROSTER_CACHE_SIZE", "512"))
+    ROSTER_CACHE_TTL_SEC = int(os.getenv("ROSTER_CACHE_TTL_SEC", "300"))
+
+    # write-behind check-in ingestion (journal + background bulk insert)
+    CHECKIN_WRITE_BEHIND = os.getenv("CHECKIN_WRITE_BEHIND", "0") == "1"
+    CHECKIN_JOURNAL_DIR = os.getenv("CHECKIN_JOURNAL_DIR")  # default: <instance>/checkin-journal
+    CHECKIN_FLUSH_BATCH = int(os.getenv("CHECKIN_FLUSH_BATCH", "500"))
+    CHECKIN_FLUSH_INTERVAL_MS = int(os.getenv("CHECKIN_FLUSH_INTERVAL_MS", "200"))
+
+    # async check-in endpoint (app/asgi.py); defaults to DATABASE_URL on asyncpg
+    ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+    ASYNC_DB_POOL_SIZE = int(os.getenv("ASYNC_DB_POOL_SIZE", "20"))
+    ASYNC_DB_MAX_OVERFLOW = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", "20"))
+
+    # batch/offline check-in
+    CHECKIN_BATCH_MAX = int(os.getenv("CHECKIN_BATCH_MAX", "500"))
+    CHECKIN_CLOCK_SKEW_SEC = int(os.getenv("CHECKIN_CLOCK_SKEW_SEC", "120"))
+
+    # rotating signed QR payloads (GET /sessions/<id>/qr); static qr_token stays accepted unless required
+    QR_SIGNING_KEY = os.getenv("QR_SIGNING_KEY")  # default: SECRET_KEY
+    QR_ROTATE_SEC = int(os.getenv("QR_ROTATE_SEC", "30"))
+    QR_GRACE_SLICES = int(os.getenv("QR_GRACE_SLICES", "1"))
+    QR_REQUIRE_SIGNED = os.getenv("QR_REQUIRE_SIGNED", "0") == "1"
+
+    # revoked-JTI set synced from token_blocklist by revoked_at watermark
+    REVOCATION_SYNC_SEC = float(os.getenv("REVOCATION_SYNC_SEC", "2"))
+    REVOCATION_SYNC_OVERLAP_SEC = float(os.getenv("REVOCATION_SYNC_OVERLAP_SEC", "30"))
+    # per-user token_version cache ("log out everywhere"); bumps on other workers arrive with the sync above,
+    # so entries live as long as a token (default TTL: the longest token lifetime)
+    TOKEN_VERSION_CACHE_SIZE = int(os.getenv("TOKEN_VERSION_CACHE_SIZE", "10000"))
+    TOKEN_VERSION_TTL_SEC = float(os.getenv("TOKEN_VERSION_TTL_SEC", "0")) or None
+
+    # token_blocklist pruning (`flask blocklist prune`); interval 0 = no in-process schedule
+    BLOCKLIST_PRUNE_INTERVAL_SEC = int(os.getenv("BLOCKLIST_PRUNE_INTERVAL_SEC", "0"))
+    BLOCKLIST_PRUNE_CHUNK = int(os.getenv("BLOCKLIST_PRUNE_CHUNK", "1000"))
+    BLOCKLIST_PARTITIONS_AHEAD = int(os.getenv("BLOCKLIST_PARTITIONS_AHEAD", "2"))
+
+    # keyset pagination for list endpoints (?limit=&cursor=)
+    PAGE_DEFAULT_LIMIT = int(os.getenv("PAGE_DEFAULT_LIMIT", "50"))
+    PAGE_MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT", "500"))
+
+    # ?stream=1 responses: rows per DB fetch (yield_per) and per written chunk
+    STREAM_CHUNK_ROWS = int(os.getenv("STREAM_CHUNK_ROWS", "1000"))
+
+    # memoized per-course report aggregates (keyed by Course.attendance_version)
+    COURSE_STATS_CACHE_SIZE = int(os.getenv("COURSE_STATS_CACHE_SIZE", "512"))
+    COURSE_STATS_TTL_SEC = int(os.getenv("COURSE_STATS_TTL_SEC", "300"))
+    # department/institution reports, one entry per semester (profile edits show after the TTL)
+    SEMESTER_STATS_CACHE_SIZE = int(os.getenv("SEMESTER_STATS_CACHE_SIZE", "32"))
+    SEMESTER_STATS_TTL_SEC = int(os.getenv("SEMESTER_STATS_TTL_SEC", "300"))
+
+    # expired-session sweeper: reports count closed sessions only, so run `flask sessions sweep`
+    # from cron every minute. A positive interval also runs it in every worker; 0 = off
+    SESSION_SWEEP_INTERVAL_SEC = int(os.getenv("SESSION_SWEEP_INTERVAL_SEC", "0"))
+    SESSION_SWEEP_BATCH = int(os.getenv("SESSION_SWEEP_BATCH", "100"))
+    SESSION_SWEEP_GRACE_SEC = float(os.getenv("SESSION_SWEEP_GRACE_SEC", "30"))
+    # at-risk projection: schedule `flask stats at-risk` nightly from cron. A positive interval also runs it
+    # in every worker, counted from process start (overlapping runs skip on an advisory lock); 0 = off
+    AT_RISK_REFRESH_INTERVAL_SEC = int(os.getenv("AT_RISK_REFRESH_INTERVAL_SEC", "0"))
+
+    # password hashing process pool: bulk-created accounts and login checks (default: one worker per core)
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "0")) or None
+    PASSWORD_HASH_MIN_PARALLEL = int(os.getenv("PASSWORD_HASH_MIN_PARALLEL", "8"))
+    # werkzeug method for new hashes, e.g. "scrypt:16384:8:1" or "pbkdf2:sha256:600000" (default: werkzeug's);
+    # older hashes are upgraded on the next successful login
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD") or None
+    # logins verified on the pool at once per process (default: 4 per worker); extra ones get 503,
+    # after waiting up to PASSWORD_VERIFY_WAIT_SEC for a slot
+    PASSWORD_VERIFY_MAX_INFLIGHT = int(os.getenv("PASSWORD_VERIFY_MAX_INFLIGHT", "0")) or None
+    PASSWORD_VERIFY_WAIT_SEC = float(os.getenv("PASSWORD_VERIFY_WAIT_SEC", "0"))
+    # background CSV imports (POST /enrollments/import?async=1)
+    IMPORT_JOB_WORKERS = int(os.getenv("IMPORT_JOB_WORKERS", "2"))
@@ -2,7 +2,24 @@ from flask_jwt_extended import JWTManager
 from flask_sqlalchemy import SQLAlchemy 
 from flask_migrate import Migrate
 
+from .utils.checkin_journal import CheckinJournal
+from .utils.course_stats import CourseStatsCache
+from .utils.hashing import PasswordHasher
+from .utils.import_jobs import ImportJobRunner
+from .utils.revocation import RevocationChecker
+from .utils.roster_cache import RosterCache
+from .utils.semester_stats import SemesterStatsCache
+from .utils.session_cache import ActiveSessionCache
+
 db = SQLAlchemy()
 migrate = Migrate()
 jwt = JWTManager()
+session_cache = ActiveSessionCache()
+roster_cache = RosterCache()
+checkin_journal = CheckinJournal()
+revocation_checker = RevocationChecker()
+course_stats = CourseStatsCache()
+semester_stats = SemesterStatsCache()
+password_hasher = PasswordHasher()
+import_jobs = ImportJobRunner()
 
@@ -1,6 +1,11 @@
-from flask_jwt_extended import get_jwt
-from .models import TokenBlocklist
+from flask import current_app
+
+from .extensions import revocation_checker
 
 def is_token_revoked(jwt_header, jwt_payload) -> bool:
-    jti = jwt_payload["jti"]
-    return TokenBlocklist.query.filter_by(jti=jti).first() is not None
+    # in-process set synced from token_blocklist; no per-request query
+    if revocation_checker.is_revoked(jwt_payload["jti"]):
+        return True
+    # "log out everywhere": tokens minted before the user's last token_version bump
+    user_id = int(jwt_payload[current_app.config["JWT_IDENTITY_CLAIM"]])
+    return revocation_checker.is_superseded(user_id, jwt_payload.get("tv", 0))
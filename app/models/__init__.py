@@ -9,3 +9,6 @@ from .attendance_record import AttendanceRecord
 from .token_blocklist import TokenBlocklist
 
 
+from .course_student_stats import CourseStudentStats
+from .import_job import ImportJob
+from .attendance_projection import AttendanceProjection
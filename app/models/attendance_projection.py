@@ -0,0 +1,55 @@
+from __future__ import annotations
+from datetime import datetime
+
+from sqlalchemy import Boolean, DateTime, Float, ForeignKey, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..extensions import db
+
+
+class AttendanceProjection(db.Model):
+    """Best attendance % each enrollment can still reach, written by ``flask stats at-risk``.
+
+    A snapshot, not a mirror: rows are as fresh as ``computed_at`` (see
+    utils/at_risk.py). Students with ``at_risk`` set can no longer reach the
+    eligibility threshold even by attending every remaining planned session.
+    """
+    __tablename__ = "attendance_projections"
+
+    course_id: Mapped[int] = mapped_column(
+        ForeignKey("courses.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+
+    student_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
+
+    attended: Mapped[int] = mapped_column(Integer, nullable=False)  # finished sessions only
+    finished_sessions: Mapped[int] = mapped_column(Integer, nullable=False)
+    planned_sessions: Mapped[int] = mapped_column(Integer, nullable=False)  # max(planned, finished)
+    attendance_pct: Mapped[float] = mapped_column(Float, nullable=False)  # of planned, so far
+    best_possible_pct: Mapped[float] = mapped_column(Float, nullable=False)  # attending every remaining session
+    at_risk: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+
+    computed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    @property
+    def remaining_sessions(self) -> int:
+        return self.planned_sessions - self.finished_sessions
+
+    def to_dict(self) -> dict:
+        return {
+            "course_id": self.course_id,
+            "student_id": self.student_id,
+            "attended": self.attended,
+            "finished_sessions": self.finished_sessions,
+            "planned_sessions": self.planned_sessions,
+            "remaining_sessions": self.remaining_sessions,
+            "attendance_pct": self.attendance_pct,
+            "best_possible_pct": self.best_possible_pct,
+            "at_risk": self.at_risk,
+            "computed_at": self.computed_at.isoformat(),
+        }
@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime, date
 from typing import TYPE_CHECKING
 
-from sqlalchemy import ForeignKey, DateTime, Date, String, Float, Integer, Boolean
+from sqlalchemy import ForeignKey, DateTime, Date, String, Float, Integer, Boolean, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from ..extensions import db
@@ -16,6 +16,12 @@ if TYPE_CHECKING:
 
 class AttendanceSession(db.Model):
     __tablename__ = "attendance_sessions"
+    __table_args__ = (
+        # reports count closed sessions per course
+        Index("ix_attendance_sessions_course_active", "course_id", "is_active"),
+        # the sweeper scans open sessions by end time
+        Index("ix_attendance_sessions_open_ends_at", "ends_at", postgresql_where=text("is_active")),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
 
@@ -52,8 +58,8 @@ class AttendanceSession(db.Model):
     )
 
     # relationships
-    course: Mapped["Course"] = relationship("Course", back_populates="sessions", lazy="joined")
-    teacher: Mapped["User"] = relationship("User", back_populates="sessions_created", lazy="joined")
+    course: Mapped["Course"] = relationship("Course", back_populates="sessions")
+    teacher: Mapped["User"] = relationship("User", back_populates="sessions_created")
 
     records: Mapped[list["AttendanceRecord"]] = relationship(
         "AttendanceRecord",
@@ -29,7 +29,13 @@ class Course(db.Model):
         index=True,
     )
 
-    semester: Mapped[str | None] = mapped_column(String(40), nullable=True)
+    semester: Mapped[str | None] = mapped_column(String(40), nullable=True, index=True)
+
+    # bumped on every enrollment write; keys the per-course roster cache
+    roster_version: Mapped[int] = mapped_column(nullable=False, default=0, server_default="0")
+
+    # bumped whenever finished-session attendance changes; keys the course stats memo
+    attendance_version: Mapped[int] = mapped_column(nullable=False, default=0, server_default="0")
 
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
@@ -38,7 +44,7 @@ class Course(db.Model):
     )
 
     # relations
-    teacher: Mapped["User"] = relationship("User", back_populates="courses_taught", lazy="joined")
+    teacher: Mapped["User"] = relationship("User", back_populates="courses_taught")
     enrollments: Mapped[list["Enrollment"]] = relationship(
         "Enrollment",
         back_populates="course",
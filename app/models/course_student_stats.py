@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from sqlalchemy import ForeignKey, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..extensions import db
+
+
+class CourseStudentStats(db.Model):
+    """Per (course, student) attendance record counts, kept in step with attendance_records.
+
+    Every write path that inserts records updates these counters in the same
+    transaction (see utils/attendance_stats.py); ``flask stats rebuild``
+    recomputes them from the records.
+    """
+    __tablename__ = "course_student_stats"
+
+    course_id: Mapped[int] = mapped_column(
+        ForeignKey("courses.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+
+    student_id: Mapped[int] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
+
+    attended: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")  # present + late
+    late: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    absent: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")  # recorded absences
+
+    def to_dict(self) -> dict:
+        return {
+            "course_id": self.course_id,
+            "student_id": self.student_id,
+            "attended": self.attended,
+            "late": self.late,
+            "absent": self.absent,
+        }
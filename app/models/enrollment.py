@@ -38,8 +38,8 @@ class Enrollment(db.Model):
     )
 
     # relations
-    course: Mapped["Course"] = relationship("Course", back_populates="enrollments", lazy="joined")
-    student: Mapped["User"] = relationship("User", back_populates="enrollments", lazy="joined")
+    course: Mapped["Course"] = relationship("Course", back_populates="enrollments")
+    student: Mapped["User"] = relationship("User", back_populates="enrollments")
 
     def to_dict(self) -> dict:
         return {
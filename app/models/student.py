@@ -22,7 +22,6 @@ class Student(db.Model):
     user: Mapped["User"] = relationship(
         "User",
         back_populates="student_profile",
-        lazy="joined",
     )
 
     def to_dict(self) -> dict:
@@ -21,7 +21,6 @@ class Teacher(db.Model):
     user: Mapped["User"] = relationship(
         "User",
         back_populates="teacher_profile",
-        lazy="joined",
     )
 
     def to_dict(self) -> dict:
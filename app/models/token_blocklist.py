@@ -1,15 +1,20 @@
 from __future__ import annotations
 from datetime import datetime
 
-from sqlalchemy import String, DateTime
+from sqlalchemy import Integer, String, DateTime, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 
 from ..extensions import db
 
 class TokenBlocklist(db.Model):
     __tablename__ = "token_blocklist"
+    # same keys as the partitioned layout (utils/blocklist.py), where every unique
+    # constraint has to include the partition key
+    __table_args__ = (UniqueConstraint("jti", "expires_at", name="uq_token_blocklist_jti_expires_at"),)
 
-    id: Mapped[int] = mapped_column(primary_key=True)
-    jti: Mapped[str] = mapped_column(String(36), unique=True, nullable=False, index=True)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    jti: Mapped[str] = mapped_column(String(36), nullable=False)
     token_type: Mapped[str] = mapped_column(String(10), nullable=False)  # "access" or "refresh"
-    revoked_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+    revoked_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, nullable=False, index=True)
+    # the token's own "exp": once it passes, the row can be purged
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True, index=True)
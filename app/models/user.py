@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import String, Boolean, DateTime, Enum as SAEnum
+from sqlalchemy import String, Boolean, DateTime, Integer, Enum as SAEnum, func
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.orm import relationship
 from sqlalchemy import Boolean
@@ -35,6 +35,11 @@ class User(db.Model):
 
     is_active: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
 
+    # bumped to revoke every token issued so far (carried as the "tv" claim)
+    token_version: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    # when it was last bumped: workers pick up bumps incrementally (utils/revocation.py)
+    token_version_bumped_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True, index=True)
+
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         default=datetime.utcnow,
@@ -43,12 +48,17 @@ class User(db.Model):
 
     # ---- Password helpers ----
     def set_password(self, password: str) -> None:
-        from werkzeug.security import generate_password_hash
-        self.password_hash = generate_password_hash(password)
+        from ..extensions import password_hasher
+        self.password_hash = password_hasher.hash(password)  # PASSWORD_HASH_METHOD
 
     def check_password(self, password: str) -> bool:
         from werkzeug.security import check_password_hash
         return check_password_hash(self.password_hash, password)
+
+    def revoke_tokens(self) -> None:
+        """Invalidate every token issued so far; call revocation_checker.set_user_version after commit."""
+        self.token_version = (self.token_version or 0) + 1
+        self.token_version_bumped_at = func.now()
     
     student_profile = relationship(
         "Student",
@@ -1,15 +1,19 @@
 from __future__ import annotations
 
 import math
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
-from flask import Blueprint, request
+import numpy as np
+from flask import Blueprint, current_app, request
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 from sqlalchemy.exc import IntegrityError
 
-from ..extensions import db
-from ..models import AttendanceSession, AttendanceRecord, Enrollment, UserRole
+from ..extensions import db, session_cache, roster_cache, checkin_journal
+from ..models import AttendanceSession, AttendanceRecord, UserRole
 from ..models.attendance_record import AttendanceStatus
+from ..utils import attendance_stats, qr_tokens
+from ..utils.checkin_journal import PENDING, PERSISTED, parse_ticket
+from ..utils.session_cache import CachedSession
 
 attendance_bp = Blueprint("attendance", __name__)
 
@@ -32,7 +36,18 @@ def haversine_m(lat1, lon1, lat2, lon2) -> int:
     c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
     return int(round(R * c))
 
-def compute_status(session: AttendanceSession, now: datetime) -> AttendanceStatus | None:
+def haversine_m_vec(lat1: float, lon1: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Vectorized haversine_m: distances (m) from one point to many."""
+    R = 6371000.0
+    p1 = np.radians(lat1)
+    p2 = np.radians(lats)
+    dphi = np.radians(lats - lat1)
+    dlambda = np.radians(lngs - lon1)
+    a = np.sin(dphi / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(dlambda / 2) ** 2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return np.rint(R * c).astype(np.int64)
+
+def compute_status(session: AttendanceSession | CachedSession, now: datetime) -> AttendanceStatus | None:
     starts_at = _ensure_tz(session.starts_at)
     elapsed_min = (now - starts_at).total_seconds() / 60.0
 
@@ -43,63 +58,178 @@ def compute_status(session: AttendanceSession, now: datetime) -> AttendanceStatu
     return None  # window closed
 
 
-@attendance_bp.post("/attendance/checkin")
-@jwt_required()
-def checkin():
-    claims = get_jwt() or {}
-    role = claims.get("role")
-    student_id = int(get_jwt_identity())
-
-    if role != UserRole.student.value:
-        return {"error": "forbidden (student only)"}, 403
-
-    data = request.get_json(silent=True) or {}
+# -----------------------------
+# CHECK-IN HELPERS (shared with the async endpoint in app/asgi.py)
+# -----------------------------
+def parse_checkin_payload(data: dict):
+    """Returns ((qr_token, lat, lng), None) or (None, error response)."""
     qr_token = (data.get("qr_token") or "").strip()
     lat = data.get("lat")
     lng = data.get("lng")
 
     if not qr_token or lat is None or lng is None:
-        return {"error": "qr_token, lat, lng are required"}, 400
+        return None, ({"error": "qr_token, lat, lng are required"}, 400)
 
     try:
         lat = float(lat)
         lng = float(lng)
     except (TypeError, ValueError):
-        return {"error": "lat/lng must be numbers"}, 400
+        return None, ({"error": "lat/lng must be numbers"}, 400)
+    # the JSON parser accepts NaN/Infinity; they would slip through the distance check
+    if not (math.isfinite(lat) and math.isfinite(lng)):
+        return None, ({"error": "lat/lng must be numbers"}, 400)
 
-    session = AttendanceSession.query.filter_by(qr_token=qr_token).first()
-    if not session:
-        return {"error": "invalid qr_token"}, 404
+    return (qr_token, lat, lng), None
 
-    if not session.is_active:
-        return {"error": "session is closed"}, 400
 
-    now = _utc_now()
+def open_session(session_id: int) -> CachedSession | None:
+    """The session behind a signed payload if it is still open, else None.
 
-    # time window check (auto-expire)
-    ends_at = _ensure_tz(session.ends_at)
-    if now > ends_at:
-        session.is_active = False
-        db.session.commit()
-        return {"error": "session expired"}, 400
- 
-    # enrollment check
-    if not Enrollment.query.filter_by(course_id=session.course_id, student_id=student_id).first():
-        return {"error": "not enrolled in this course"}, 403
+    Served from ActiveSessionCache; a miss reads the row once. A close on
+    another worker shows here once the cached entry expires
+    (SESSION_CACHE_TTL_SEC), as it does for static tokens.
+    """
+    if session_cache.is_closed(session_id):
+        return None
+    session = session_cache.get_by_id(session_id)
+    if session is None:
+        row = db.session.get(AttendanceSession, session_id)
+        if row is None or not row.is_active:
+            session_cache.drop(session_id)  # remembered as closed
+            return None
+        session = session_cache.put(row)
+    return session
 
+
+def verify_signed_qr(qr_token: str, at: datetime, config, confirm_open: bool = True):
+    """Rotating signed payload -> (CachedSession, None) or (None, error response).
+
+    The signature proves authenticity and freshness without a DB read, but
+    not that the session is still open: that comes from ``open_session``.
+    The async endpoint passes ``confirm_open=False`` and runs that step off
+    the event loop itself; batch check-in accepts closed sessions.
+    """
+    session, error = qr_tokens.verify(
+        qr_token,
+        qr_tokens.signing_key(config),
+        at,
+        config.get("QR_ROTATE_SEC", 30),
+        config.get("QR_GRACE_SLICES", 1),
+    )
+    if error:
+        return None, ({"error": error}, 404 if error == "invalid qr_token" else 400)
+    if confirm_open:
+        session = open_session(session.id)
+        if session is None:
+            return None, ({"error": "session is closed"}, 400)
+    return session, None
+
+
+def evaluate_checkin(session: AttendanceSession | CachedSession, lat: float, lng: float, now: datetime):
+    """Status + distance for an open session, or (None, error response)."""
     # compute status
     status = compute_status(session, now)
     if status is None:
-        return {"error": "check-in window closed"}, 400
+        return None, ({"error": "check-in window closed"}, 400)
 
     # location check
     distance = haversine_m(session.lat, session.lng, lat, lng)
     if distance > session.radius_m:
-        return {
+        return None, ({
             "error": "too far from class",
             "distance_m": distance,
             "allowed_radius_m": session.radius_m,
-        }, 403
+        }, 403)
+
+    return (status, distance), None
+
+
+def journal_checkin(session, student_id: int, status: AttendanceStatus, now: datetime,
+                    lat: float, lng: float, distance: int):
+    """Write-behind mode: journal now, the flusher inserts (uq_session_student still decides duplicates)."""
+    ticket = checkin_journal.submit(
+        session_id=session.id,
+        student_id=student_id,
+        status=status,
+        checked_in_at=now,
+        lat=lat,
+        lng=lng,
+        distance_m=distance,
+    )
+    if ticket is None:
+        return {"error": "already checked in"}, 409
+    return {
+        "message": "check-in accepted",
+        "ticket": ticket,
+        "status": PENDING,
+        "record": {
+            "id": None,
+            "session_id": session.id,
+            "student_id": student_id,
+            "status": status.value,
+            "checked_in_at": now.isoformat(),
+            "student_lat": lat,
+            "student_lng": lng,
+            "distance_m": distance,
+            "note": None,
+        },
+    }, 202
+
+
+@attendance_bp.post("/attendance/checkin")
+@jwt_required()
+def checkin():
+    claims = get_jwt() or {}
+    role = claims.get("role")
+    student_id = int(get_jwt_identity())
+
+    if role != UserRole.student.value:
+        return {"error": "forbidden (student only)"}, 403
+
+    parsed, error = parse_checkin_payload(request.get_json(silent=True) or {})
+    if error:
+        return error
+    qr_token, lat, lng = parsed
+
+    now = _utc_now()
+
+    if qr_tokens.is_signed(qr_token):
+        # rotating signed payload: authenticity + freshness without a DB read
+        session, error = verify_signed_qr(qr_token, now, current_app.config)
+        if error:
+            return error
+    else:
+        if current_app.config.get("QR_REQUIRE_SIGNED"):
+            return {"error": "signed qr code required"}, 400
+
+        # open sessions are served from the process-local cache; only a miss hits the DB
+        session = session_cache.get(qr_token)
+        if session is None:
+            row = AttendanceSession.query.filter_by(qr_token=qr_token).first()
+            if not row:
+                return {"error": "invalid qr_token"}, 404
+            session = session_cache.put(row)
+
+    if not session.is_active:
+        return {"error": "session is closed"}, 400
+
+    # time window check; the session sweeper closes it and marks absentees
+    ends_at = _ensure_tz(session.ends_at)
+    if now > ends_at:
+        return {"error": "session expired"}, 400
+ 
+    # enrollment check (cached roster; confirm against the current version before rejecting)
+    if student_id not in roster_cache.get(session.course_id):
+        if student_id not in roster_cache.get(session.course_id, fresh=True):
+            return {"error": "not enrolled in this course"}, 403
+
+    evaluated, error = evaluate_checkin(session, lat, lng, now)
+    if error:
+        return error
+    status, distance = evaluated
+
+    if checkin_journal.enabled:
+        return journal_checkin(session, student_id, status, now, lat, lng, distance)
 
     record = AttendanceRecord(
         session_id=session.id,
@@ -114,9 +244,260 @@ def checkin():
 
     try:
         db.session.add(record)
+        db.session.flush()
+        # the session is still running, so finished-session stats (course_stats) are unaffected
+        attendance_stats.increment([(session.id, student_id, status)])
         db.session.commit()
     except IntegrityError:
         db.session.rollback()
         return {"error": "already checked in"}, 409
 
     return {"message": "checked in", "record": record.to_dict()}, 201
+
+
+@attendance_bp.get("/attendance/checkin/<ticket>")
+@jwt_required()
+def checkin_status(ticket: str):
+    """Has a write-behind check-in reached the database yet?"""
+    student_id = int(get_jwt_identity())
+
+    key = parse_ticket(ticket)
+    if key is None:
+        return {"error": "invalid ticket"}, 400
+    session_id, ticket_student_id = key
+    if ticket_student_id != student_id:
+        return {"error": "forbidden"}, 403
+
+    status = checkin_journal.status(ticket)
+    if status is not None:
+        return {"ticket": ticket, "status": status}, 200
+
+    # journaled by another worker (or long ago): the table is the source of truth
+    record = AttendanceRecord.query.filter_by(session_id=session_id, student_id=student_id).first()
+    if record:
+        return {"ticket": ticket, "status": PERSISTED, "record": record.to_dict()}, 200
+    return {"ticket": ticket, "status": PENDING}, 200
+
+
+# -----------------------------
+# BATCH / OFFLINE CHECK-IN
+# -----------------------------
+def _parse_captured_at(value) -> datetime | None:
+    if not isinstance(value, str) or not value.strip():
+        return None
+    try:
+        return _ensure_tz(datetime.fromisoformat(value.strip().replace("Z", "+00:00")))
+    except ValueError:
+        return None
+
+
+def _resolve_session(qr_token: str, captured_at: datetime, known: dict):
+    """(session, None) or (None, error message); signed payloads are checked against captured_at.
+
+    The session comes back as it is now, open or closed.
+    """
+    if qr_tokens.is_signed(qr_token):
+        signed, error = verify_signed_qr(qr_token, captured_at, current_app.config, confirm_open=False)
+        if error:
+            return None, error[0]["error"]
+        key = signed.id
+    elif current_app.config.get("QR_REQUIRE_SIGNED"):
+        return None, "signed qr code required"
+    else:
+        key = qr_token
+
+    if key not in known:
+        if isinstance(key, int):
+            session = session_cache.get_by_id(key)
+            row = None if session else db.session.get(AttendanceSession, key)
+        else:
+            session = session_cache.get(key)
+            row = None if session else AttendanceSession.query.filter_by(qr_token=key).first()
+        known[key] = session or (session_cache.put(row) if row else None)
+    session = known[key]
+    return session, (None if session else "invalid qr_token")
+
+
+@attendance_bp.post("/attendance/checkin/batch")
+@jwt_required()
+def checkin_batch():
+    """
+    Queued check-ins synced in one request, each with its device-captured time.
+
+    Items may arrive after their session closed. Status is judged at
+    captured_at, but no earlier than a signed payload's issue time; a
+    student's items with a static qr_token are judged on arrival.
+
+    json:
+      - qr_token: default for items that don't carry their own
+      - items: [{qr_token?, student_id? (teacher/admin relays only), lat, lng, captured_at (ISO 8601)}]
+    """
+    claims = get_jwt() or {}
+    role = claims.get("role")
+    user_id = int(get_jwt_identity())
+
+    if role not in (UserRole.student.value, UserRole.teacher.value, UserRole.admin.value):
+        return {"error": "forbidden"}, 403
+
+    data = request.get_json(silent=True) or {}
+    items = data.get("items")
+    default_token = (data.get("qr_token") or "").strip()
+    max_items = current_app.config.get("CHECKIN_BATCH_MAX", 500)
+
+    if not isinstance(items, list) or not items:
+        return {"error": "items must be a non-empty list"}, 400
+    if len(items) > max_items:
+        return {"error": f"at most {max_items} items per batch"}, 400
+
+    now = _utc_now()
+    max_future = now + timedelta(seconds=current_app.config.get("CHECKIN_CLOCK_SKEW_SEC", 120))
+    rotate_sec = current_app.config.get("QR_ROTATE_SEC", 30)
+    results: list[dict | None] = [None] * len(items)
+
+    def reject(idx, error):
+        results[idx] = {"index": idx, "result": "rejected", "error": error}
+
+    # 1) per-item parsing + session/role/enrollment/time checks
+    by_session: dict[int, list[tuple[int, int, float, float, datetime, AttendanceStatus]]] = {}
+    session_by_id: dict[int, CachedSession] = {}
+    known_sessions: dict[str | int, CachedSession | None] = {}
+    seen: set[tuple[int, int]] = set()
+
+    for idx, item in enumerate(items):
+        if not isinstance(item, dict):
+            reject(idx, "item must be an object")
+            continue
+
+        qr_token = (item.get("qr_token") or default_token).strip()
+        if not qr_token or item.get("lat") is None or item.get("lng") is None:
+            reject(idx, "qr_token, lat, lng are required")
+            continue
+        try:
+            lat = float(item["lat"])
+            lng = float(item["lng"])
+        except (TypeError, ValueError):
+            reject(idx, "lat/lng must be numbers")
+            continue
+        # NaN/Infinity parse fine but compare as inside the geofence once rounded to int64
+        if not (math.isfinite(lat) and math.isfinite(lng)):
+            reject(idx, "lat/lng must be numbers")
+            continue
+
+        captured_at = _parse_captured_at(item.get("captured_at"))
+        if captured_at is None:
+            reject(idx, "captured_at must be an ISO 8601 timestamp")
+            continue
+
+        session, error = _resolve_session(qr_token, captured_at, known_sessions)
+        if error:
+            reject(idx, error)
+            continue
+
+        # whose check-in is this?
+        if role == UserRole.student.value:
+            student_id = user_id
+        else:
+            if role == UserRole.teacher.value and session.teacher_id != user_id:
+                reject(idx, "forbidden")
+                continue
+            try:
+                student_id = int(item.get("student_id"))
+            except (TypeError, ValueError):
+                reject(idx, "student_id is required when relaying")
+                continue
+
+        if captured_at > max_future:
+            reject(idx, "captured_at is in the future")
+            continue
+        if captured_at < session.starts_at or captured_at > session.ends_at:
+            reject(idx, "captured_at outside the session window")
+            continue
+
+        if student_id not in roster_cache.get(session.course_id):
+            if student_id not in roster_cache.get(session.course_id, fresh=True):
+                reject(idx, "not enrolled in this course")
+                continue
+
+        # when the code was scanned, as far as the server can tell
+        if qr_tokens.is_signed(qr_token):
+            at = max(captured_at, qr_tokens.issued_at(qr_token, rotate_sec))
+        elif role == UserRole.student.value:
+            at = now  # a static token says nothing about when it was scanned
+        else:
+            at = captured_at  # relayed by the session's teacher or an admin
+
+        status = compute_status(session, at)
+        if status is None or at > session.ends_at:
+            reject(idx, "check-in window closed")
+            continue
+
+        key = (session.id, student_id)
+        if key in seen:
+            results[idx] = {"index": idx, "result": "duplicate", "error": "duplicate in batch"}
+            continue
+        seen.add(key)
+
+        session_by_id.setdefault(session.id, session)
+        by_session.setdefault(session.id, []).append((idx, student_id, lat, lng, at, status))
+
+    # 2) geofence: one vectorized pass per session
+    rows = []
+    row_index: dict[tuple[int, int], int] = {}
+
+    for session_id, pending in by_session.items():
+        session = session_by_id[session_id]
+        lats = np.fromiter((p[2] for p in pending), dtype=np.float64, count=len(pending))
+        lngs = np.fromiter((p[3] for p in pending), dtype=np.float64, count=len(pending))
+        distances = haversine_m_vec(session.lat, session.lng, lats, lngs)
+        inside = distances <= session.radius_m
+
+        for (idx, student_id, lat, lng, at, status), distance, ok in zip(pending, distances.tolist(), inside.tolist()):
+            if not ok:
+                results[idx] = {
+                    "index": idx,
+                    "result": "rejected",
+                    "error": "too far from class",
+                    "distance_m": distance,
+                    "allowed_radius_m": session.radius_m,
+                }
+                continue
+            row_index[(session_id, student_id)] = idx
+            rows.append({
+                "session_id": session_id,
+                "student_id": student_id,
+                "status": status,
+                "checked_in_at": at,
+                "student_lat": lat,
+                "student_lng": lng,
+                "distance_m": distance,
+                "note": None,
+            })
+
+    # 3) one multi-row upsert; uq_session_student decides duplicates, auto-absent marks give way
+    inserted: set[tuple[int, int]] = set()
+    if rows:
+        returned = attendance_stats.record_checkins(rows)
+        db.session.commit()
+        inserted = {(r.session_id, r.student_id) for r in returned}
+
+    for row in rows:
+        key = (row["session_id"], row["student_id"])
+        idx = row_index[key]
+        if key in inserted:
+            results[idx] = {
+                "index": idx,
+                "result": "checked_in",
+                "session_id": row["session_id"],
+                "student_id": row["student_id"],
+                "status": row["status"].value,
+                "checked_in_at": row["checked_in_at"].isoformat(),
+                "distance_m": row["distance_m"],
+            }
+        else:
+            results[idx] = {"index": idx, "result": "duplicate", "error": "already checked in"}
+
+    counts = {"checked_in": 0, "duplicate": 0, "rejected": 0}
+    for r in results:
+        counts[r["result"]] += 1
+
+    return {"counts": counts, "results": results}, 200
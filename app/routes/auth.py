@@ -1,4 +1,6 @@
-from flask import Blueprint, request
+from datetime import datetime, timezone
+
+from flask import Blueprint, current_app, request
 from flask_jwt_extended import (
     create_access_token,
     create_refresh_token,
@@ -6,11 +8,44 @@ from flask_jwt_extended import (
     get_jwt,
     get_jwt_identity,
 )
-from ..extensions import db
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..extensions import db, password_hasher, revocation_checker
 from ..models import User, TokenBlocklist
+from ..utils.hashing import HasherBusy
 
 auth_bp = Blueprint("auth", __name__)
 
+
+def _expires_at(claims) -> datetime:
+    exp = claims.get("exp")
+    if exp:
+        return datetime.fromtimestamp(exp, timezone.utc)
+    # no "exp": keep the revocation as long as any token can live (expires_at is the partition key)
+    return datetime.now(timezone.utc) + current_app.config["JWT_REFRESH_TOKEN_EXPIRES"]
+
+
+def _revoke(claims, token_type: str) -> None:
+    jti, expires_at = claims["jti"], _expires_at(claims)
+    # a second logout with the same token (e.g. a retried request) is a no-op
+    db.session.execute(
+        pg_insert(TokenBlocklist)
+        .values(jti=jti, token_type=token_type, expires_at=expires_at)
+        .on_conflict_do_nothing(index_elements=["jti", "expires_at"])
+    )
+    db.session.commit()
+    revocation_checker.add(jti, expires_at)
+
+
+def issue_tokens(user: User) -> dict:
+    # identity should be simple (string/int). Keep it the user id.
+    claims = {"role": user.role.value, "tv": user.token_version or 0}
+    return {
+        "access_token": create_access_token(identity=str(user.id), additional_claims=claims),
+        "refresh_token": create_refresh_token(identity=str(user.id), additional_claims=claims),
+    }
+
+
 @auth_bp.post("/auth/login")
 def login():
     data = request.get_json(silent=True) or {}
@@ -21,19 +56,27 @@ def login():
         return {"error": "email and password are required"}, 400
 
     user = User.query.filter_by(email=email).first()
-    if not user or not user.check_password(password):
+    if not user:
+        return {"error": "invalid credentials"}, 401
+
+    # the hash runs on the password pool; a full pool answers 503 right away
+    try:
+        valid, rehashed = password_hasher.verify(user.password_hash, password)
+    except HasherBusy:
+        return {"error": "too many logins in progress, retry shortly"}, 503, {"Retry-After": "1"}
+    if not valid:
         return {"error": "invalid credentials"}, 401
 
     if not user.is_active:
         return {"error": "account disabled"}, 403
 
-    # identity should be simple (string/int). Keep it the user id.
-    access_token = create_access_token(identity=str(user.id), additional_claims={"role": user.role.value})
-    refresh_token = create_refresh_token(identity=str(user.id), additional_claims={"role": user.role.value})
+    if rehashed:
+        # stored hash predates PASSWORD_HASH_METHOD; upgrade it while we know the password
+        user.password_hash = rehashed
+        db.session.commit()
 
     return {
-        "access_token": access_token,
-        "refresh_token": refresh_token,
+        **issue_tokens(user),
         "must_change_password": user.must_change_password,
         "user": user.to_dict(),
     }, 200
@@ -48,23 +91,30 @@ def refresh():
     claims = get_jwt()
     role = claims.get("role")
 
-    new_access = create_access_token(identity=user_id, additional_claims={"role": role})
+    # the refresh token's "tv" already passed the revocation check; carry it over
+    new_access = create_access_token(identity=user_id, additional_claims={"role": role, "tv": claims.get("tv", 0)})
     return {"access_token": new_access}, 200
 
 
 @auth_bp.post("/auth/logout")
 @jwt_required()  # logout access token
 def logout_access():
-    jti = get_jwt()["jti"]
-    db.session.add(TokenBlocklist(jti=jti, token_type="access"))
-    db.session.commit()
+    _revoke(get_jwt(), "access")
     return {"message": "access token revoked"}, 200
 
 
 @auth_bp.post("/auth/logout-refresh")
 @jwt_required(refresh=True)  # logout refresh token
 def logout_refresh():
-    jti = get_jwt()["jti"]
-    db.session.add(TokenBlocklist(jti=jti, token_type="refresh"))
-    db.session.commit()
+    _revoke(get_jwt(), "refresh")
     return {"message": "refresh token revoked"}, 200
+
+
+@auth_bp.post("/auth/logout-all")
+@jwt_required()  # revoke every access/refresh token of this user
+def logout_all():
+    user = User.query.get_or_404(int(get_jwt_identity()))
+    user.revoke_tokens()
+    db.session.commit()
+    revocation_checker.set_user_version(user.id, user.token_version)
+    return {"message": "all tokens revoked"}, 200
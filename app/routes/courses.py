@@ -1,11 +1,13 @@
-from datetime import datetime, timezone
 from flask import Blueprint, request
 from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
-from sqlalchemy import func, case
+from sqlalchemy.orm import raiseload
 
-from ..extensions import db
-from ..models import Course, Enrollment, User, UserRole, AttendanceSession, AttendanceRecord
-from ..models.attendance_record import AttendanceStatus
+from ..extensions import db, session_cache, roster_cache, course_stats
+from ..models import Course, Enrollment, User, UserRole
+from ..utils.conditional import etag_headers, make_etag, not_modified
+from ..utils.course_stats import is_eligible
+from ..utils.pagination import page_args, paginate
+from ..utils.streaming import query_rows, stream_json, wants_stream
 
 courses_bp = Blueprint("courses", __name__)
 
@@ -80,25 +82,46 @@ def create_course():
 def list_courses():
     role, user_id = _role_and_user_id()
 
+    stream = wants_stream()
+    limit, after = None, None
+    if not stream:
+        page, error = page_args(request.args)
+        if error:
+            return error
+        limit, after = page
+
+    # to_dict() reads plain columns only; relationships stay unloaded
+    q = Course.query.options(raiseload("*"))
+
+    semester = (request.args.get("semester") or "").strip()
+    if semester:
+        q = q.filter(Course.semester == semester)
+    if after:
+        q = q.filter(Course.id < after[0])
+
     if role == UserRole.admin.value:
-        courses = Course.query.order_by(Course.id.desc()).all()
+        pass
 
     elif role == UserRole.teacher.value:
-        courses = Course.query.filter_by(teacher_id=user_id).order_by(Course.id.desc()).all()
+        q = q.filter_by(teacher_id=user_id)
 
     elif role == UserRole.student.value:
         # student sees enrolled courses
-        courses = (
-            db.session.query(Course)
-            .join(Enrollment, Enrollment.course_id == Course.id)
+        q = (
+            q.join(Enrollment, Enrollment.course_id == Course.id)
             .filter(Enrollment.student_id == user_id)
-            .order_by(Course.id.desc())
-            .all()
         )
     else:
         return {"error": "forbidden"}, 403
 
-    return {"items": [c.to_dict() for c in courses]}, 200
+    q = q.order_by(Course.id.desc())
+    if stream:
+        return stream_json({}, (c.to_dict() for c in query_rows(q)))
+
+    courses = q.limit(limit + 1).all()
+    courses, next_cursor = paginate(courses, limit, lambda c: (c.id,))
+
+    return {"items": [c.to_dict() for c in courses], "next_cursor": next_cursor}, 200
 
 
 @courses_bp.get("/courses/<int:course_id>")
@@ -114,8 +137,7 @@ def get_course(course_id: int):
         if course.teacher_id != user_id:
             return {"error": "forbidden"}, 403
     elif role == UserRole.student.value:
-        enrolled = Enrollment.query.filter_by(course_id=course_id, student_id=user_id).first()
-        if not enrolled:
+        if user_id not in roster_cache.get(course.id, course.roster_version):
             return {"error": "forbidden"}, 403
     else:
         return {"error": "forbidden"}, 403
@@ -189,14 +211,13 @@ def delete_course(course_id: int):
 
     db.session.delete(course)
     db.session.commit()
+    session_cache.drop_course(course_id)
+    roster_cache.invalidate(course_id)
     return {"message": "deleted"}, 200
 
 
 
 
-def _utc_now() -> datetime:
-    return datetime.now(timezone.utc)
-
 @courses_bp.get("/courses/<int:course_id>/eligibility")
 @jwt_required()
 def course_eligibility(course_id: int):
@@ -214,38 +235,20 @@ def course_eligibility(course_id: int):
     else:
         return {"error": "forbidden"}, 403
 
-    now = _utc_now()
-
-    # 1) finished sessions count (ended or manually closed)
-    finished_sessions = (
-        db.session.query(func.count(AttendanceSession.id))
-        .filter(AttendanceSession.course_id == course_id)
-        .filter((AttendanceSession.ends_at <= now) | (AttendanceSession.is_active == False))
-        .scalar()
-    ) or 0
-
-    # 2) planned sessions (fixed denominator for eligibility)
-    planned_sessions = int(getattr(course, "planned_sessions", 0) or 0)
-
-    # Safety: planned should never be less than finished
-    denom = max(planned_sessions, finished_sessions)
-
-    # 3) list enrolled students
-    enrolled = (
-        db.session.query(User.id, User.full_name, User.email)
-        .join(Enrollment, Enrollment.student_id == User.id)
-        .filter(Enrollment.course_id == course_id)
-        .order_by(User.full_name.asc())
-        .all()
-    )
-    student_ids = [row.id for row in enrolled]
+    etag = make_etag("eligibility", *course_stats.fingerprint(course))
+    if not_modified(etag):
+        return "", 304, etag_headers(etag)
+
+    stats = course_stats.get(course)
+    finished_sessions = stats.finished_sessions   # ended or manually closed
+    denom = stats.planned_sessions                # planned, never less than finished
 
     # If denom is 0 (shouldn't happen, but safe)
     if denom == 0:
         items = []
-        for s in enrolled:
+        for s in stats.students:
             items.append({
-                "student": {"id": s.id, "full_name": s.full_name, "email": s.email},
+                "student": s.student,
                 "attended": 0,
                 "finished_sessions": 0,
                 "planned_sessions": 0,
@@ -258,50 +261,19 @@ def course_eligibility(course_id: int):
             "planned_sessions": 0,
             "threshold_pct": 70,
             "items": items,
-        }, 200
-
-    # 4) attended counts per student for FINISHED sessions only
-    attended_counts = (
-        db.session.query(
-            AttendanceRecord.student_id.label("student_id"),
-            func.sum(
-                case(
-                    (AttendanceRecord.status.in_([AttendanceStatus.present, AttendanceStatus.late]), 1),
-                    else_=0,
-                )
-            ).label("attended"),
-        )
-        .join(AttendanceSession, AttendanceSession.id == AttendanceRecord.session_id)
-        .filter(AttendanceSession.course_id == course_id)
-        .filter((AttendanceSession.ends_at <= now) | (AttendanceSession.is_active == False))
-        .filter(AttendanceRecord.student_id.in_(student_ids))
-        .group_by(AttendanceRecord.student_id)
-        .all()
-    )
-
-    attended_map = {row.student_id: int(row.attended or 0) for row in attended_counts}
+        }, 200, etag_headers(etag)
 
-    # 5) build response
+    # Eligibility is based on PLANNED (fixed) denominator
     items = []
-    eligible_count = 0
-
-    for s in enrolled:
-        attended = attended_map.get(s.id, 0)
-
-        # Eligibility is based on PLANNED (fixed) denominator
-        attendance_pct = round((attended / denom) * 100.0, 2)
-        eligible = attendance_pct >= 70.0
-        if eligible:
-            eligible_count += 1
-
+    for s in stats.students:
         items.append({
-            "student": {"id": s.id, "full_name": s.full_name, "email": s.email},
-            "attended": attended,
-            "absent_so_far": max(0, finished_sessions - attended),   # computed
+            "student": s.student,
+            "attended": s.attended,
+            "absent_so_far": max(0, finished_sessions - s.attended),   # computed
             "finished_sessions": finished_sessions,
             "planned_sessions": denom,
-            "attendance_pct": attendance_pct,
-            "eligible": eligible,
+            "attendance_pct": s.pct_of_planned,
+            "eligible": is_eligible(s.pct_of_planned),
         })
 
     return {
@@ -310,14 +282,12 @@ def course_eligibility(course_id: int):
         "planned_sessions": denom,                       # progress denominator + eligibility denominator
         "progress": f"{finished_sessions}/{denom}",
         "threshold_pct": 70,
-        "eligible_count": eligible_count,
+        "eligible_count": stats.eligible_of_planned,
         "total_students": len(items),
         "items": items,
-    }, 200
+    }, 200, etag_headers(etag)
 
 
-
-# planned_sessions update
 @courses_bp.patch("/courses/<int:course_id>/planned-sessions")
 @jwt_required()
 def update_planned_sessions(course_id: int):
@@ -347,17 +317,8 @@ def update_planned_sessions(course_id: int):
     if planned_sessions < 1 or planned_sessions > 200:
         return {"error": "planned_sessions must be between 1 and 200"}, 400
      
-    now = _utc_now()
     # count finished sessions
-    finished_sessions = (
-        db.session.query(func.count(AttendanceSession.id))
-        .filter(AttendanceSession.course_id == course.id)
-        .filter(
-            (AttendanceSession.ends_at <= now) |
-            (AttendanceSession.is_active == False)
-        )
-        .scalar()
-    ) or 0
+    finished_sessions = course_stats.get(course).finished_sessions
 
     if planned_sessions < finished_sessions:
         return {
@@ -1,20 +1,19 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
-
-from flask import Blueprint
+from flask import Blueprint, request
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from sqlalchemy import func, case
+from sqlalchemy import func
 
-from ..extensions import db
-from ..models import Course, Enrollment, User, UserRole, AttendanceSession, AttendanceRecord
+from ..extensions import course_stats, db, semester_stats
+from ..models import AttendanceProjection, Course, User, UserRole
 from ..models.attendance_record import AttendanceStatus
+from ..utils import attendance_matrix
+from ..utils.conditional import etag_headers, make_etag, not_modified
+from ..utils.course_stats import is_eligible
+from ..utils.streaming import chunk_rows, stream_csv, stream_json, wants_stream
 
 reports_bp = Blueprint("reports", __name__)
 
-def _utc_now() -> datetime:
-    return datetime.now(timezone.utc)
-
 @reports_bp.get("/courses/<int:course_id>/attendance/summary")
 @jwt_required()
 def course_attendance_summary(course_id: int):
@@ -32,115 +31,222 @@ def course_attendance_summary(course_id: int):
     else:
         return {"error": "forbidden"}, 403
 
-    now = _utc_now()
+    stream = wants_stream()
+    etag = make_etag("summary", stream, *course_stats.fingerprint(course), course.name)
+    if not_modified(etag):
+        return "", 304, etag_headers(etag)
+
+    stats = course_stats.get(course)
+    total_sessions = stats.finished_sessions
+
+    def items():
+        for s in stats.students:
+            yield {
+                "student": s.student,
+                "attended": s.attended,
+                "absent": total_sessions - s.attended,  # computed
+                "total_sessions": total_sessions,
+                "attendance_pct": s.pct_of_finished,
+                "eligible": is_eligible(s.pct_of_finished),
+            }
+
+    total_students = len(stats.students)
+    eligible_count = stats.eligible_of_finished
+    head = {
+        "course": {"id": course.id, "name": getattr(course, "name", None)},
+        "total_sessions": total_sessions,
+        "threshold_pct": 70,
+        "stats": {
+            "total_students": total_students,
+            "eligible": eligible_count,
+            "not_eligible": total_students - eligible_count,
+            "avg_attendance_pct": stats.avg_pct_of_finished,
+        },
+    }
+    if stream:
+        response = stream_json(head, items())
+        response.headers.update(etag_headers(etag))
+        return response
+
+    return {**head, "items": list(items())}, 200, etag_headers(etag)
 
-    finished_filter = ((AttendanceSession.ends_at <= now) | (AttendanceSession.is_active == False))
 
-    # 1) total finished sessions for this course
-    total_sessions = (
-        db.session.query(func.count(AttendanceSession.id))
-        .filter(AttendanceSession.course_id == course_id)
-        .filter(finished_filter)
-        .scalar()
-    ) or 0
-
-    # 2) enrolled students
-    enrolled = (
-        db.session.query(User.id, User.full_name, User.email)
-        .join(Enrollment, Enrollment.student_id == User.id)
-        .filter(Enrollment.course_id == course_id)
-        .order_by(User.full_name.asc())
+@reports_bp.get("/courses/<int:course_id>/attendance/export.csv")
+@jwt_required()
+def course_attendance_export(course_id: int):
+    """One row per enrolled student, one column per finished session."""
+    claims = get_jwt() or {}
+    role = claims.get("role")
+    user_id = int(get_jwt_identity())
+
+    course = Course.query.get_or_404(course_id)
+
+    if role == UserRole.admin.value:
+        pass
+    elif role == UserRole.teacher.value and course.teacher_id == user_id:
+        pass
+    else:
+        return {"error": "forbidden"}, 403
+
+    cols = attendance_matrix.columns(course.id)
+    header = ["student_id", "student_no", "full_name", "email", *(c.label for c in cols)]
+
+    def lines():
+        for student, statuses in attendance_matrix.rows(course.id, cols, chunk_rows()):
+            # no record in a finished session counts as absent, as in the other reports
+            yield [
+                student.id, student.student_no, student.full_name, student.email,
+                *((s or AttendanceStatus.absent).value for s in statuses),
+            ]
+
+    return stream_csv(header, lines(), filename=f"course-{course.id}-attendance.csv")
+
+
+@reports_bp.get("/courses/<int:course_id>/attendance/matrix")
+@jwt_required()
+def course_attendance_matrix(course_id: int):
+    """Students x finished sessions, two bits per cell (see utils/attendance_matrix.py)."""
+    claims = get_jwt() or {}
+    role = claims.get("role")
+    user_id = int(get_jwt_identity())
+
+    course = Course.query.get_or_404(course_id)
+
+    if role == UserRole.admin.value:
+        pass
+    elif role == UserRole.teacher.value and course.teacher_id == user_id:
+        pass
+    else:
+        return {"error": "forbidden"}, 403
+
+    # the grid changes exactly when the course's report fingerprint does
+    etag = make_etag("matrix", *course_stats.fingerprint(course))
+    if not_modified(etag):
+        return "", 304, etag_headers(etag)
+
+    cols = attendance_matrix.columns(course.id)
+    students, rows = [], []
+    for student, statuses in attendance_matrix.rows(course.id, cols, chunk_rows()):
+        students.append(student.id)
+        rows.append(attendance_matrix.pack(statuses))
+
+    return {
+        "course_id": course.id,
+        "encoding": {
+            "bits_per_session": 2,
+            "codes": {
+                str(attendance_matrix.UNRECORDED): "unrecorded",
+                **{str(code): status.value for status, code in attendance_matrix.CODES.items()},
+            },
+            "layout": "session j in bits 2*(j%4).. of byte j//4, base64 per student",
+        },
+        "sessions": [c.session_id for c in cols],
+        "session_dates": [c.session_date.isoformat() for c in cols],
+        "students": students,
+        "rows": rows,
+    }, 200, etag_headers(etag)
+
+
+@reports_bp.get("/courses/<int:course_id>/at-risk")
+@jwt_required()
+def course_at_risk(course_id: int):
+    """Students who can no longer reach the threshold, from the last projection run."""
+    claims = get_jwt() or {}
+    role = claims.get("role")
+    user_id = int(get_jwt_identity())
+
+    course = Course.query.get_or_404(course_id)
+
+    if role == UserRole.admin.value:
+        pass
+    elif role == UserRole.teacher.value and course.teacher_id == user_id:
+        pass
+    else:
+        return {"error": "forbidden"}, 403
+
+    # precomputed by `flask stats at-risk` (utils/at_risk.py): one indexed read, no aggregation
+    rows = (
+        db.session.query(AttendanceProjection, User.full_name, User.email)
+        .join(User, User.id == AttendanceProjection.student_id)
+        .filter(AttendanceProjection.course_id == course.id)
+        .filter(AttendanceProjection.at_risk.is_(True))
+        .order_by(User.full_name.asc(), User.id.asc())
         .all()
     )
-    student_ids = [s.id for s in enrolled]
-
-    # If no students, return early
-    if not student_ids:
-        return {
-            "course": {"id": course.id, "name": getattr(course, "name", None)},
-            "total_sessions": total_sessions,
-            "threshold_pct": 70,
-            "stats": {"total_students": 0, "eligible": 0, "not_eligible": 0, "avg_attendance_pct": 0.0},
-            "items": [],
-        }, 200
-
-    # If no finished sessions yet, everyone is 0%
-    if total_sessions == 0:
-        items = []
-        for s in enrolled:
-            items.append({
-                "student": {"id": s.id, "full_name": s.full_name, "email": s.email},
-                "attended": 0,
-                "absent": 0,
-                "total_sessions": 0,
-                "attendance_pct": 0.0,
-                "eligible": False,
-            })
-        return {
-            "course": {"id": course.id, "name": getattr(course, "name", None)},
-            "total_sessions": 0,
-            "threshold_pct": 70,
-            "stats": {"total_students": len(items), "eligible": 0, "not_eligible": len(items), "avg_attendance_pct": 0.0},
-            "items": items,
-        }, 200
-
-    # 3) attended per student for finished sessions (present+late)
-    attended_rows = (
-        db.session.query(
-            AttendanceRecord.student_id.label("student_id"),
-            func.sum(
-                case(
-                    (AttendanceRecord.status.in_([AttendanceStatus.present, AttendanceStatus.late]), 1),
-                    else_=0
-                )
-            ).label("attended")
-        )
-        .join(AttendanceSession, AttendanceSession.id == AttendanceRecord.session_id)
-        .filter(AttendanceSession.course_id == course_id)
-        .filter(finished_filter)
-        .filter(AttendanceRecord.student_id.in_(student_ids))
-        .group_by(AttendanceRecord.student_id)
-        .all()
+    computed_at = (
+        db.session.query(func.max(AttendanceProjection.computed_at))
+        .filter(AttendanceProjection.course_id == course.id)
+        .scalar()
     )
-    attended_map = {r.student_id: int(r.attended or 0) for r in attended_rows}
-
-    # 4) build output + stats
-    items = []
-    eligible_count = 0
-    total_pct_sum = 0.0
-
-    for s in enrolled:
-        attended = attended_map.get(s.id, 0)
-        absent = total_sessions - attended  # computed
-        pct = round((attended / total_sessions) * 100.0, 2)
-        eligible = pct >= 70.0
-
-        if eligible:
-            eligible_count += 1
-        total_pct_sum += pct
-
-        items.append({
-            "student": {"id": s.id, "full_name": s.full_name, "email": s.email},
-            "attended": attended,
-            "absent": absent,
-            "total_sessions": total_sessions,
-            "attendance_pct": pct,
-            "eligible": eligible,
-        })
-
-    total_students = len(items)
-    not_eligible = total_students - eligible_count
-    avg_pct = round(total_pct_sum / total_students, 2) if total_students else 0.0
+
+    items = [
+        {
+            "student": {"id": p.student_id, "full_name": full_name, "email": email},
+            "attended": p.attended,
+            "finished_sessions": p.finished_sessions,
+            "planned_sessions": p.planned_sessions,
+            "remaining_sessions": p.remaining_sessions,
+            "attendance_pct": p.attendance_pct,
+            "best_possible_pct": p.best_possible_pct,
+        }
+        for p, full_name, email in rows
+    ]
 
     return {
-        "course": {"id": course.id, "name": getattr(course, "name", None)},
-        "total_sessions": total_sessions,
+        "course_id": course.id,
         "threshold_pct": 70,
-        "stats": {
-            "total_students": total_students,
-            "eligible": eligible_count,
-            "not_eligible": not_eligible,
-            "avg_attendance_pct": avg_pct,
-        },
+        "computed_at": computed_at.isoformat() if computed_at else None,
+        "at_risk_count": len(items),
         "items": items,
     }, 200
+
+
+def _semester_report(kind: str):
+    """Shared front half of the semester-wide reports: admin only, ?semester= required."""
+    claims = get_jwt() or {}
+    if claims.get("role") != UserRole.admin.value:
+        return None, ({"error": "forbidden"}, 403)
+
+    semester = (request.args.get("semester") or "").strip()
+    if not semester:
+        return None, ({"error": "semester is required"}, 400)
+
+    key = semester_stats.fingerprint(semester)
+    etag = make_etag(kind, semester, *key)
+    if not_modified(etag):
+        return None, ("", 304, etag_headers(etag))
+
+    return (semester_stats.get(semester, key), etag), None
+
+
+@reports_bp.get("/reports/departments")
+@jwt_required()
+def department_report():
+    """Eligibility per department (and year level) over every course of a semester."""
+    result, error = _semester_report("departments")
+    if error:
+        return error
+    stats, etag = result
+
+    return {
+        "semester": stats.semester,
+        "threshold_pct": 70,
+        "items": stats.department_report(),
+    }, 200, etag_headers(etag)
+
+
+@reports_bp.get("/reports/institution")
+@jwt_required()
+def institution_report():
+    """Eligibility over every course of a semester."""
+    result, error = _semester_report("institution")
+    if error:
+        return error
+    stats, etag = result
+
+    return {
+        "semester": stats.semester,
+        "threshold_pct": 70,
+        **stats.institution_report(),
+    }, 200, etag_headers(etag)
+
@@ -3,14 +3,17 @@ from __future__ import annotations
 import secrets
 from datetime import datetime, date, timedelta, timezone
 
-from flask import Blueprint, request
+from flask import Blueprint, current_app, request
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from sqlalchemy import func, literal, or_, tuple_
+from sqlalchemy.orm import raiseload
 
-from app.models.user import User
-
-from ..extensions import db
-from ..models import AttendanceSession, AttendanceRecord, Enrollment, Course, UserRole
+from ..extensions import db, session_cache, roster_cache, checkin_journal, course_stats
+from ..models import AttendanceSession, AttendanceRecord, Course, Enrollment, User, UserRole
 from ..models.attendance_record import AttendanceStatus
+from ..utils import attendance_stats, qr_tokens, session_sweeper
+from ..utils.pagination import page_args, paginate, parse_bool, parse_date
+from ..utils.streaming import query_rows, stream_json, wants_stream
 
 sessions_bp = Blueprint("sessions", __name__)
 
@@ -64,12 +67,17 @@ def create_session():
     if role == UserRole.teacher.value and course.teacher_id != user_id:
         return {"error": "forbidden"}, 403
 
-    # close any existing active session for this course
+    # close any existing active session for this course (absentees included);
+    # this worker's journaled check-ins land first, before the row lock (the flush has its own connection)
+    checkin_journal.flush()
     now = _utc_now()
-    AttendanceSession.query.filter_by(course_id=course_id, is_active=True).update({
-        "is_active": False,
-        "ends_at": now,
-    })
+    replaced = (
+        db.session.query(AttendanceSession.id, AttendanceSession.course_id)
+        .filter_by(course_id=course_id, is_active=True)
+        .with_for_update(key_share=True)
+        .all()
+    )
+    session_sweeper.close_sessions(replaced, ends_at=now)
 
     token = secrets.token_urlsafe(24)
     starts_at = now
@@ -90,9 +98,49 @@ def create_session():
 
     db.session.add(session)
     db.session.commit()
+
+    # previous sessions of this course were just closed; warm the cache for the new one
+    session_cache.drop_course(course_id)
+    session_cache.put(session)
     return session.to_dict(), 201
 
 
+# -----------------------------
+# CURRENT QR PAYLOAD (teacher device polls this; rotates every QR_ROTATE_SEC)
+# -----------------------------
+@sessions_bp.get("/sessions/<int:session_id>/qr")
+@jwt_required()
+def session_qr(session_id: int):
+    claims = get_jwt() or {}
+    role = claims.get("role")
+    user_id = int(get_jwt_identity())
+
+    session = session_cache.get_by_id(session_id)
+    if session is None:
+        session = session_cache.put(AttendanceSession.query.get_or_404(session_id))
+
+    if role == UserRole.admin.value:
+        pass
+    elif role == UserRole.teacher.value and session.teacher_id == user_id:
+        pass
+    else:
+        return {"error": "forbidden"}, 403
+
+    now = _utc_now()
+    if not session.is_active:
+        return {"error": "session is closed"}, 400
+    if now > session.ends_at:
+        return {"error": "session expired"}, 400
+
+    rotate_sec = current_app.config.get("QR_ROTATE_SEC", 30)
+    return {
+        "session_id": session.id,
+        "payload": qr_tokens.sign(session, qr_tokens.signing_key(current_app.config), now, rotate_sec),
+        "rotate_sec": rotate_sec,
+        "expires_in": rotate_sec - int(now.timestamp()) % rotate_sec,
+    }, 200
+
+
 # -----------------------------
 # CLOSE SESSION + MARK ABSENT
 # -----------------------------
@@ -103,8 +151,18 @@ def close_session(session_id: int):
     role = claims.get("role")
     user_id = int(get_jwt_identity())
 
-    session = AttendanceSession.query.get_or_404(session_id)
-    course = Course.query.get_or_404(session.course_id)
+    # land this worker's journaled check-ins before deciding who is absent; the flush runs on its
+    # own connection and its inserts need FOR KEY SHARE on the session row, so it goes before the lock
+    checkin_journal.flush()
+
+    # row lock: the session sweeper skips a session being closed here (NO KEY UPDATE still lets
+    # other workers' journal flushes insert records referencing it)
+    session = (
+        AttendanceSession.query.filter_by(id=session_id)
+        .with_for_update(key_share=True)
+        .first_or_404()
+    )
+    course = db.session.query(Course.id, Course.teacher_id).filter_by(id=session.course_id).one()
 
     if role == UserRole.admin.value:
         pass
@@ -120,28 +178,13 @@ def close_session(session_id: int):
     session.is_active = False
     session.ends_at = now
 
-    # all enrolled students
-    enrolled_ids = {e.student_id for e in Enrollment.query.filter_by(course_id=session.course_id).all()}
-
-    # who already has a record (present/late/absent)
-    existing_ids = {r.student_id for r in AttendanceRecord.query.filter_by(session_id=session.id).all()}
-
-    # absentees = enrolled - recorded
-    absent_ids = enrolled_ids - existing_ids
-
-    for sid in absent_ids:
-        db.session.add(
-            AttendanceRecord(
-                session_id=session.id,
-                student_id=sid,
-                status=AttendanceStatus.absent,
-                checked_in_at=None,
-                note="auto-marked absent (no check-in)",
-            )
-        )
+    # absentees = enrolled - recorded, inserted by the database in one statement
+    marked_absent = attendance_stats.mark_absent(session.id, course.id)
+    course_stats.bump(course.id)
 
     db.session.commit()
-    return {"message": "session closed", "session": session.to_dict()}, 200
+    session_cache.drop(session.id)
+    return {"message": "session closed", "session": session.to_dict(), "marked_absent": marked_absent}, 200
 
 
 # -----------------------------
@@ -154,22 +197,50 @@ def list_sessions():
     role = claims.get("role")
     user_id = int(get_jwt_identity())
 
-    course_id = request.args.get("course_id", None, type=int)
+    if role not in (UserRole.admin.value, UserRole.teacher.value):
+        return {"error": "forbidden"}, 403
+
+    stream = wants_stream()
+    limit, after = None, None
+    if not stream:
+        page, error = page_args(request.args)
+        if error:
+            return error
+        limit, after = page
 
-    q = AttendanceSession.query
+    course_id = request.args.get("course_id", None, type=int)
+    try:
+        date_from = parse_date(request.args.get("from"))
+        date_to = parse_date(request.args.get("to"))
+        is_active = parse_bool(request.args.get("is_active"))
+    except ValueError:
+        return {"error": "from/to must be YYYY-MM-DD and is_active true/false"}, 400
+
+    # to_dict() reads plain columns only; relationships stay unloaded
+    q = AttendanceSession.query.options(raiseload("*"))
     if course_id:
         q = q.filter_by(course_id=course_id)
+    if date_from:
+        q = q.filter(AttendanceSession.session_date >= date_from)
+    if date_to:
+        q = q.filter(AttendanceSession.session_date <= date_to)
+    if is_active is not None:
+        q = q.filter(AttendanceSession.is_active.is_(is_active))
+    if after:
+        q = q.filter(AttendanceSession.id < after[0])
 
-    if role == UserRole.admin.value:
-        sessions = q.order_by(AttendanceSession.id.desc()).all()
-    elif role == UserRole.teacher.value:
-        sessions = q.join(Course, AttendanceSession.course_id == Course.id)\
-                   .filter(Course.teacher_id == user_id)\
-                   .order_by(AttendanceSession.id.desc()).all()
-    else:
-        return {"error": "forbidden"}, 403
+    if role == UserRole.teacher.value:
+        q = q.join(Course, AttendanceSession.course_id == Course.id)\
+             .filter(Course.teacher_id == user_id)
+
+    q = q.order_by(AttendanceSession.id.desc())
+    if stream:
+        return stream_json({}, (s.to_dict() for s in query_rows(q)))
 
-    return {"items": [s.to_dict() for s in sessions]}, 200
+    sessions = q.limit(limit + 1).all()
+    sessions, next_cursor = paginate(sessions, limit, lambda s: (s.id,))
+
+    return {"items": [s.to_dict() for s in sessions], "next_cursor": next_cursor}, 200
 
 
 # -----------------------------
@@ -181,91 +252,147 @@ def session_attendance(session_id: int):
     role = claims.get("role")
     user_id = int(get_jwt_identity())
 
-    session = AttendanceSession.query.get_or_404(session_id)
-    course = Course.query.get_or_404(session.course_id)
+    stream = wants_stream()
+    limit, after = None, None
+    if not stream:
+        page, error = page_args(request.args, arity=2)  # cursor: (full_name, student id)
+        if error:
+            return error
+        limit, after = page
+        if after and not (isinstance(after[0], str) and isinstance(after[1], int)):
+            return {"error": "invalid cursor"}, 400
+
+    status_filter = request.args.get("status")
+    if status_filter and status_filter not in {s.value for s in AttendanceStatus}:
+        return {"error": "status must be present, late or absent"}, 400
+
+    # only the columns this view reports, plus what the permission check needs
+    session = (
+        db.session.query(
+            AttendanceSession.id,
+            AttendanceSession.course_id,
+            AttendanceSession.starts_at,
+            AttendanceSession.ends_at,
+            AttendanceSession.is_active,
+            Course.teacher_id.label("course_teacher_id"),
+            Course.roster_version,
+        )
+        .join(Course, Course.id == AttendanceSession.course_id)
+        .filter(AttendanceSession.id == session_id)
+        .first_or_404()
+    )
 
     # permissions
     if role == UserRole.admin.value:
         pass
-    elif role == UserRole.teacher.value and course.teacher_id == user_id:
+    elif role == UserRole.teacher.value and session.course_teacher_id == user_id:
         pass
     else:
         return {"error": "forbidden"}, 403
 
-    # all enrolled students in this course
-    enrollments = (
-        Enrollment.query
-        .filter_by(course_id=course.id)
-        .all()
-    )
-    student_ids = [e.student_id for e in enrollments]
-
-    # fetch all users in one query
-    students = (
-        User.query
-        .filter(User.id.in_(student_ids))
-        .all()
-    )
-    students_by_id = {u.id: u for u in students}
-
-    # fetch existing attendance records for this session
-    records = (
-        AttendanceRecord.query
-        .filter_by(session_id=session.id)
-        .all()
-    )
-    record_by_student = {r.student_id: r for r in records}
-
-    # build response: everyone enrolled gets a row
-    items = []
-    present_count = late_count = absent_count = 0
-
-    for sid in student_ids:
-        student = students_by_id.get(sid)
-
-        rec = record_by_student.get(sid)
-        if rec:
-            status = rec.status.value
-            checked_in_at = rec.checked_in_at.isoformat() if rec.checked_in_at else None
-            distance_m = rec.distance_m
-        else:
-            status = AttendanceStatus.absent.value
-            checked_in_at = None
-            distance_m = None
-
-        if status == AttendanceStatus.present.value:
-            present_count += 1
-        elif status == AttendanceStatus.late.value:
-            late_count += 1
-        else:
-            absent_count += 1
-
-        items.append({
+    def item(student_id, full_name, email, status, checked_in_at, distance_m) -> dict:
+        return {
             "student": {
-                "id": student.id if student else sid,
-                "full_name": student.full_name if student else None,
-                "email": student.email if student else None,
+                "id": student_id,
+                "full_name": full_name,
+                "email": email,
             },
             "status": status,
-            "checked_in_at": checked_in_at,
+            "checked_in_at": checked_in_at.isoformat() if checked_in_at else None,
             "distance_m": distance_m,
-        })
+        }
+
+    session_info = {
+        "id": session.id,
+        "course_id": session.course_id,
+        "starts_at": session.starts_at.isoformat(),
+        "ends_at": session.ends_at.isoformat(),
+        "is_active": session.is_active,
+    }
+
+    if stream:
+        # the whole roster, in name order; counts are complete once the items are out
+        roster = roster_cache.get(session.course_id, session.roster_version)
+        records = (
+            db.session.query(
+                AttendanceRecord.student_id,
+                AttendanceRecord.status,
+                AttendanceRecord.checked_in_at,
+                AttendanceRecord.distance_m,
+            )
+            .filter_by(session_id=session.id)
+            .all()
+        )
+        record_by_student = {r.student_id: r for r in records}
+        counts = {
+            AttendanceStatus.present.value: 0,
+            AttendanceStatus.late.value: 0,
+            AttendanceStatus.absent.value: 0,
+            "total": len(roster),
+        }
+
+        def items():
+            for student in roster.students:
+                rec = record_by_student.get(student.id)
+                status = rec.status.value if rec else AttendanceStatus.absent.value
+                counts[status] += 1
+                if status_filter and status != status_filter:
+                    continue
+                yield item(student.id, student.full_name, student.email, status,
+                           rec.checked_in_at if rec else None, rec.distance_m if rec else None)
+
+        return stream_json({"session": session_info}, items(), tail=lambda: {"counts": counts})
+
+    # everyone enrolled has a row (no record => absent); counts always cover the whole roster
+    enrolled = (
+        db.session.query()
+        .select_from(Enrollment)
+        .outerjoin(
+            AttendanceRecord,
+            (AttendanceRecord.session_id == session.id) & (AttendanceRecord.student_id == Enrollment.student_id),
+        )
+        .filter(Enrollment.course_id == session.course_id)
+    )
+    total, present, late = enrolled.add_columns(
+        func.count(),
+        func.count().filter(AttendanceRecord.status == AttendanceStatus.present),
+        func.count().filter(AttendanceRecord.status == AttendanceStatus.late),
+    ).one()
+    counts = {
+        AttendanceStatus.present.value: present,
+        AttendanceStatus.late.value: late,
+        AttendanceStatus.absent.value: total - present - late,
+        "total": total,
+    }
+
+    # one page, sought by (full_name, id): a cursor stays valid when the roster changes
+    q = enrolled.join(User, User.id == Enrollment.student_id).add_columns(
+        User.id,
+        User.full_name,
+        User.email,
+        AttendanceRecord.status,
+        AttendanceRecord.checked_in_at,
+        AttendanceRecord.distance_m,
+    )
+    if status_filter == AttendanceStatus.absent.value:
+        q = q.filter(or_(AttendanceRecord.id.is_(None), AttendanceRecord.status == AttendanceStatus.absent))
+    elif status_filter:
+        q = q.filter(AttendanceRecord.status == AttendanceStatus(status_filter))
+    if after:
+        q = q.filter(tuple_(User.full_name, User.id) > tuple_(literal(after[0]), literal(after[1])))
+    rows = q.order_by(User.full_name.asc(), User.id.asc()).limit(limit + 1).all()
+    rows, next_cursor = paginate(rows, limit, lambda r: (r.full_name, r.id))
 
     return {
-        "session": {
-            "id": session.id,
-            "course_id": session.course_id,
-            "starts_at": session.starts_at.isoformat(),
-            "ends_at": session.ends_at.isoformat(),
-            "is_active": session.is_active,
-        },
-        "counts": {
-            "present": present_count,
-            "late": late_count,
-            "absent": absent_count,
-            "total": len(student_ids),
-        },
-        "items": items,
+        "session": session_info,
+        "counts": counts,
+        "items": [
+            item(r.id, r.full_name, r.email,
+                 r.status.value if r.status else AttendanceStatus.absent.value,
+                 r.checked_in_at, r.distance_m)
+            for r in rows
+        ],
+        "next_cursor": next_cursor,
     }, 200
 
 
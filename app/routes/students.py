@@ -1,8 +1,7 @@
-from datetime import datetime, timezone
+from itertools import groupby
 
 from flask import Blueprint
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from sqlalchemy import func
 
 from ..extensions import db
 from ..models import (
@@ -11,16 +10,15 @@ from ..models import (
     Course,
     AttendanceSession,
     AttendanceRecord,
+    AttendanceProjection,
 )
 from ..models.attendance_record import AttendanceStatus
+from ..utils.attendance_stats import finished_filter
+from ..utils.course_stats import attendance_pct, is_eligible
 
 students_bp = Blueprint("students", __name__)
 
 
-def _utc_now() -> datetime:
-    return datetime.now(timezone.utc)
-
-
 @students_bp.get("/students/me/attendance")
 @jwt_required()
 def my_attendance_history():
@@ -31,18 +29,42 @@ def my_attendance_history():
         return {"error": "forbidden"}, 403
 
     student_id = int(get_jwt_identity())
-    now = _utc_now()
 
-    # ---- enrolled courses (with planned_sessions included) ----
-    enrollments = (
+    # ---- one query: enrolled courses LEFT JOIN finished sessions LEFT JOIN my records ----
+    # (a course without finished sessions still yields one row, with NULL session columns)
+    rows = (
         db.session.query(
-            Enrollment.course_id,
-            Course.name,
+            Course.id.label("course_id"),
+            Course.name.label("course_name"),
             Course.planned_sessions,
+            AttendanceSession.id.label("session_id"),
+            AttendanceSession.session_date,
+            AttendanceRecord.status,
+            AttendanceRecord.checked_in_at,
+            AttendanceRecord.distance_m,
         )
+        .select_from(Enrollment)
         .join(Course, Course.id == Enrollment.course_id)
+        .outerjoin(
+            AttendanceSession,
+            (AttendanceSession.course_id == Course.id)
+            # finished (closed) sessions in this course
+            & finished_filter(),
+        )
+        .outerjoin(
+            AttendanceRecord,
+            (AttendanceRecord.session_id == AttendanceSession.id)
+            & (AttendanceRecord.student_id == student_id),
+        )
         .filter(Enrollment.student_id == student_id)
-        .order_by(Course.name.asc())
+        .order_by(Course.name.asc(), Course.id.asc(), AttendanceSession.session_date.asc(), AttendanceSession.id.asc())
+        .all()
+    )
+
+    # nightly projection (utils/at_risk.py); None until the course has been projected
+    at_risk = dict(
+        db.session.query(AttendanceProjection.course_id, AttendanceProjection.at_risk)
+        .filter(AttendanceProjection.student_id == student_id)
         .all()
     )
 
@@ -51,50 +73,23 @@ def my_attendance_history():
     overall_attended = 0
     overall_finished = 0  # useful progress metric
 
-    for course_id, course_name, planned_sessions in enrollments:
-        planned_sessions = int(planned_sessions or 0)
+    for course_id, course_rows in groupby(rows, key=lambda r: r.course_id):
+        course_rows = list(course_rows)
+        course_name = course_rows[0].course_name
+        planned_sessions = int(course_rows[0].planned_sessions or 0)
 
-        # 1) finished sessions in this course (ended OR manually closed)
-        finished_sessions_rows = (
-            db.session.query(AttendanceSession.id, AttendanceSession.session_date)
-            .filter(AttendanceSession.course_id == course_id)
-            .filter((AttendanceSession.ends_at <= now) | (AttendanceSession.is_active == False))
-            .order_by(AttendanceSession.session_date.asc())
-            .all()
-        )
-
-        finished_session_ids = [row.id for row in finished_sessions_rows]
-        finished_sessions = len(finished_session_ids)
-
-        # 2) attendance records for THIS student for these finished sessions
-        #    (missing record => absent)
-        record_rows = []
-        if finished_session_ids:
-            record_rows = (
-                db.session.query(
-                    AttendanceRecord.session_id,
-                    AttendanceRecord.status,
-                    AttendanceRecord.checked_in_at,
-                    AttendanceRecord.distance_m,
-                )
-                .filter(AttendanceRecord.student_id == student_id)
-                .filter(AttendanceRecord.session_id.in_(finished_session_ids))
-                .all()
-            )
-
-        record_map = {r.session_id: r for r in record_rows}
-
-        # 3) build per-session history (include absents)
+        # build per-session history (include absents; missing record => absent)
         records_out = []
         attended = 0
 
-        for s in finished_sessions_rows:
-            rec = record_map.get(s.id)
+        for r in course_rows:
+            if r.session_id is None:
+                continue  # no finished sessions yet
 
-            if rec:
-                status = rec.status
-                checked_in_at = rec.checked_in_at.isoformat() if rec.checked_in_at else None
-                distance_m = rec.distance_m
+            if r.status is not None:
+                status = r.status
+                checked_in_at = r.checked_in_at.isoformat() if r.checked_in_at else None
+                distance_m = r.distance_m
             else:
                 status = AttendanceStatus.absent
                 checked_in_at = None
@@ -106,20 +101,22 @@ def my_attendance_history():
 
             records_out.append(
                 {
-                    "session_id": s.id,
-                    "session_date": s.session_date.isoformat() if s.session_date else None,
+                    "session_id": r.session_id,
+                    "session_date": r.session_date.isoformat() if r.session_date else None,
                     "status": status.value,
                     "checked_in_at": checked_in_at,
                     "distance_m": distance_m,
                 }
             )
 
+        finished_sessions = len(records_out)
+
         absent_so_far = max(0, finished_sessions - attended)
 
         # 4) eligibility % uses PLANNED denominator (fixed course plan)
         denom = max(planned_sessions, finished_sessions)  # safety: planned should never be < finished
-        pct = round((attended / denom) * 100.0, 2) if denom else 0.0
-        eligible = pct >= 70.0
+        pct = attendance_pct(attended, denom)
+        eligible = is_eligible(pct)
 
         overall_planned += denom
         overall_attended += attended
@@ -136,11 +133,12 @@ def my_attendance_history():
                 "absent_so_far": absent_so_far,
                 "attendance_pct": pct,
                 "eligible": eligible,
+                "at_risk": at_risk.get(course_id),  # can no longer reach the threshold
                 "records": records_out,  # finished sessions only, includes absent
             }
         )
 
-    overall_pct = round((overall_attended / overall_planned) * 100.0, 2) if overall_planned else 0.0
+    overall_pct = attendance_pct(overall_attended, overall_planned)
 
     return {
         "student_id": student_id,
@@ -150,7 +148,7 @@ def my_attendance_history():
             "progress": f"{overall_finished}/{overall_planned}" if overall_planned else "0/0",
             "attended": overall_attended,
             "attendance_pct": overall_pct,
-            "eligible": overall_pct >= 70.0,
+            "eligible": is_eligible(overall_pct),
         },
         "courses": courses_output,
     }, 200
@@ -2,12 +2,17 @@ from flask import Blueprint, request
 from flask_jwt_extended import get_jwt_identity, jwt_required, get_jwt
 from psycopg2 import IntegrityError
 
-from ..extensions import db
-from ..models import User, UserRole, Student, Teacher
+from ..extensions import db, revocation_checker, roster_cache
+from ..models import User, UserRole, Student, Teacher, Enrollment
+from .auth import issue_tokens
 
 users_bp = Blueprint("users", __name__)
 
 
+def _enrolled_course_ids(user_id: int) -> list[int]:
+    return [row.course_id for row in db.session.query(Enrollment.course_id).filter_by(student_id=user_id)]
+
+
 @users_bp.post("/users")
 @jwt_required(optional=True)
 def create_user():
@@ -80,8 +85,12 @@ def update_me():
     if not full_name:
         return {"error": "full_name is required"}, 400
 
+    # rosters carry student names
+    course_ids = _enrolled_course_ids(user_id)
     user.full_name = full_name
+    roster_cache.bump(*course_ids)
     db.session.commit()
+    roster_cache.invalidate(*course_ids)
     return user.to_dict(), 200
 
 
@@ -107,9 +116,12 @@ def change_my_password():
 
     user.set_password(new_password)
     user.must_change_password = False
+    # log out every other session; this client continues with the fresh pair below
+    user.revoke_tokens()
 
     db.session.commit()
-    return {"message": "password updated successfully"}, 200
+    revocation_checker.set_user_version(user.id, user.token_version)
+    return {"message": "password updated successfully", **issue_tokens(user)}, 200
 
 
 @users_bp.delete("/users/me")
@@ -127,9 +139,12 @@ def delete_my_account():
     if not user.check_password(password):
         return {"error": "password is incorrect"}, 401
 
+    course_ids = _enrolled_course_ids(user_id)
     try:
+        roster_cache.bump(*course_ids)
         db.session.delete(user)
         db.session.commit()
+        roster_cache.invalidate(*course_ids)
         return {"message": "account deleted"}, 200
 
     except IntegrityError:
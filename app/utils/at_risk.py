@@ -0,0 +1,71 @@
+"""Nightly at-risk projection: enrollments that can no longer reach the eligibility threshold."""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from sqlalchemy import Float, case, cast, delete, literal, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..extensions import db
+from ..models import AttendanceProjection, Course, Enrollment
+from .attendance_stats import enrollment_attendance, pct_expr
+from .course_stats import ELIGIBILITY_PCT
+
+
+def project(course_id: int | None = None) -> dict:
+    """Recompute the projection of every enrollment (or one course's) and commit.
+
+    Skipped (``{"skipped": True}``) while another run holds the lock.
+    """
+    locked = db.session.execute(
+        text("SELECT pg_try_advisory_xact_lock(hashtext(:t))"), {"t": AttendanceProjection.__tablename__}
+    ).scalar()
+    if not locked:
+        db.session.rollback()
+        return {"skipped": True}
+
+    now = datetime.now(timezone.utc)
+    ea = enrollment_attendance(*([Course.id == course_id] if course_id is not None else []))
+
+    # best case: every remaining planned session attended
+    best = pct_expr(ea.c.attended + ea.c.planned - ea.c.finished, ea.c.planned)
+    projected = select(
+        ea.c.course_id,
+        ea.c.student_id,
+        ea.c.attended,
+        ea.c.finished,
+        ea.c.planned,
+        cast(pct_expr(ea.c.attended, ea.c.planned), Float),
+        # nothing planned yet: nobody is behind
+        cast(case((ea.c.planned > 0, best), else_=literal(100.0)), Float),
+        (ea.c.planned > 0) & (best < ELIGIBILITY_PCT),
+        literal(now),
+    ).order_by(ea.c.course_id, ea.c.student_id)  # rows locked in key order
+    stmt = pg_insert(AttendanceProjection).from_select(
+        [
+            "course_id", "student_id", "attended", "finished_sessions", "planned_sessions",
+            "attendance_pct", "best_possible_pct", "at_risk", "computed_at",
+        ],
+        projected,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["course_id", "student_id"],
+        set_={c: stmt.excluded[c] for c in (
+            "attended", "finished_sessions", "planned_sessions",
+            "attendance_pct", "best_possible_pct", "at_risk", "computed_at",
+        )},
+    ).returning(AttendanceProjection.at_risk)
+    flags = db.session.scalars(stmt).all()
+
+    # unenrolled since the last run (course/user deletes cascade on their own)
+    enrolled = select(Enrollment.id).where(
+        Enrollment.course_id == AttendanceProjection.course_id,
+        Enrollment.student_id == AttendanceProjection.student_id,
+    )
+    stale = delete(AttendanceProjection).where(~enrolled.exists())
+    if course_id is not None:
+        stale = stale.where(AttendanceProjection.course_id == course_id)
+    removed = db.session.execute(stale.execution_options(synchronize_session=False)).rowcount
+
+    db.session.commit()
+    return {"projected": len(flags), "at_risk": sum(flags), "removed": removed}
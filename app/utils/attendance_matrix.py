@@ -0,0 +1,89 @@
+"""Students x finished sessions attendance grid of one course."""
+from __future__ import annotations
+
+import base64
+from itertools import groupby
+from typing import Iterator, NamedTuple, Sequence
+
+from ..extensions import db
+from ..models import AttendanceRecord, AttendanceSession, Enrollment, Student, User
+from ..models.attendance_record import AttendanceStatus
+from .attendance_stats import finished_filter
+
+
+UNRECORDED = 0
+CODES = {
+    AttendanceStatus.present: 1,
+    AttendanceStatus.late: 2,
+    AttendanceStatus.absent: 3,
+}
+
+
+class MatrixColumn(NamedTuple):
+    session_id: int
+    session_date: object  # date
+
+    @property
+    def label(self) -> str:
+        return f"{self.session_date.isoformat()} #{self.session_id}"
+
+
+class MatrixStudent(NamedTuple):
+    id: int
+    full_name: str
+    email: str
+    student_no: str | None
+
+
+def columns(course_id: int) -> list[MatrixColumn]:
+    return [
+        MatrixColumn(r.id, r.session_date)
+        for r in db.session.query(AttendanceSession.id, AttendanceSession.session_date)
+        .filter(AttendanceSession.course_id == course_id)
+        .filter(finished_filter())
+        .order_by(AttendanceSession.starts_at.asc(), AttendanceSession.id.asc())
+    ]
+
+
+def rows(course_id: int, cols: Sequence[MatrixColumn], chunk: int = 1000
+         ) -> Iterator[tuple[MatrixStudent, list[AttendanceStatus | None]]]:
+    """(student, status per column); None where the student has no record in that session."""
+    position = {c.session_id: i for i, c in enumerate(cols)}
+
+    q = (
+        db.session.query(
+            User.id,
+            User.full_name,
+            User.email,
+            Student.student_no,
+            AttendanceRecord.session_id,
+            AttendanceRecord.status,
+        )
+        .select_from(Enrollment)
+        .join(User, User.id == Enrollment.student_id)
+        .outerjoin(Student, Student.user_id == User.id)
+        .outerjoin(
+            AttendanceRecord,
+            (AttendanceRecord.student_id == User.id)
+            & AttendanceRecord.session_id.in_(list(position)),
+        )
+        .filter(Enrollment.course_id == course_id)
+        .order_by(User.full_name.asc(), User.id.asc())
+        .yield_per(chunk)
+    )
+
+    for (student_id, full_name, email, student_no), group in groupby(q, key=lambda r: r[:4]):
+        statuses: list[AttendanceStatus | None] = [None] * len(cols)
+        for r in group:
+            if r.session_id is not None:
+                statuses[position[r.session_id]] = r.status
+        yield MatrixStudent(student_id, full_name, email, student_no), statuses
+
+
+def pack(statuses: Sequence[AttendanceStatus | None]) -> str:
+    """Two bits per session (``CODES``), session ``j`` in bits ``2*(j % 4)`` of byte ``j // 4``; base64."""
+    packed = bytearray((len(statuses) + 3) // 4)
+    for j, status in enumerate(statuses):
+        if status is not None:
+            packed[j >> 2] |= CODES[status] << ((j & 3) << 1)
+    return base64.b64encode(packed).decode("ascii")
@@ -0,0 +1,313 @@
+"""Per (course, student) attendance counters, kept in step with ``attendance_records``."""
+from __future__ import annotations
+
+from typing import Iterable
+
+from sqlalchemy import (
+    Integer, Numeric, case, cast, column, func, literal, literal_column, select, text, update, values,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..extensions import db
+from ..models import AttendanceRecord, AttendanceSession, Course, CourseStudentStats, Enrollment
+from ..models.attendance_record import AttendanceStatus
+
+ATTENDED = (AttendanceStatus.present, AttendanceStatus.late)
+AUTO_ABSENT_NOTE = "auto-marked absent (no check-in)"
+
+
+def _status(value) -> AttendanceStatus:
+    return value if isinstance(value, AttendanceStatus) else AttendanceStatus(value)
+
+
+def _counts(status: AttendanceStatus | None) -> tuple[int, int, int]:
+    """(attended, late, absent) contribution of one record."""
+    return (
+        int(status in ATTENDED),
+        int(status == AttendanceStatus.late),
+        int(status == AttendanceStatus.absent),
+    )
+
+
+def increment_stmt(rows: Iterable[tuple[int, int, AttendanceStatus | str]], replacing: AttendanceStatus | None = None):
+    """Upsert adding newly inserted (session_id, student_id, status) records to the counters.
+
+    With ``replacing`` the rows overwrote records of that status (e.g. an
+    auto-marked absence upgraded by a late-flushed check-in), whose
+    contribution is taken back. Returns the statement (or None for no rows)
+    so both the sync and the async session can execute it inside their own
+    transaction.
+    """
+    replaced = _counts(replacing)
+    data = []
+    for session_id, student_id, status in rows:
+        added = _counts(_status(status))
+        data.append((session_id, student_id, *(a - r for a, r in zip(added, replaced))))
+    if not data:
+        return None
+
+    delta = values(
+        column("session_id", Integer),
+        column("student_id", Integer),
+        column("attended", Integer),
+        column("late", Integer),
+        column("absent", Integer),
+        name="delta",
+    ).data(data)
+
+    # one row per (course, student), in key order so concurrent upserts lock rows consistently
+    source = (
+        select(
+            AttendanceSession.course_id,
+            delta.c.student_id,
+            func.sum(delta.c.attended),
+            func.sum(delta.c.late),
+            func.sum(delta.c.absent),
+        )
+        .join(AttendanceSession, AttendanceSession.id == delta.c.session_id)
+        .group_by(AttendanceSession.course_id, delta.c.student_id)
+        .order_by(AttendanceSession.course_id, delta.c.student_id)
+    )
+    stmt = pg_insert(CourseStudentStats).from_select(
+        ["course_id", "student_id", "attended", "late", "absent"], source
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=["course_id", "student_id"],
+        set_={
+            "attended": CourseStudentStats.attended + stmt.excluded.attended,
+            "late": CourseStudentStats.late + stmt.excluded.late,
+            "absent": CourseStudentStats.absent + stmt.excluded.absent,
+        },
+    )
+
+
+def increment(rows: Iterable[tuple[int, int, AttendanceStatus | str]], replacing: AttendanceStatus | None = None) -> None:
+    """Apply ``increment_stmt`` in the current (sync) transaction; the caller commits."""
+    stmt = increment_stmt(rows, replacing)
+    if stmt is not None:
+        db.session.execute(stmt)
+
+
+def record_checkins(rows: list[dict]) -> list:
+    """Insert check-in rows (``attendance_records`` columns) that arrive late; returns the rows written.
+
+    A row for a key that already has a record is skipped, unless that record
+    is an auto-marked absence and the check-in was taken by the session's
+    ``ends_at``: then it replaces the absence. Counters and the versions of
+    already-finished courses are kept in step. Returned rows are
+    (session_id, student_id, status, inserted).
+    """
+    from ..extensions import course_stats
+
+    if not rows:
+        return []
+    stmt = pg_insert(AttendanceRecord).values(rows)
+    ends_at = (
+        select(AttendanceSession.ends_at)
+        .where(AttendanceSession.id == literal_column("excluded.session_id"))
+        .scalar_subquery()
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_session_student",
+        set_={c: stmt.excluded[c] for c in (
+            "status", "checked_in_at", "student_lat", "student_lng", "distance_m", "note",
+        )},
+        where=(AttendanceRecord.status == AttendanceStatus.absent)
+        & (AttendanceRecord.note == AUTO_ABSENT_NOTE)
+        & (stmt.excluded.checked_in_at <= ends_at),
+    ).returning(
+        AttendanceRecord.session_id,
+        AttendanceRecord.student_id,
+        AttendanceRecord.status,
+        literal_column("xmax = 0").label("inserted"),  # false for rows the upsert updated
+    )
+    returned = db.session.execute(stmt).all()
+
+    increment([r[:3] for r in returned if r.inserted])
+    increment([r[:3] for r in returned if not r.inserted], replacing=AttendanceStatus.absent)
+    course_stats.bump_finished(r.session_id for r in returned)
+    return returned
+
+
+def mark_absent(session_id: int, course_id: int, note: str | None = AUTO_ABSENT_NOTE) -> int:
+    """Insert an absent record for every enrolled student without one; returns how many.
+
+    One statement in the caller's transaction: the INSERT ... SELECT over
+    enrollments (NOT EXISTS against this session's records; ON CONFLICT
+    covers a check-in racing in) feeds the counter upsert through a CTE.
+    """
+    from ..models import Enrollment
+
+    has_record = (
+        select(AttendanceRecord.id)
+        .where(AttendanceRecord.session_id == session_id)
+        .where(AttendanceRecord.student_id == Enrollment.student_id)
+        .exists()
+    )
+    absentees = (
+        select(
+            literal(session_id, Integer),
+            Enrollment.student_id,
+            literal(AttendanceStatus.absent.name).cast(AttendanceRecord.status.type),
+            literal(note, AttendanceRecord.note.type),
+        )
+        .where(Enrollment.course_id == course_id)
+        .where(~has_record)
+        .order_by(Enrollment.student_id)
+    )
+    marked = (
+        pg_insert(AttendanceRecord)
+        .from_select(["session_id", "student_id", "status", "note"], absentees)
+        .on_conflict_do_nothing(constraint="uq_session_student")
+        .returning(AttendanceRecord.student_id)
+        .cte("marked")
+    )
+
+    counters = pg_insert(CourseStudentStats).from_select(
+        ["course_id", "student_id", "attended", "late", "absent"],
+        select(
+            literal(course_id, Integer),
+            marked.c.student_id,
+            literal(0, Integer),
+            literal(0, Integer),
+            literal(1, Integer),
+        ),
+    )
+    counters = counters.on_conflict_do_update(
+        index_elements=["course_id", "student_id"],
+        set_={"absent": CourseStudentStats.absent + counters.excluded.absent},
+    ).returning(CourseStudentStats.student_id)
+
+    return len(db.session.execute(counters).all())
+
+
+def finished_filter():
+    """Sessions that count in reports: closed, with their absentees written."""
+    return AttendanceSession.is_active.is_(False)
+
+
+def finished_session_count(course_id: int) -> int:
+    return (
+        db.session.query(func.count(AttendanceSession.id))
+        .filter(AttendanceSession.course_id == course_id)
+        .filter(finished_filter())
+        .scalar()
+    ) or 0
+
+
+def finished_attended(course_id: int) -> dict[int, int]:
+    """student_id -> attended (present + late) over the course's finished sessions."""
+    attended = {
+        r.student_id: r.attended
+        for r in db.session.query(CourseStudentStats.student_id, CourseStudentStats.attended)
+        .filter(CourseStudentStats.course_id == course_id)
+    }
+
+    # check-ins in sessions still open are counted already but don't count yet
+    running = (
+        db.session.query(AttendanceRecord.student_id, func.count())
+        .join(AttendanceSession, AttendanceSession.id == AttendanceRecord.session_id)
+        .filter(AttendanceSession.course_id == course_id)
+        .filter(~finished_filter())
+        .filter(AttendanceRecord.status.in_(ATTENDED))
+        .group_by(AttendanceRecord.student_id)
+    )
+    for student_id, n in running:
+        attended[student_id] = attended.get(student_id, 0) - n
+    return attended
+
+
+def enrollment_attendance(*course_filters):
+    """CTE with one row per enrollment of the courses matching ``course_filters``.
+
+    Columns: course_id, student_id, attended (finished sessions only),
+    finished (the course's finished sessions) and planned
+    (``greatest(planned_sessions, finished)``, the eligibility denominator).
+    The set-based twin of ``finished_attended`` for reports spanning courses.
+    """
+    courses = select(Course.id, Course.planned_sessions).where(*course_filters).cte("ea_courses")
+
+    finished = (
+        select(AttendanceSession.course_id, func.count().label("n"))
+        .join(courses, courses.c.id == AttendanceSession.course_id)
+        .where(finished_filter())
+        .group_by(AttendanceSession.course_id)
+        .cte("ea_finished")
+    )
+
+    running = (
+        select(AttendanceSession.course_id, AttendanceRecord.student_id, func.count().label("n"))
+        .join(AttendanceSession, AttendanceSession.id == AttendanceRecord.session_id)
+        .join(courses, courses.c.id == AttendanceSession.course_id)
+        .where(~finished_filter())
+        .where(AttendanceRecord.status.in_(ATTENDED))
+        .group_by(AttendanceSession.course_id, AttendanceRecord.student_id)
+        .cte("ea_running")
+    )
+
+    finished_n = func.coalesce(finished.c.n, 0)
+    return (
+        select(
+            Enrollment.course_id,
+            Enrollment.student_id,
+            (func.coalesce(CourseStudentStats.attended, 0) - func.coalesce(running.c.n, 0)).label("attended"),
+            finished_n.label("finished"),
+            func.greatest(func.coalesce(courses.c.planned_sessions, 0), finished_n).label("planned"),
+        )
+        .join(courses, courses.c.id == Enrollment.course_id)
+        .outerjoin(CourseStudentStats, (CourseStudentStats.course_id == Enrollment.course_id)
+                   & (CourseStudentStats.student_id == Enrollment.student_id))
+        .outerjoin(finished, finished.c.course_id == Enrollment.course_id)
+        .outerjoin(running, (running.c.course_id == Enrollment.course_id)
+                   & (running.c.student_id == Enrollment.student_id))
+        .cte("enrollment_attendance")
+    )
+
+
+def pct_expr(numerator, denom):
+    """SQL twin of ``course_stats.attendance_pct``: numeric, two decimals, 0 without a denominator."""
+    return case(
+        (denom > 0, func.round(cast(numerator * literal(100.0), Numeric) / denom, 2)),
+        else_=literal(0, Numeric),
+    )
+
+
+def rebuild(course_id: int | None = None) -> int:
+    """Recompute the counters from ``attendance_records``; returns the number of rows written.
+
+    Increments from concurrent check-ins wait on the table lock and land
+    after the rebuild, so nothing is lost or counted twice.
+    """
+    db.session.execute(text("LOCK TABLE course_student_stats IN SHARE ROW EXCLUSIVE MODE"))
+
+    delete = db.session.query(CourseStudentStats)
+    if course_id is not None:
+        delete = delete.filter(CourseStudentStats.course_id == course_id)
+    delete.delete(synchronize_session=False)
+
+    source = (
+        select(
+            AttendanceSession.course_id,
+            AttendanceRecord.student_id,
+            func.sum(case((AttendanceRecord.status.in_(ATTENDED), 1), else_=0)),
+            func.sum(case((AttendanceRecord.status == AttendanceStatus.late, 1), else_=0)),
+            func.sum(case((AttendanceRecord.status == AttendanceStatus.absent, 1), else_=0)),
+        )
+        .join(AttendanceSession, AttendanceSession.id == AttendanceRecord.session_id)
+        .group_by(AttendanceSession.course_id, AttendanceRecord.student_id)
+    )
+    if course_id is not None:
+        source = source.where(AttendanceSession.course_id == course_id)
+
+    written = db.session.execute(
+        pg_insert(CourseStudentStats).from_select(
+            ["course_id", "student_id", "attended", "late", "absent"], source
+        )
+    ).rowcount
+
+    bump = update(Course).values(attendance_version=Course.attendance_version + 1)
+    if course_id is not None:
+        bump = bump.where(Course.id == course_id)
+    db.session.execute(bump.execution_options(synchronize_session=False))
+    db.session.commit()
+    return written
@@ -0,0 +1,225 @@
+"""Housekeeping for ``token_blocklist``: purge rows whose tokens have expired."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import text
+
+from ..extensions import db
+
+TABLE = "token_blocklist"
+DEFAULT_PARTITION = f"{TABLE}_default"
+UNIQUE_JTI = "uq_token_blocklist_jti_expires_at"
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def is_partitioned() -> bool:
+    return bool(db.session.execute(
+        text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:t)"),
+        {"t": TABLE},
+    ).scalar())
+
+
+def purge_expired(chunk_size: int = 1000, now: datetime | None = None) -> int:
+    """Delete expired rows chunk by chunk; returns how many were removed."""
+    now = now or _utc_now()
+    stmt = text(f"""
+        DELETE FROM {TABLE}
+        WHERE id IN (
+            SELECT id FROM {TABLE}
+            WHERE expires_at < :now
+            LIMIT :chunk
+            FOR UPDATE SKIP LOCKED
+        )
+    """)
+    total = 0
+    while True:
+        deleted = db.session.execute(stmt, {"now": now, "chunk": chunk_size}).rowcount
+        db.session.commit()
+        total += deleted
+        if deleted < chunk_size:
+            return total
+
+
+# ---- partitioned layout ----
+def _month_start(dt: datetime) -> datetime:
+    return dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(dt: datetime) -> datetime:
+    return (dt.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def _partition_name(month: datetime) -> str:
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+def _exists(name: str) -> bool:
+    return db.session.execute(text("SELECT to_regclass(:n) IS NOT NULL"), {"n": name}).scalar()
+
+
+def ensure_partitions(months_ahead: int = 2, now: datetime | None = None, until: datetime | None = None,
+                      commit: bool = True) -> list[str]:
+    """Create monthly partitions from this month through ``months_ahead`` (and ``until``).
+
+    Rows the DEFAULT partition holds for a new month are moved into it
+    before it is attached. Concurrent callers serialize on an advisory lock.
+    """
+    now = now or _utc_now()
+    db.session.execute(text("SELECT pg_advisory_xact_lock(hashtext(:t))"), {"t": TABLE})
+    # catches logouts past the last monthly partition, so they keep working if pruning is not run
+    db.session.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"))
+
+    month = _month_start(now)
+    last = month
+    for _ in range(months_ahead):
+        last = _next_month(last)
+    if until is not None:
+        last = max(last, _month_start(until))
+
+    created = []
+    while month <= last:
+        name = _partition_name(month)
+        if not _exists(name):
+            bounds = {"lo": month, "hi": _next_month(month)}
+            # attaching checks DEFAULT holds nothing in range; keep logouts out until then
+            db.session.execute(text(f"LOCK TABLE {DEFAULT_PARTITION} IN ACCESS EXCLUSIVE MODE"))
+            db.session.execute(text(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)"))
+            db.session.execute(text(f"""
+                WITH moved AS (
+                    DELETE FROM {DEFAULT_PARTITION} WHERE expires_at >= :lo AND expires_at < :hi RETURNING *
+                )
+                INSERT INTO {name} SELECT * FROM moved
+            """), bounds)
+            db.session.execute(text(
+                f"ALTER TABLE {TABLE} ATTACH PARTITION {name} "
+                f"FOR VALUES FROM ('{bounds['lo'].isoformat()}') TO ('{bounds['hi'].isoformat()}')"
+            ))
+        created.append(name)
+        month = _next_month(month)
+    if commit:
+        db.session.commit()
+    return created
+
+
+def drop_expired_partitions(now: datetime | None = None) -> list[str]:
+    """Drop partitions whose whole range lies in the past."""
+    now = now or _utc_now()
+    rows = db.session.execute(text("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(:t)
+    """), {"t": TABLE}).scalars().all()
+
+    current = _partition_name(_month_start(now))
+    dropped = []
+    for name in sorted(rows):
+        # names sort chronologically; everything before this month's partition is fully expired
+        if name.startswith(f"{TABLE}_p") and name < current:
+            db.session.execute(text(f"DROP TABLE IF EXISTS {name}"))
+            dropped.append(name)
+    db.session.commit()
+    return dropped
+
+
+def purge_default_partition(now: datetime | None = None) -> int:
+    """Expired rows that landed in the DEFAULT partition are deleted like in the plain layout."""
+    now = now or _utc_now()
+    deleted = db.session.execute(
+        text(f"DELETE FROM {DEFAULT_PARTITION} WHERE expires_at < :now"), {"now": now}
+    ).rowcount
+    db.session.commit()
+    return deleted
+
+
+def prune(chunk_size: int = 1000) -> dict:
+    """One maintenance pass for whichever layout is in place."""
+    if is_partitioned():
+        ensured = ensure_partitions(current_app.config.get("BLOCKLIST_PARTITIONS_AHEAD", 2))
+        return {
+            "layout": "partitioned",
+            "dropped": drop_expired_partitions(),
+            "ensured": ensured,
+            "purged_default": purge_default_partition(),
+        }
+    return {"layout": "table", "deleted": purge_expired(chunk_size)}
+
+
+def partition_table() -> None:
+    """One-off: rebuild ``token_blocklist`` as a table partitioned by ``expires_at`` month.
+
+    Postgres requires the partition key in every unique constraint, so the
+    primary key is (id, expires_at) and ``jti`` is unique per ``expires_at``,
+    as the model declares them. Run it in a maintenance window; it copies the live
+    rows.
+    """
+    now = _utc_now()
+
+    db.session.execute(text(f"LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE"))
+    sequence = db.session.execute(text("SELECT pg_get_serial_sequence(:t, 'id')"), {"t": TABLE}).scalar()
+    if sequence is None:
+        raise RuntimeError(f"{TABLE}.id has no owned sequence")
+    db.session.execute(text(f"ALTER TABLE {TABLE} RENAME TO {TABLE}_unpartitioned"))
+    db.session.execute(text(f"""
+        CREATE TABLE {TABLE} (
+            id INTEGER NOT NULL DEFAULT nextval('{sequence}'::regclass),
+            jti VARCHAR(36) NOT NULL,
+            token_type VARCHAR(10) NOT NULL,
+            revoked_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            CONSTRAINT {TABLE}_part_pkey PRIMARY KEY (id, expires_at),
+            CONSTRAINT {UNIQUE_JTI}_part UNIQUE (jti, expires_at)
+        ) PARTITION BY RANGE (expires_at)
+    """))
+    db.session.execute(text(f"CREATE INDEX ix_{TABLE}_part_revoked_at ON {TABLE} (revoked_at)"))
+    db.session.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id"))
+
+    latest = db.session.execute(text(f"SELECT max(expires_at) FROM {TABLE}_unpartitioned")).scalar()
+    ensure_partitions(
+        current_app.config.get("BLOCKLIST_PARTITIONS_AHEAD", 2),
+        now=now,
+        until=latest,
+        commit=False,
+    )
+
+    # expired rows are simply not carried over
+    db.session.execute(text(f"""
+        INSERT INTO {TABLE} (id, jti, token_type, revoked_at, expires_at)
+        SELECT id, jti, token_type, revoked_at, expires_at
+        FROM {TABLE}_unpartitioned
+        WHERE expires_at >= :now
+    """), {"now": now})
+    db.session.execute(text(f"DROP TABLE {TABLE}_unpartitioned"))
+    db.session.commit()
+
+
+def upgrade_table() -> None:
+    """One-off: bring a ``token_blocklist`` created before ``expires_at`` existed up to the model.
+
+    Legacy rows get ``revoked_at`` plus the refresh token lifetime (no token
+    outlives it); keys are rebuilt as the model declares them.
+    """
+    db.session.execute(text(f"LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE"))
+    db.session.execute(text(f"ALTER TABLE {TABLE} ADD COLUMN IF NOT EXISTS expires_at TIMESTAMP WITH TIME ZONE"))
+    db.session.execute(
+        text(f"UPDATE {TABLE} SET expires_at = revoked_at + :lifetime WHERE expires_at IS NULL"),
+        {"lifetime": current_app.config["JWT_REFRESH_TOKEN_EXPIRES"]},
+    )
+    for stmt in (
+        f"ALTER TABLE {TABLE} ALTER COLUMN expires_at SET NOT NULL",
+        f"DROP INDEX IF EXISTS ix_{TABLE}_jti",
+        f"ALTER TABLE {TABLE} DROP CONSTRAINT IF EXISTS {TABLE}_jti_key",
+        f"ALTER TABLE {TABLE} DROP CONSTRAINT IF EXISTS {UNIQUE_JTI}",
+        f"ALTER TABLE {TABLE} DROP CONSTRAINT IF EXISTS {TABLE}_pkey",
+        f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id, expires_at)",
+        f"ALTER TABLE {TABLE} ADD CONSTRAINT {UNIQUE_JTI} UNIQUE (jti, expires_at)",
+        f"CREATE INDEX IF NOT EXISTS ix_{TABLE}_revoked_at ON {TABLE} (revoked_at)",
+        f"CREATE INDEX IF NOT EXISTS ix_{TABLE}_expires_at ON {TABLE} (expires_at)",
+    ):
+        db.session.execute(text(stmt))
+    db.session.commit()
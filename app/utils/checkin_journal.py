@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import atexit
+import fcntl
+import glob
+import json
+import os
+import secrets
+import threading
+from datetime import datetime
+
+from sqlalchemy.exc import DataError, IntegrityError, SQLAlchemyError
+
+from .cache import TTLCache
+
+PENDING = "pending"
+PERSISTED = "persisted"
+DUPLICATE = "duplicate"
+FAILED = "failed"  # can never be inserted (e.g. its session or student was deleted)
+
+
+def parse_ticket(ticket: str) -> tuple[int, int] | None:
+    """Tickets look like ``<session_id>-<student_id>-<nonce>``."""
+    try:
+        session_id, student_id, _ = ticket.split("-", 2)
+        return int(session_id), int(student_id)
+    except ValueError:
+        return None
+
+
+class CheckinJournal:
+    """Write-behind check-ins: journaled to disk, acknowledged, then upserted in batches."""
+
+    def __init__(self):
+        self.enabled = False
+        self.batch_size = 500
+        self.flush_interval = 0.2
+
+        self._app = None
+        self._dir: str | None = None
+        self._fd: int | None = None
+        self._lock = threading.Lock()        # guards queue/pending/journal writes
+        self._flush_lock = threading.Lock()  # one flush at a time
+        self._wakeup = threading.Event()
+        self._queue: list[dict] = []
+        self._pending: dict[tuple[int, int], str] = {}
+        self._results = TTLCache(maxsize=100_000, ttl=3600)
+
+    def init_app(self, app) -> None:
+        self.enabled = bool(app.config.get("CHECKIN_WRITE_BEHIND"))
+        if not self.enabled:
+            return
+
+        self._app = app
+        self.batch_size = int(app.config.get("CHECKIN_FLUSH_BATCH", 500))
+        self.flush_interval = int(app.config.get("CHECKIN_FLUSH_INTERVAL_MS", 200)) / 1000.0
+        self._dir = app.config.get("CHECKIN_JOURNAL_DIR") or os.path.join(app.instance_path, "checkin-journal")
+        os.makedirs(self._dir, exist_ok=True)
+
+        path = os.path.join(self._dir, f"checkins-{os.getpid()}-{secrets.token_hex(4)}.jsonl")
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        self._path = path
+
+        self._replay_orphans()
+
+        threading.Thread(target=self._run, name="checkin-flusher", daemon=True).start()
+        atexit.register(self._shutdown)
+
+    # ---- request side ----
+    def submit(self, *, session_id: int, student_id: int, status, checked_in_at: datetime,
+               lat: float, lng: float, distance_m: int) -> str | None:
+        """Journal one validated check-in; returns its ticket, or None if one is already pending."""
+        key = (session_id, student_id)
+        entry = {
+            "ticket": f"{session_id}-{student_id}-{secrets.token_hex(4)}",
+            "session_id": session_id,
+            "student_id": student_id,
+            "status": status.value,
+            "checked_in_at": checked_in_at.isoformat(),
+            "student_lat": lat,
+            "student_lng": lng,
+            "distance_m": distance_m,
+        }
+        with self._lock:
+            if key in self._pending:
+                return None
+            self._append([entry])
+            self._enqueue(entry)
+            full = len(self._queue) >= self.batch_size
+
+        if full:
+            self._wakeup.set()
+        return entry["ticket"]
+
+    def status(self, ticket: str) -> str | None:
+        """PENDING / PERSISTED / DUPLICATE for tickets this process knows, else None."""
+        result = self._results.get(ticket)
+        if result is not None:
+            return result
+        key = parse_ticket(ticket)
+        if key is None:
+            return None
+        with self._lock:
+            if self._pending.get(key) == ticket:
+                return PENDING
+        return None
+
+    # ---- flushing ----
+    def flush(self) -> None:
+        """Drain the queue into the database (safe to call from any thread)."""
+        if not self.enabled:
+            return
+        from ..extensions import db
+
+        with self._flush_lock, self._app.app_context():
+            while True:
+                with self._lock:
+                    batch = self._queue[: self.batch_size]
+                if not batch:
+                    return
+
+                try:
+                    inserted = self._insert(batch)
+                    db.session.commit()
+                    results = [PERSISTED if self._key(e) in inserted else DUPLICATE for e in batch]
+                except (IntegrityError, DataError):
+                    # some row can never go in; find it instead of blocking the queue behind it
+                    db.session.rollback()
+                    results = self._insert_each(batch)
+                except SQLAlchemyError:
+                    db.session.rollback()
+                    self._app.logger.exception("check-in flush failed; %d entries stay journaled", len(batch))
+                    return
+
+                done = batch[: len(results)]
+                with self._lock:
+                    del self._queue[: len(done)]
+                    for entry, result in zip(done, results):
+                        self._pending.pop(self._key(entry), None)
+                        self._results.set(entry["ticket"], result)
+                    if not self._queue:
+                        # everything journaled so far is in the database
+                        os.ftruncate(self._fd, 0)
+                if len(done) < len(batch):
+                    return
+
+    def _insert_each(self, batch: list[dict]) -> list[str]:
+        """Insert one entry at a time; stops early (rest stays queued) if the database goes away."""
+        from ..extensions import db
+
+        results = []
+        for entry in batch:
+            try:
+                inserted = self._insert([entry])
+                db.session.commit()
+                results.append(PERSISTED if inserted else DUPLICATE)
+            except (IntegrityError, DataError):
+                db.session.rollback()
+                self._app.logger.exception("dropping check-in %s that cannot be inserted", entry["ticket"])
+                results.append(FAILED)
+            except SQLAlchemyError:
+                db.session.rollback()
+                self._app.logger.exception("check-in flush failed; %d entries stay journaled",
+                                           len(batch) - len(results))
+                break
+        return results
+
+    @staticmethod
+    def _key(entry: dict) -> tuple[int, int]:
+        return entry["session_id"], entry["student_id"]
+
+    def _insert(self, batch: list[dict]) -> set[tuple[int, int]]:
+        from ..models.attendance_record import AttendanceStatus
+        from . import attendance_stats
+
+        # an upsert may touch each key once per statement; later copies are duplicates anyway
+        unique = {}
+        for e in batch:
+            unique.setdefault((e["session_id"], e["student_id"]), e)
+
+        rows = [
+            {
+                "session_id": e["session_id"],
+                "student_id": e["student_id"],
+                "status": AttendanceStatus(e["status"]),
+                "checked_in_at": datetime.fromisoformat(e["checked_in_at"]),
+                "student_lat": e["student_lat"],
+                "student_lng": e["student_lng"],
+                "distance_m": e["distance_m"],
+                "note": None,
+            }
+            for e in unique.values()
+        ]
+        returned = attendance_stats.record_checkins(rows)
+        return {(r.session_id, r.student_id) for r in returned}
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:  # keep the flusher alive; entries stay journaled
+                self._app.logger.exception("check-in flusher error")
+
+    def _shutdown(self) -> None:
+        self.flush()
+        with self._lock:
+            if not self._queue and self._fd is not None:
+                os.unlink(self._path)
+                os.close(self._fd)
+                self._fd = None
+
+    # ---- journal files ----
+    def _enqueue(self, entry: dict) -> None:
+        # caller holds self._lock
+        self._queue.append(entry)
+        self._pending[(entry["session_id"], entry["student_id"])] = entry["ticket"]
+
+    def _append(self, entries: list[dict]) -> None:
+        # caller holds self._lock
+        data = "".join(json.dumps(e, separators=(",", ":")) + "\n" for e in entries).encode()
+        os.write(self._fd, data)
+        os.fsync(self._fd)
+
+    def _replay_orphans(self) -> None:
+        """Adopt entries from journals whose owning process is gone."""
+        for path in sorted(glob.glob(os.path.join(self._dir, "checkins-*.jsonl"))):
+            try:
+                fd = os.open(path, os.O_RDWR)
+            except FileNotFoundError:
+                continue
+            try:
+                # live owners (including us) hold an exclusive lock on their journal
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                continue
+            try:
+                if os.fstat(fd).st_nlink == 0:
+                    continue  # another process already adopted it
+                entries = []
+                with os.fdopen(os.dup(fd), "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            entries.append(json.loads(line))
+                        except ValueError:
+                            pass  # torn final write from a crash
+                # copy into our own journal before the orphan goes away
+                with self._lock:
+                    if entries:
+                        self._append(entries)
+                        for entry in entries:
+                            self._enqueue(entry)
+                os.unlink(path)
+            finally:
+                os.close(fd)
@@ -0,0 +1,20 @@
+"""Strong ETags + If-None-Match for polled read endpoints."""
+from __future__ import annotations
+
+import hashlib
+
+from flask import request
+
+
+def make_etag(*parts) -> str:
+    return hashlib.sha1(":".join(str(p) for p in parts).encode()).hexdigest()[:24]
+
+
+def etag_headers(etag: str) -> dict:
+    # no-cache: clients may store the body but must revalidate before reuse
+    return {"ETag": f'"{etag}"', "Cache-Control": "private, no-cache"}
+
+
+def not_modified(etag: str) -> bool:
+    # If-None-Match uses the weak comparison (RFC 9110 13.1.2)
+    return request.if_none_match.contains_weak(etag)
@@ -0,0 +1,187 @@
+"""Per-course attendance aggregates shared by every report endpoint."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from sqlalchemy import update
+
+from .cache import TTLCache
+
+ELIGIBILITY_PCT = 70.0
+
+
+def attendance_pct(attended: int, denom: int) -> float:
+    return round((attended / denom) * 100.0, 2) if denom else 0.0
+
+
+def is_eligible(pct: float) -> bool:
+    return pct >= ELIGIBILITY_PCT
+
+
+@dataclass(frozen=True)
+class StudentStats:
+    id: int
+    full_name: str
+    email: str
+    attended: int  # present + late, finished sessions only
+    pct_of_finished: float  # summary view
+    pct_of_planned: float  # eligibility view (fixed course plan)
+
+    @property
+    def student(self) -> dict:
+        return {"id": self.id, "full_name": self.full_name, "email": self.email}
+
+
+@dataclass(frozen=True)
+class CourseStats:
+    course_id: int
+    key: tuple[int, int, int]
+    finished_sessions: int
+    planned_sessions: int  # max(planned, finished): planned should never be < finished
+    students: tuple[StudentStats, ...]  # roster order
+
+    @property
+    def eligible_of_finished(self) -> int:
+        return sum(1 for s in self.students if is_eligible(s.pct_of_finished))
+
+    @property
+    def eligible_of_planned(self) -> int:
+        return sum(1 for s in self.students if is_eligible(s.pct_of_planned))
+
+    @property
+    def avg_pct_of_finished(self) -> float:
+        if not self.students:
+            return 0.0
+        return round(sum(s.pct_of_finished for s in self.students) / len(self.students), 2)
+
+
+class CourseStatsCache:
+    """Memoized ``CourseStats`` per course, keyed by ``Course.attendance_version``.
+
+    Writers that change finished-session results bump the version inside
+    their transaction (``bump`` / ``bump_finished``); enrollment changes are
+    covered by ``roster_version``, which is part of the key.
+    """
+
+    def __init__(self, maxsize: int = 512, ttl: float = 300.0):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        # course_id -> (key, finished count); lets fingerprint() skip its query
+        self._finished_cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def init_app(self, app) -> None:
+        for cache in (self._cache, self._finished_cache):
+            cache.configure(
+                maxsize=app.config.get("COURSE_STATS_CACHE_SIZE", 512),
+                ttl=app.config.get("COURSE_STATS_TTL_SEC", 300),
+            )
+
+    def get(self, course) -> CourseStats:
+        stats = self._fresh(course)
+        if stats is None:
+            stats = self._compute(course, self._key(course))
+            self._cache.set(course.id, stats)
+        return stats
+
+    def fingerprint(self, course) -> tuple[int, ...]:
+        """Everything the course's report results depend on, without aggregating.
+
+        Served from the memo when it is fresh; otherwise one count query.
+        """
+        key = self._key(course)
+        stats = self._fresh(course)
+        if stats is not None:
+            return (course.id, *key, stats.finished_sessions)
+
+        cached = self._finished_cache.get(course.id)
+        if cached is not None and cached[0] == key:
+            return (course.id, *key, cached[1])
+
+        from .attendance_stats import finished_session_count
+
+        finished_sessions = finished_session_count(course.id)
+        self._finished_cache.set(course.id, (key, finished_sessions))
+        return (course.id, *key, finished_sessions)
+
+    def bump(self, *course_ids: int) -> None:
+        """Bump ``attendance_version`` inside the caller's transaction."""
+        from ..extensions import db
+        from ..models import Course
+
+        ids = sorted({int(c) for c in course_ids})
+        if not ids:
+            return
+        db.session.execute(
+            update(Course)
+            .where(Course.id.in_(ids))
+            .values(attendance_version=Course.attendance_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+    def bump_finished(self, session_ids) -> None:
+        """Bump the courses of those sessions that are already finished (late inserts)."""
+        from ..extensions import db
+        from ..models import AttendanceSession, Course
+        from .attendance_stats import finished_filter
+
+        ids = sorted({int(s) for s in session_ids})
+        if not ids:
+            return
+        finished = (
+            db.session.query(AttendanceSession.course_id)
+            .filter(AttendanceSession.id.in_(ids))
+            .filter(finished_filter())
+        )
+        db.session.execute(
+            update(Course)
+            .where(Course.id.in_(finished.scalar_subquery()))
+            .values(attendance_version=Course.attendance_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+    def invalidate(self, *course_ids: int) -> None:
+        for course_id in course_ids:
+            self._cache.pop(course_id)
+            self._finished_cache.pop(course_id)
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self._finished_cache.clear()
+
+    @staticmethod
+    def _key(course) -> tuple[int, int, int]:
+        return (course.attendance_version, course.roster_version, course.planned_sessions or 0)
+
+    def _fresh(self, course) -> CourseStats | None:
+        stats = self._cache.get(course.id)
+        if stats is None or stats.key != self._key(course):
+            return None
+        return stats
+
+    def _compute(self, course, key) -> CourseStats:
+        from ..extensions import roster_cache
+        from . import attendance_stats
+
+        finished_sessions = attendance_stats.finished_session_count(course.id)
+        denom = max(int(course.planned_sessions or 0), finished_sessions)
+
+        roster = roster_cache.get(course.id, course.roster_version)
+        attended_map = attendance_stats.finished_attended(course.id) if finished_sessions and len(roster) else {}
+
+        students = []
+        for s in roster.students:
+            attended = attended_map.get(s.id, 0)
+            students.append(StudentStats(
+                id=s.id,
+                full_name=s.full_name,
+                email=s.email,
+                attended=attended,
+                pct_of_finished=attendance_pct(attended, finished_sessions),
+                pct_of_planned=attendance_pct(attended, denom),
+            ))
+
+        return CourseStats(
+            course_id=course.id,
+            key=key,
+            finished_sessions=finished_sessions,
+            planned_sessions=denom,
+            students=tuple(students),
+        )
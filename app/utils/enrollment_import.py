@@ -0,0 +1,209 @@
+"""Set-based CSV enrollment import: a fixed number of queries however long the file is."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, Mapping
+
+from sqlalchemy import or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..extensions import db, password_hasher
+from ..models import Enrollment, Student, User, UserRole
+
+REQUIRED_COLUMNS = {"email", "student_no", "full_name"}
+
+
+@dataclass(frozen=True)
+class ImportRow:
+    line: int
+    email: str
+    student_no: str
+    full_name: str
+    department: str | None
+    year_level: int | None
+
+
+class _Summary:
+    def __init__(self):
+        self.counts = {
+            "created_users": 0,
+            "updated_profiles": 0,
+            "enrolled": 0,
+            "already_enrolled": 0,
+            "skipped_invalid": 0,
+        }
+        self._errors: list[tuple[int, str]] = []
+
+    def invalid(self, line: int, message: str) -> None:
+        self.counts["skipped_invalid"] += 1
+        self._errors.append((line, f"Line {line}: {message}"))
+
+    def as_dict(self) -> dict:
+        return {**self.counts, "errors": [m for _, m in sorted(self._errors, key=lambda e: e[0])]}
+
+
+def has_required_columns(fieldnames) -> bool:
+    return bool(fieldnames) and REQUIRED_COLUMNS.issubset({c.strip() for c in fieldnames})
+
+
+def parse_rows(reader: Iterable[Mapping[str, str]], summary: _Summary) -> list[ImportRow]:
+    """Validate every CSV row up front; invalid lines are recorded and dropped."""
+    rows = []
+    for idx, row in enumerate(reader, start=2):  # header line is 1
+        email = (row.get("email") or "").strip().lower()
+        student_no = (row.get("student_no") or "").strip()
+        full_name = (row.get("full_name") or "").strip()
+        department = (row.get("department") or "").strip() or None
+        year_level_raw = (row.get("year_level") or "").strip()
+
+        if not email or not student_no or not full_name:
+            summary.invalid(idx, "missing email/student_no/full_name")
+            continue
+
+        # year_level optional
+        year_level = None
+        if year_level_raw:
+            try:
+                year_level = int(year_level_raw)
+            except ValueError:
+                summary.invalid(idx, "year_level must be integer")
+                continue
+
+        rows.append(ImportRow(idx, email, student_no, full_name, department, year_level))
+    return rows
+
+
+def import_students(course_id: int, reader: Iterable[Mapping[str, str]]) -> dict:
+    """Create/update students from CSV rows and enroll them in ``course_id``; returns the summary."""
+    summary = _Summary()
+    rows = parse_rows(reader, summary)
+    if rows:
+        _apply(course_id, rows, summary)
+    return summary.as_dict()
+
+
+def _apply(course_id: int, rows: list[ImportRow], summary: _Summary) -> None:
+    # ---- prefetch: a handful of IN queries for the whole file ----
+    users = {
+        u.email: u
+        for u in db.session.execute(
+            select(User.id, User.email, User.role).where(User.email.in_({r.email for r in rows}))
+        )
+    }
+    user_ids = [u.id for u in users.values()]
+
+    owner_of_no: dict[str, int | str] = {}  # student_no -> user id (or email of a user still to create)
+    no_of_user: dict[int | str, str] = {}
+    for p in db.session.execute(
+        select(Student.user_id, Student.student_no).where(
+            or_(Student.user_id.in_(user_ids), Student.student_no.in_({r.student_no for r in rows}))
+        )
+    ):
+        if p.student_no:
+            owner_of_no[p.student_no] = p.user_id
+            no_of_user[p.user_id] = p.student_no
+
+    enrolled = set(db.session.scalars(
+        select(Enrollment.student_id)
+        .where(Enrollment.course_id == course_id)
+        .where(Enrollment.student_id.in_(user_ids))
+    ))
+
+    # ---- replay the file in order, exactly as the per-row loop decided ----
+    new_users: dict[str, ImportRow] = {}
+    accepted: list[tuple[ImportRow, int | str]] = []
+    for r in rows:
+        user = users.get(r.email)
+        # If user exists but is not student, skip for safety
+        if user is not None and user.role != UserRole.student:
+            summary.invalid(r.line, "email belongs to non-student user")
+            continue
+
+        key = user.id if user is not None else r.email
+        owner = owner_of_no.get(r.student_no)
+        if owner is not None and owner != key:
+            summary.invalid(r.line, "student_no already used by another student")
+            continue
+
+        if user is None and r.email not in new_users:
+            new_users[r.email] = r
+
+        previous = no_of_user.get(key)
+        if previous is not None and previous != r.student_no:
+            owner_of_no.pop(previous, None)
+        owner_of_no[r.student_no] = key
+        no_of_user[key] = r.student_no
+        accepted.append((r, key))
+
+    # ---- 1) new users: initial password = student_no, changed on first login ----
+    ids = {email: u.id for email, u in users.items()}
+    if new_users:
+        hashes = password_hasher.hash_many(r.student_no for r in new_users.values())
+        created = db.session.execute(
+            pg_insert(User)
+            .on_conflict_do_nothing(index_elements=["email"])
+            .returning(User.id, User.email),
+            [
+                {
+                    "full_name": r.full_name,
+                    "email": r.email,
+                    "role": UserRole.student,
+                    "password_hash": password_hash,
+                    "must_change_password": True,
+                }
+                for r, password_hash in zip(new_users.values(), hashes)
+            ],
+        ).all()
+        summary.counts["created_users"] = len(created)
+        ids.update((c.email, c.id) for c in created)
+
+        missing = [email for email in new_users if email not in ids]
+        if missing:
+            # registered by someone else since the prefetch; only students can be enrolled
+            ids.update(db.session.execute(
+                select(User.email, User.id).where(User.email.in_(missing), User.role == UserRole.student)
+            ).tuples())
+
+    resolved: list[tuple[ImportRow, int]] = []
+    for r, key in accepted:
+        user_id = key if isinstance(key, int) else ids.get(key)
+        if user_id is None:
+            summary.invalid(r.line, "email belongs to non-student user")
+            continue
+        resolved.append((r, user_id))
+    if not resolved:
+        return
+
+    # ---- 2) profiles: last line per student wins ----
+    profiles = {}
+    for r, user_id in resolved:
+        profiles[user_id] = {
+            "user_id": user_id,
+            "student_no": r.student_no,
+            "department": r.department,
+            "year_level": r.year_level,
+        }
+    summary.counts["updated_profiles"] = len(resolved)
+
+    upsert = pg_insert(Student).values([profiles[k] for k in sorted(profiles)])
+    db.session.execute(upsert.on_conflict_do_update(
+        index_elements=["user_id"],
+        set_={
+            "student_no": upsert.excluded.student_no,
+            "department": upsert.excluded.department,
+            "year_level": upsert.excluded.year_level,
+        },
+    ))
+
+    # ---- 3) enrollments: uq_course_student decides duplicates ----
+    queued = sorted({user_id for _, user_id in resolved} - enrolled)
+    inserted = []
+    if queued:
+        inserted = db.session.execute(
+            pg_insert(Enrollment)
+            .on_conflict_do_nothing(constraint="uq_course_student")
+            .returning(Enrollment.student_id),
+            [{"course_id": course_id, "student_id": user_id} for user_id in queued],
+        ).all()
+    summary.counts["enrolled"] = len(inserted)
+    summary.counts["already_enrolled"] = len(resolved) - len(inserted)
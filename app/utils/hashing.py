@@ -0,0 +1,113 @@
+"""Password hashing on a process pool: bulk account creation, and login checks with rehash."""
+from __future__ import annotations
+
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    """Every verification slot of this process is taken."""
+
+
+def _method_of(pwhash: str) -> str:
+    return pwhash.split("$", 1)[0]
+
+
+def _hash(password: str, method: str | None) -> str:
+    return generate_password_hash(password, method=method) if method else generate_password_hash(password)
+
+
+def _verify(pwhash: str, password: str, method: str | None, current: str) -> tuple[bool, str | None]:
+    """(matches, new hash when the stored one is not ``current``); runs in a worker."""
+    if not check_password_hash(pwhash, password):
+        return False, None
+    if _method_of(pwhash) != current:
+        return True, _hash(password, method)
+    return True, None
+
+
+def _context():
+    """Start method for the pool's workers; never fork (the parent has threads)."""
+    # workers still re-import __main__ as __mp_main__; run.py skips building the app there
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("spawn")
+    context = multiprocessing.get_context("forkserver")
+    # the server imports werkzeug and the hash functions once instead of __main__
+    context.set_forkserver_preload([__name__])
+    return context
+
+
+class PasswordHasher:
+    def __init__(self, workers: int | None = None, min_parallel: int = 8):
+        self.workers = workers or os.cpu_count() or 1
+        self.min_parallel = min_parallel
+        self.method: str | None = None  # None: werkzeug's default
+        self.max_inflight = self.workers * 4
+        self.wait = 0.0
+        self._slots = threading.BoundedSemaphore(self.max_inflight)
+        self._current: str | None = None
+        self._pool: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app) -> None:
+        self.workers = int(app.config.get("PASSWORD_HASH_WORKERS") or os.cpu_count() or 1)
+        self.min_parallel = int(app.config.get("PASSWORD_HASH_MIN_PARALLEL", 8))
+        self.method = app.config.get("PASSWORD_HASH_METHOD") or None
+        self.max_inflight = int(app.config.get("PASSWORD_VERIFY_MAX_INFLIGHT") or self.workers * 4)
+        self.wait = float(app.config.get("PASSWORD_VERIFY_WAIT_SEC", 0))
+        self._slots = threading.BoundedSemaphore(self.max_inflight)
+        self._current = None
+
+    @property
+    def current_method(self) -> str:
+        """The configured method with its parameters spelled out, as stored in a hash."""
+        if self._current is None:
+            self._current = _method_of(_hash("", self.method))
+        return self._current
+
+    def hash(self, password: str) -> str:
+        """One hash on the calling thread (single account changes)."""
+        return _hash(password, self.method)
+
+    def hash_many(self, passwords: Iterable[str]) -> list[str]:
+        """Hash every password, in order; small batches are not worth the pool round trip."""
+        passwords = list(passwords)
+        if self.workers <= 1 or len(passwords) < self.min_parallel:
+            return [self.hash(p) for p in passwords]
+
+        # a few chunks per worker: cheap to ship, and no worker idles at the tail
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        fn = functools.partial(_hash, method=self.method)
+        return list(self._executor().map(fn, passwords, chunksize=chunksize))
+
+    def verify(self, pwhash: str, password: str) -> tuple[bool, str | None]:
+        """Check ``password`` on the pool; returns (matches, rehash or None).
+
+        Raises ``HasherBusy`` when no slot frees up within ``wait`` seconds.
+        """
+        acquired = self._slots.acquire(timeout=self.wait) if self.wait > 0 else self._slots.acquire(blocking=False)
+        if not acquired:
+            raise HasherBusy()
+        try:
+            future = self._executor().submit(_verify, pwhash, password, self.method, self.current_method)
+            return future.result()
+        finally:
+            self._slots.release()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=_context())
+            return self._pool
@@ -0,0 +1,69 @@
+"""Background CSV enrollment imports (``POST /enrollments/import?async=1``)."""
+from __future__ import annotations
+
+import csv
+import io
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class ImportJobRunner:
+    def __init__(self, workers: int = 2):
+        self.workers = workers
+        self._app = None
+        self._pool: ThreadPoolExecutor | None = None
+
+    def init_app(self, app) -> None:
+        self._app = app
+        self.workers = int(app.config.get("IMPORT_JOB_WORKERS", 2))
+
+    def submit(self, course_id: int, user_id: int, text: str):
+        """Record a queued job (committed) and start it; returns the ImportJob."""
+        from ..extensions import db
+        from ..models import ImportJob
+
+        job = ImportJob(course_id=course_id, created_by=user_id, status=QUEUED)
+        db.session.add(job)
+        db.session.commit()
+
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="import-job")
+        self._pool.submit(self._run, job.id, course_id, text)
+        return job
+
+    def _run(self, job_id: int, course_id: int, text: str) -> None:
+        from ..extensions import db, roster_cache
+        from ..models import ImportJob
+        from .enrollment_import import import_students
+
+        with self._app.app_context():
+            try:
+                # a job whose process dies from here on stays "running" with nothing committed;
+                # re-submitting the file is safe
+                db.session.get(ImportJob, job_id).status = RUNNING
+                db.session.commit()
+
+                summary = import_students(course_id, csv.DictReader(io.StringIO(text, newline="")))
+                if summary["enrolled"]:
+                    roster_cache.bump(course_id)
+
+                job = db.session.get(ImportJob, job_id)
+                job.status = DONE
+                job.summary = summary
+                job.finished_at = datetime.now(timezone.utc)
+                db.session.commit()
+                roster_cache.invalidate(course_id)
+            except Exception as exc:
+                db.session.rollback()
+                self._app.logger.exception("import job %s failed", job_id)
+                job = db.session.get(ImportJob, job_id)
+                if job is not None:
+                    job.status = FAILED
+                    job.error = str(exc)[:1000]
+                    job.finished_at = datetime.now(timezone.utc)
+                    db.session.commit()
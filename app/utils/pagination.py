@@ -0,0 +1,70 @@
+"""Keyset (cursor) pagination for list endpoints; a cursor is the sort key of the last row returned."""
+from __future__ import annotations
+
+import base64
+import json
+from datetime import date
+
+from flask import current_app
+
+
+def encode_cursor(*key) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(",", ":")).encode()).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, arity: int = 1):
+    """Returns the key tuple, or None if the cursor is malformed."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        return None
+    if not isinstance(key, list) or len(key) != arity:
+        return None
+    return tuple(key)
+
+
+def page_args(args, arity: int = 1):
+    """Parse ``limit`` and ``cursor`` query args.
+
+    Returns ((limit, key or None), None) or (None, (body, code)).
+    """
+    default = current_app.config["PAGE_DEFAULT_LIMIT"]
+    maximum = current_app.config["PAGE_MAX_LIMIT"]
+
+    limit = args.get("limit", default, type=int)
+    if limit is None or not (1 <= limit <= maximum):
+        return None, ({"error": f"limit must be between 1 and {maximum}"}, 400)
+
+    key = None
+    cursor = args.get("cursor")
+    if cursor:
+        key = decode_cursor(cursor, arity)
+        if key is None:
+            return None, ({"error": "invalid cursor"}, 400)
+    return (limit, key), None
+
+
+def paginate(rows: list, limit: int, key) -> tuple[list, str | None]:
+    """Trim a ``limit + 1`` fetch to one page and build the next cursor from ``key(row)``."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
+
+
+def parse_bool(value: str | None):
+    """'true'/'false' (also 1/0, yes/no) -> bool; None when absent; raises ValueError otherwise."""
+    if value is None or value == "":
+        return None
+    v = value.strip().lower()
+    if v in ("1", "true", "yes"):
+        return True
+    if v in ("0", "false", "no"):
+        return False
+    raise ValueError(value)
+
+
+def parse_date(value: str | None):
+    if not value:
+        return None
+    return date.fromisoformat(value)
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import threading
+import time
+
+
+def start_periodic(app, name: str, interval: float, fn) -> threading.Thread | None:
+    """Run ``fn()`` every ``interval`` seconds in a daemon thread, inside an app context.
+
+    A non-positive interval disables the job. Errors are logged and the loop
+    keeps going; jobs must be safe to run on several processes at once.
+    """
+    if not interval or interval <= 0:
+        return None
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    fn()
+                except Exception:
+                    app.logger.exception("periodic job %s failed", name)
+                    from ..extensions import db
+                    db.session.rollback()
+
+    thread = threading.Thread(target=loop, name=name, daemon=True)
+    thread.start()
+    return thread
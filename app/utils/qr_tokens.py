@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+from datetime import datetime, timezone
+
+from .session_cache import CachedSession
+
+PREFIX = "v1"
+
+# payload: v1.<session>.<course>.<teacher>.<starts>.<ends>.<lat_e6>.<lng_e6>.<radius>.<slice>.<sig>
+_FIELDS = 11
+
+
+def signing_key(config) -> bytes:
+    return (config.get("QR_SIGNING_KEY") or config["SECRET_KEY"]).encode()
+
+
+def is_signed(qr_token: str) -> bool:
+    return qr_token.startswith(PREFIX + ".")
+
+
+def time_slice(at: datetime, rotate_sec: int) -> int:
+    return int(at.timestamp()) // rotate_sec
+
+
+def _sign(key: bytes, message: str) -> str:
+    digest = hmac.new(key, message.encode(), hashlib.sha256).digest()[:16]
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def sign(session, key: bytes, at: datetime, rotate_sec: int) -> str:
+    """Signed QR payload for ``session`` valid during the time slice containing ``at``.
+
+    The session parameters check-in needs are embedded so it can verify a
+    scan without reading the database.
+    """
+    message = ".".join(str(v) for v in (
+        PREFIX,
+        session.id,
+        session.course_id,
+        session.teacher_id,
+        int(session.starts_at.timestamp()),
+        int(session.ends_at.timestamp()),
+        round(session.lat * 1e6),
+        round(session.lng * 1e6),
+        session.radius_m,
+        time_slice(at, rotate_sec),
+    ))
+    return f"{message}.{_sign(key, message)}"
+
+
+def verify(payload: str, key: bytes, at: datetime, rotate_sec: int, grace_slices: int = 1):
+    """Returns (CachedSession, None) or (None, error message).
+
+    A payload is fresh if its slice is the one containing ``at`` or one of
+    the ``grace_slices`` before it.
+    """
+    parts = payload.split(".")
+    if len(parts) != _FIELDS or parts[0] != PREFIX:
+        return None, "invalid qr_token"
+
+    message, sig = ".".join(parts[:-1]), parts[-1]
+    if not hmac.compare_digest(_sign(key, message), sig):
+        return None, "invalid qr_token"
+
+    try:
+        session_id, course_id, teacher_id, starts, ends, lat_e6, lng_e6, radius_m, slice_ = (
+            int(p) for p in parts[1:-1]
+        )
+    except ValueError:
+        return None, "invalid qr_token"
+
+    current = time_slice(at, rotate_sec)
+    if not (current - grace_slices <= slice_ <= current):
+        return None, "qr code expired"
+
+    return CachedSession(
+        id=session_id,
+        course_id=course_id,
+        teacher_id=teacher_id,
+        qr_token=None,
+        starts_at=datetime.fromtimestamp(starts, timezone.utc),
+        ends_at=datetime.fromtimestamp(ends, timezone.utc),
+        lat=lat_e6 / 1e6,
+        lng=lng_e6 / 1e6,
+        radius_m=radius_m,
+        is_active=True,
+    ), None
+
+
+def issued_at(payload: str, rotate_sec: int) -> datetime:
+    """Start of the time slice a verified payload was signed for: it can't be scanned earlier."""
+    return datetime.fromtimestamp(int(payload.split(".")[-2]) * rotate_sec, timezone.utc)
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from .cache import TTLCache
+
+
+class RevocationChecker:
+    """In-process set of revoked JTIs, synced incrementally from ``token_blocklist``.
+
+    Every ``sync_interval`` seconds at most one request pulls the rows whose
+    ``revoked_at`` is past the watermark (minus ``overlap``, to cover commits
+    that land out of order or node clock skew). All other lookups are plain
+    set membership. Logouts in this process are visible immediately; logouts
+    on other workers after at most ``sync_interval``. Entries are forgotten
+    once the token they revoke has expired.
+
+    Tokens also carry the user's ``token_version`` ("tv" claim); bumping
+    ``User.token_version`` revokes all of them at once. A user's version is
+    read once and then cached for as long as a token can live; the same sync
+    pulls the bumps made since its last run (``token_version_bumped_at``
+    watermark), so bumps on other workers show up with the same delay as
+    logouts.
+    """
+
+    def __init__(self, sync_interval: float = 2.0, overlap: float = 30.0):
+        self.sync_interval = sync_interval
+        self.overlap = timedelta(seconds=overlap)
+        self._jtis: dict[str, float | None] = {}  # jti -> token exp (epoch seconds)
+        self._watermark = None
+        self._synced_at = float("-inf")
+        self._expired_at = time.time()
+        self._sync_lock = threading.Lock()
+        self._versions = TTLCache(maxsize=10_000, ttl=900)
+        # versions loaded from here on are current as of their load; later bumps arrive by sync
+        self._bumps_watermark = datetime.now(timezone.utc)
+
+    def init_app(self, app) -> None:
+        self.sync_interval = float(app.config.get("REVOCATION_SYNC_SEC", 2))
+        self.overlap = timedelta(seconds=float(app.config.get("REVOCATION_SYNC_OVERLAP_SEC", 30)))
+        lifetime = max(app.config["JWT_ACCESS_TOKEN_EXPIRES"], app.config["JWT_REFRESH_TOKEN_EXPIRES"])
+        self._versions.configure(
+            maxsize=app.config.get("TOKEN_VERSION_CACHE_SIZE", 10_000),
+            ttl=float(app.config.get("TOKEN_VERSION_TTL_SEC") or lifetime.total_seconds()),
+        )
+
+    def is_revoked(self, jti: str, sync: bool = True) -> bool:
+        if sync and self.sync_due():
+            self.sync()
+        return jti in self._jtis
+
+    def add(self, jti: str, expires_at: datetime | None = None) -> None:
+        """Record a revocation made by this process (after its commit)."""
+        self._jtis[jti] = expires_at.timestamp() if expires_at else None
+
+    # ---- per-user token_version ----
+    def cached_user_version(self, user_id: int) -> int | None:
+        return self._versions.get(user_id)
+
+    def user_version(self, user_id: int) -> int:
+        version = self._versions.get(user_id)
+        if version is None:
+            from ..extensions import db
+            from ..models import User
+
+            # a deleted user has no version to compare against; other checks handle that
+            version = db.session.query(User.token_version).filter(User.id == user_id).scalar() or 0
+            self._versions.set(user_id, version)
+        return version
+
+    def set_user_version(self, user_id: int, version: int) -> None:
+        """Record a bump made by this process (after its commit)."""
+        self._versions.set(user_id, version)
+
+    def is_superseded(self, user_id: int, token_version: int) -> bool:
+        return token_version < self.user_version(user_id)
+
+    def sync_due(self) -> bool:
+        return time.monotonic() - self._synced_at >= self.sync_interval
+
+    def sync(self) -> None:
+        # one syncing thread at a time; the others keep answering from the set,
+        # except before the first load, when the set is still empty
+        first = self._synced_at == float("-inf")
+        if not self._sync_lock.acquire(blocking=first):
+            return
+        try:
+            if first and not self.sync_due():
+                return  # loaded by the thread we waited for
+            from ..extensions import db
+            from ..models import TokenBlocklist, User
+
+            q = db.session.query(TokenBlocklist.jti, TokenBlocklist.revoked_at, TokenBlocklist.expires_at)
+            if self._watermark is not None:
+                q = q.filter(TokenBlocklist.revoked_at > self._watermark - self.overlap)
+
+            now = time.time()
+            watermark = self._watermark
+            for jti, revoked_at, expires_at in q:
+                exp = expires_at.timestamp() if expires_at else None
+                if exp is None or exp > now:
+                    self._jtis[jti] = exp
+                if watermark is None or revoked_at > watermark:
+                    watermark = revoked_at
+
+            # an expired token is rejected by its exp anyway; stop remembering it
+            if now - self._expired_at >= 60:
+                self._jtis = {j: e for j, e in self._jtis.items() if e is None or e > now}
+                self._expired_at = now
+
+            # "log out everywhere" on other workers: refresh the versions we hold
+            bumps_watermark = self._bumps_watermark
+            bumps = db.session.query(User.id, User.token_version, User.token_version_bumped_at).filter(
+                User.token_version_bumped_at > self._bumps_watermark - self.overlap
+            )
+            for user_id, version, bumped_at in bumps:
+                cached = self._versions.get(user_id)
+                if cached is not None and version > cached:
+                    self._versions.set(user_id, version)
+                bumps_watermark = max(bumps_watermark, bumped_at)
+
+            self._watermark = watermark
+            self._bumps_watermark = bumps_watermark
+            self._synced_at = time.monotonic()
+        finally:
+            self._sync_lock.release()
+
+    def clear(self) -> None:
+        self._jtis = {}
+        self._versions.clear()
+        self._watermark = None
+        self._bumps_watermark = datetime.now(timezone.utc)
+        self._synced_at = float("-inf")
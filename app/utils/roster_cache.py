@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import NamedTuple
+
+from sqlalchemy import update
+
+from .cache import TTLCache
+
+
+class RosterEntry(NamedTuple):
+    id: int
+    full_name: str
+    email: str
+
+
+@dataclass(frozen=True)
+class Roster:
+    course_id: int
+    version: int
+    student_ids: frozenset[int]
+    students: tuple[RosterEntry, ...]  # ordered by full_name
+
+    def __contains__(self, student_id: int) -> bool:
+        return student_id in self.student_ids
+
+    def __len__(self) -> int:
+        return len(self.students)
+
+
+class RosterCache:
+    """Per-course enrolled-student roster, keyed by ``Course.roster_version``.
+
+    Callers that already hold the Course row pass its ``roster_version`` and
+    always get a current roster. Callers that don't (check-in) get whatever
+    is cached, bounded by the TTL.
+    """
+
+    def __init__(self, maxsize: int = 512, ttl: float = 300.0):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def init_app(self, app) -> None:
+        self._cache.configure(
+            maxsize=app.config.get("ROSTER_CACHE_SIZE", 512),
+            ttl=app.config.get("ROSTER_CACHE_TTL_SEC", 300),
+        )
+
+    def get(self, course_id: int, version: int | None = None, fresh: bool = False) -> Roster:
+        """Return the roster of ``course_id``.
+
+        ``fresh=True`` looks up the current version first, so a stale entry
+        is reloaded even when the caller doesn't know the version.
+        """
+        if fresh and version is None:
+            version = self._current_version(course_id)
+
+        roster = self._cache.get(course_id)
+        if roster is not None and (version is None or roster.version == version):
+            return roster
+
+        roster = self._load(course_id, version)
+        self._cache.set(course_id, roster)
+        return roster
+
+    def peek(self, course_id: int) -> Roster | None:
+        """Cached roster without touching the database (None on a miss)."""
+        return self._cache.get(course_id)
+
+    def bump(self, *course_ids: int) -> None:
+        """Bump ``roster_version`` inside the caller's transaction."""
+        from ..extensions import db
+        from ..models import Course
+
+        ids = sorted({int(c) for c in course_ids})
+        if not ids:
+            return
+        db.session.execute(
+            update(Course)
+            .where(Course.id.in_(ids))
+            .values(roster_version=Course.roster_version + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+    def invalidate(self, *course_ids: int) -> None:
+        """Drop local entries; call after the bumping transaction commits."""
+        for course_id in course_ids:
+            self._cache.pop(course_id)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def _current_version(self, course_id: int) -> int:
+        from ..extensions import db
+        from ..models import Course
+
+        return db.session.query(Course.roster_version).filter(Course.id == course_id).scalar() or 0
+
+    def _load(self, course_id: int, version: int | None) -> Roster:
+        from ..extensions import db
+        from ..models import Enrollment, User
+
+        # read the version before the rows: a concurrent bump can only make
+        # the rows newer than the version, which the next lookup corrects
+        if version is None:
+            version = self._current_version(course_id)
+
+        rows = (
+            db.session.query(User.id, User.full_name, User.email)
+            .join(Enrollment, Enrollment.student_id == User.id)
+            .filter(Enrollment.course_id == course_id)
+            .order_by(User.full_name.asc(), User.id.asc())
+            .all()
+        )
+        students = tuple(RosterEntry(r.id, r.full_name, r.email) for r in rows)
+        return Roster(
+            course_id=course_id,
+            version=version,
+            student_ids=frozenset(s.id for s in students),
+            students=students,
+        )
@@ -0,0 +1,166 @@
+"""Department- and institution-wide eligibility for one semester, from one grouped query."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from sqlalchemy import func, select, tuple_
+
+from .cache import TTLCache
+from .course_stats import ELIGIBILITY_PCT
+
+UNASSIGNED = "unassigned"
+
+
+@dataclass(frozen=True)
+class GroupStats:
+    courses: int
+    students: int
+    enrollments: int
+    eligible: int
+    avg_pct: float
+
+    def to_dict(self) -> dict:
+        return {
+            "courses": self.courses,
+            "students": self.students,
+            "enrollments": self.enrollments,
+            "eligible": self.eligible,
+            "not_eligible": self.enrollments - self.eligible,
+            "eligible_rate_pct": round(self.eligible * 100.0 / self.enrollments, 2) if self.enrollments else 0.0,
+            "avg_attendance_pct": self.avg_pct,
+        }
+
+
+EMPTY = GroupStats(0, 0, 0, 0, 0.0)
+
+
+@dataclass(frozen=True)
+class SemesterStats:
+    semester: str
+    key: tuple[int, ...]
+    total: GroupStats
+    departments: dict[str, GroupStats]
+    year_levels: dict[tuple[str, int | None], GroupStats]  # (department, year_level)
+
+    def department_report(self) -> list[dict]:
+        out = []
+        for department in sorted(self.departments, key=lambda d: (d == UNASSIGNED, d)):
+            levels = sorted(
+                (year for dep, year in self.year_levels if dep == department),
+                key=lambda y: (y is None, y or 0),
+            )
+            out.append({
+                "department": department,
+                **self.departments[department].to_dict(),
+                "year_levels": [
+                    {"year_level": year, **self.year_levels[(department, year)].to_dict()} for year in levels
+                ],
+            })
+        return out
+
+    def institution_report(self) -> dict:
+        return {**self.total.to_dict(), "departments": len(self.departments)}
+
+
+class SemesterStatsCache:
+    def __init__(self, maxsize: int = 32, ttl: float = 300.0):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def init_app(self, app) -> None:
+        self._cache.configure(
+            maxsize=app.config.get("SEMESTER_STATS_CACHE_SIZE", 32),
+            ttl=app.config.get("SEMESTER_STATS_TTL_SEC", 300),
+        )
+
+    def fingerprint(self, semester: str) -> tuple[int, ...]:
+        """Changes whenever a course of the semester, its records, roster or plan change.
+
+        The version counters only grow; the id sum and max catch a course
+        deleted and another created in its place. Profile edits (department,
+        year_level) are not versioned; the TTL bounds how long they take to show.
+        """
+        from ..extensions import db
+        from ..models import Course
+
+        row = (
+            db.session.query(
+                func.count(Course.id),
+                func.coalesce(func.sum(Course.id), 0),
+                func.coalesce(func.max(Course.id), 0),
+                func.coalesce(func.sum(Course.attendance_version), 0),
+                func.coalesce(func.sum(Course.roster_version), 0),
+                func.coalesce(func.sum(Course.planned_sessions), 0),
+            )
+            .filter(Course.semester == semester)
+            .one()
+        )
+        return tuple(int(v) for v in row)
+
+    def get(self, semester: str, key: tuple | None = None) -> SemesterStats:
+        key = key or self.fingerprint(semester)
+        stats = self._cache.get(semester)
+        if stats is None or stats.key != key:
+            stats = self._compute(semester, key)
+            self._cache.set(semester, stats)
+        return stats
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    @staticmethod
+    def _compute(semester: str, key) -> SemesterStats:
+        from ..extensions import db
+        from ..models import Course, Student
+        from .attendance_stats import enrollment_attendance, pct_expr
+
+        ea = enrollment_attendance(Course.semester == semester)
+        per_enrollment = (
+            select(
+                ea.c.course_id,
+                ea.c.student_id,
+                func.coalesce(Student.department, UNASSIGNED).label("department"),
+                Student.year_level.label("year_level"),
+                # same rounding as course_stats.attendance_pct, so both agree on eligibility
+                pct_expr(ea.c.attended, ea.c.planned).label("pct"),
+            )
+            .outerjoin(Student, Student.user_id == ea.c.student_id)
+            .cte("per_enrollment")
+        )
+
+        e = per_enrollment.c
+        level = func.grouping(e.department, e.year_level)  # 0: (dept, year), 1: dept, 3: everything
+        grouped = (
+            select(
+                level,
+                e.department,
+                e.year_level,
+                func.count(func.distinct(e.course_id)),
+                func.count(func.distinct(e.student_id)),
+                func.count(),
+                func.count().filter(e.pct >= ELIGIBILITY_PCT),
+                func.coalesce(func.round(func.avg(e.pct), 2), 0),
+            )
+            .group_by(func.grouping_sets(
+                tuple_(e.department, e.year_level),
+                tuple_(e.department),
+                tuple_(),
+            ))
+        )
+
+        total, departments, year_levels = EMPTY, {}, {}
+        for lvl, department, year_level, *numbers in db.session.execute(grouped):
+            group = GroupStats(*(int(n) for n in numbers[:4]), float(numbers[4]))
+            if lvl == 0:
+                year_levels[(department, year_level)] = group
+            elif lvl == 1:
+                departments[department] = group
+            else:
+                total = group
+
+        return SemesterStats(
+            semester=semester,
+            key=key,
+            total=total,
+            departments=departments,
+            year_levels=year_levels,
+        )
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from .cache import TTLCache
+
+
+def _ensure_tz(dt: datetime) -> datetime:
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+@dataclass(frozen=True)
+class CachedSession:
+    """Detached snapshot of the AttendanceSession columns check-in needs."""
+
+    id: int
+    course_id: int
+    teacher_id: int
+    qr_token: str | None  # None when built from a signed QR payload
+    starts_at: datetime
+    ends_at: datetime
+    lat: float
+    lng: float
+    radius_m: int
+    is_active: bool
+
+    @classmethod
+    def from_model(cls, session) -> "CachedSession":
+        return cls(
+            id=session.id,
+            course_id=session.course_id,
+            teacher_id=session.teacher_id,
+            qr_token=session.qr_token,
+            starts_at=_ensure_tz(session.starts_at),
+            ends_at=_ensure_tz(session.ends_at),
+            lat=session.lat,
+            lng=session.lng,
+            radius_m=session.radius_m,
+            is_active=session.is_active,
+        )
+
+    def is_open(self, now: datetime) -> bool:
+        return self.is_active and self.starts_at <= now <= self.ends_at
+
+
+class ActiveSessionCache:
+    """Process-local cache of open attendance sessions, by ``qr_token`` and by id.
+
+    Only active sessions are stored. An entry never outlives its session's
+    ``ends_at``, and the TTL bounds how long another worker's close can go
+    unnoticed here. Sessions closed by this process are remembered for a
+    while so signed QR payloads for them can be refused without a lookup.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self._by_token = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._by_id = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._closed = TTLCache(maxsize=maxsize * 4, ttl=3600)
+
+    def init_app(self, app) -> None:
+        maxsize = app.config.get("SESSION_CACHE_SIZE", 1024)
+        ttl = app.config.get("SESSION_CACHE_TTL_SEC", 60)
+        self._by_token.configure(maxsize=maxsize, ttl=ttl)
+        self._by_id.configure(maxsize=maxsize, ttl=ttl)
+        self._closed.configure(maxsize=maxsize * 4)
+
+    def get(self, qr_token: str) -> CachedSession | None:
+        return self._by_token.get(qr_token)
+
+    def get_by_id(self, session_id: int) -> CachedSession | None:
+        return self._by_id.get(session_id)
+
+    def is_closed(self, session_id: int) -> bool:
+        return self._closed.get(session_id, False)
+
+    def put(self, session) -> CachedSession:
+        """Snapshot ``session`` and cache it if it's still open."""
+        snap = session if isinstance(session, CachedSession) else CachedSession.from_model(session)
+        if snap.is_active and snap.qr_token:
+            remaining = (snap.ends_at - datetime.now(timezone.utc)).total_seconds()
+            ttl = min(self._by_token.ttl, remaining)
+            self._by_token.set(snap.qr_token, snap, ttl=ttl)
+            self._by_id.set(snap.id, snap, ttl=ttl)
+        return snap
+
+    def drop(self, session_id: int) -> None:
+        """Forget a session that was closed or expired."""
+        snap = self._by_id.pop(session_id)
+        if snap is not None:
+            self._by_token.pop(snap.qr_token)
+        else:
+            self._by_token.pop_where(lambda s: s.id == session_id)
+        self._closed.set(session_id, True)
+
+    def drop_course(self, course_id: int) -> None:
+        self._by_token.pop_where(lambda s: s.course_id == course_id)
+        self._by_id.pop_where(lambda s: s.course_id == course_id)
+
+    def clear(self) -> None:
+        self._by_token.clear()
+        self._by_id.clear()
+        self._closed.clear()
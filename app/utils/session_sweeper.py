@@ -0,0 +1,87 @@
+"""Close sessions whose attendance window has ended (`flask sessions sweep`, run from cron).
+
+Batches are claimed with ``FOR UPDATE SKIP LOCKED``, so overlapping sweeps
+never wait on or double-mark each other.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Sequence
+
+from sqlalchemy import select, update
+
+from ..extensions import checkin_journal, course_stats, db, session_cache
+from ..models import AttendanceSession
+from . import attendance_stats
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def close_sessions(sessions: Sequence, ends_at: datetime | None = None) -> int:
+    """Close locked (id, course_id) rows in the caller's transaction; returns absentees marked.
+
+    ``ends_at`` cuts the window short (a session replaced early); the sweeper
+    leaves the scheduled end as it was. Callers flush ``checkin_journal``
+    before locking the sessions, so this worker's pending check-ins are not
+    marked absent; the flush's inserts would wait on the lock. Lock with
+    ``key_share=True`` (FOR NO KEY UPDATE) so other workers' flushes can
+    still insert records for the session.
+    """
+    if not sessions:
+        return 0
+
+    marked = 0
+    for s in sessions:
+        marked += attendance_stats.mark_absent(s.id, s.course_id)
+
+    values = {"is_active": False}
+    if ends_at is not None:
+        values["ends_at"] = ends_at
+    db.session.execute(
+        update(AttendanceSession)
+        .where(AttendanceSession.id.in_([s.id for s in sessions]))
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    course_stats.bump(*(s.course_id for s in sessions))
+    return marked
+
+
+def sweep_expired(batch_size: int = 100, grace_sec: float = 30, now: datetime | None = None) -> dict:
+    """Close every open session that ended more than ``grace_sec`` ago.
+
+    The grace period lets check-ins accepted just before the end (and other
+    workers' write-behind journals) land before absentees are decided.
+    """
+    now = now or _utc_now()
+    cutoff = now - timedelta(seconds=grace_sec)
+
+    # this worker's journaled check-ins first, like close_session
+    checkin_journal.flush()
+
+    claim = (
+        select(AttendanceSession.id, AttendanceSession.course_id)
+        .where(AttendanceSession.is_active.is_(True))
+        .where(AttendanceSession.ends_at < cutoff)
+        .order_by(AttendanceSession.ends_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True, key_share=True)
+    )
+
+    closed = marked = 0
+    while True:
+        batch = db.session.execute(claim).all()
+        if not batch:
+            break
+        marked += close_sessions(batch)
+        db.session.commit()
+
+        for s in batch:
+            session_cache.drop(s.id)
+        closed += len(batch)
+        if len(batch) < batch_size:
+            break
+
+    return {"closed": closed, "marked_absent": marked}
@@ -0,0 +1,98 @@
+"""Streamed JSON responses for large collections (``?stream=1``), and CSV exports."""
+from __future__ import annotations
+
+import csv
+import io
+from typing import Callable, Iterable, Iterator, Sequence
+
+from flask import Response, current_app, request, stream_with_context
+
+from .pagination import parse_bool
+
+
+def wants_stream() -> bool:
+    try:
+        return bool(parse_bool(request.args.get("stream")))
+    except ValueError:
+        return False
+
+
+def chunk_rows() -> int:
+    return current_app.config["STREAM_CHUNK_ROWS"]
+
+
+def query_rows(q) -> Iterator:
+    """Rows of ``q``, fetched ``yield_per`` while the response body is written.
+
+    By then the view's session has been closed by request teardown; the rows
+    are read in a fresh one, which the streamed body's own teardown closes.
+    """
+    from ..extensions import db
+
+    yield from q.with_session(db.session()).yield_per(chunk_rows())
+
+
+def stream_json(head: dict, items: Iterable, tail: Callable[[], dict] | None = None,
+                key: str = "items") -> Response:
+    """``{**head, key: [*items], **tail()}`` as a chunked response.
+
+    ``tail`` is called after the last item, so it can report totals that
+    were accumulated while the items were generated.
+    """
+    dumps = current_app.json.dumps
+    chunk = chunk_rows()
+
+    def generate():
+        opening = dumps(head)[:-1]
+        yield f'{opening}{"," if head else ""}{dumps(key)}:['
+
+        buf, first = [], True
+        for item in items:
+            buf.append(dumps(item))
+            if len(buf) >= chunk:
+                yield ("" if first else ",") + ",".join(buf)
+                buf, first = [], False
+        if buf:
+            yield ("" if first else ",") + ",".join(buf)
+        yield "]"
+
+        extra = tail() if tail else None
+        if extra:
+            yield "," + dumps(extra)[1:-1]
+        yield "}"
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
+
+
+def _csv_cell(value):
+    # spreadsheets run cells starting with these as formulas; names come from user input
+    if isinstance(value, str) and value[:1] in ("=", "+", "-", "@"):
+        return "'" + value
+    return "" if value is None else value
+
+
+def stream_csv(header: Sequence, rows: Iterable[Sequence], filename: str) -> Response:
+    """A chunked ``text/csv`` attachment; ``rows`` is consumed lazily."""
+    chunk = chunk_rows()
+
+    def generate():
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow([_csv_cell(v) for v in header])
+
+        n = 0
+        for row in rows:
+            writer.writerow([_csv_cell(v) for v in row])
+            n += 1
+            if n >= chunk:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+                n = 0
+        yield buf.getvalue()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
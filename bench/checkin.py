@@ -0,0 +1,102 @@
+"""Lecture-start check-in spike: WSGI route vs the ASGI endpoint.
+
+Mints access tokens for every student enrolled in the session's course and
+fires one check-in per student at each target, ``--concurrency`` at a time.
+Run it against a disposable database: ``--reset`` deletes the session's
+attendance records before each target.
+
+    gunicorn -w 4 run:app -b :8000 &
+    uvicorn app.asgi:application --workers 1 --port 8001 &
+    python -m bench.checkin --qr-token <token> --lat 31.95 --lng 35.91 \\
+        --target wsgi=http://localhost:8000 --target asgi=http://localhost:8001 --reset
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from app.extensions import db
+from app.models import AttendanceRecord, AttendanceSession, Enrollment
+
+PATH = "/api/attendance/checkin"
+
+
+def _tokens(qr_token: str, limit: int | None) -> tuple[int, list[str]]:
+    session = AttendanceSession.query.filter_by(qr_token=qr_token).first()
+    if session is None:
+        raise SystemExit("unknown qr_token")
+    q = db.session.query(Enrollment.student_id).filter_by(course_id=session.course_id).order_by(Enrollment.id)
+    if limit:
+        q = q.limit(limit)
+    tokens = [
+        create_access_token(identity=str(sid), additional_claims={"role": "student"})
+        for (sid,) in q
+    ]
+    return session.id, tokens
+
+
+def _fire(base_url: str, token: str, body: bytes) -> tuple[int, float]:
+    url = urlsplit(base_url)
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+    t0 = time.perf_counter()
+    conn.request("POST", PATH, body=body, headers={
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json",
+    })
+    status = conn.getresponse().status
+    elapsed = time.perf_counter() - t0
+    conn.close()
+    return status, elapsed
+
+
+def _run(name: str, base_url: str, tokens: list[str], body: bytes, concurrency: int) -> None:
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda tok: _fire(base_url, tok, body), tokens))
+    wall = time.perf_counter() - t0
+
+    latencies = sorted(r[1] * 1000 for r in results)
+    q = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    codes = Counter(r[0] for r in results)
+    print(
+        f"{name:>6}: {len(results)} req in {wall:.2f}s = {len(results) / wall:7.1f} req/s | "
+        f"p50 {q[49]:6.1f} ms  p95 {q[94]:6.1f} ms  p99 {q[98]:6.1f} ms | {dict(codes)}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--qr-token", required=True)
+    parser.add_argument("--lat", type=float, required=True)
+    parser.add_argument("--lng", type=float, required=True)
+    parser.add_argument("--target", action="append", required=True, help="name=base_url, repeatable")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--students", type=int, default=None, help="cap on enrolled students used")
+    parser.add_argument("--reset", action="store_true", help="delete the session's records before each target")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        session_id, tokens = _tokens(args.qr_token, args.students)
+    body = json.dumps({"qr_token": args.qr_token, "lat": args.lat, "lng": args.lng}).encode()
+
+    for target in args.target:
+        name, _, base_url = target.partition("=")
+        if args.reset:
+            with app.app_context():
+                AttendanceRecord.query.filter_by(session_id=session_id).delete()
+                db.session.commit()
+        _run(name, base_url, tokens, body, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
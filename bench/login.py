@@ -0,0 +1,97 @@
+"""Login storm: POST /auth/login throughput per password hash method.
+
+For every ``--method`` it stores ``--users`` throwaway students hashed with
+that method, then logs each of them in once, ``--concurrency`` at a time,
+through the Flask test client (threads in this process, hashes on the
+password pool). 503s show how many logins the in-flight limit turned away.
+The throwaway users are deleted afterwards; still, use a disposable database.
+
+    python -m bench.login --users 200 --concurrency 32 \\
+        --method pbkdf2:sha256:600000 --method scrypt:16384:8:1 --method scrypt:32768:8:1
+
+``--wait 30`` queues instead of shedding, which measures raw throughput.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from app import create_app
+from app.extensions import db, password_hasher
+from app.models import User, UserRole
+
+PATH = "/api/auth/login"
+PASSWORD = "bench-password"
+
+
+def _email(i: int) -> str:
+    return f"bench-login-{i}@example.invalid"
+
+
+def _seed(count: int) -> None:
+    User.query.filter(User.email.like("bench-login-%@example.invalid")).delete(synchronize_session=False)
+    hashes = password_hasher.hash_many([PASSWORD] * count)
+    db.session.add_all(
+        User(full_name=f"Bench {i}", email=_email(i), role=UserRole.student, password_hash=h)
+        for i, h in enumerate(hashes)
+    )
+    db.session.commit()
+
+
+def _run(app, name: str, count: int, concurrency: int) -> None:
+    def fire(i: int) -> tuple[int, float]:
+        body = json.dumps({"email": _email(i), "password": PASSWORD})
+        t0 = time.perf_counter()
+        status = app.test_client().post(PATH, data=body, content_type="application/json").status_code
+        return status, time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(fire, range(count)))
+    wall = time.perf_counter() - t0
+
+    latencies = sorted(r[1] * 1000 for r in results)
+    q = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    codes = Counter(r[0] for r in results)
+    print(
+        f"{name:>22}: {len(results)} req in {wall:.2f}s = {codes[200] / wall:7.1f} logins/s | "
+        f"p50 {q[49]:7.1f} ms  p95 {q[94]:7.1f} ms | {dict(codes)}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--method", action="append", help="werkzeug hash method, repeatable (default: configured)")
+    parser.add_argument("--max-inflight", type=int, help="override PASSWORD_VERIFY_MAX_INFLIGHT")
+    parser.add_argument("--wait", type=float, help="override PASSWORD_VERIFY_WAIT_SEC (queue instead of 503)")
+    args = parser.parse_args()
+
+    app = create_app()
+    if args.max_inflight:
+        app.config["PASSWORD_VERIFY_MAX_INFLIGHT"] = args.max_inflight
+    if args.wait is not None:
+        app.config["PASSWORD_VERIFY_WAIT_SEC"] = args.wait
+    password_hasher.init_app(app)
+    print(f"password pool: {password_hasher.workers} workers, {password_hasher.max_inflight} in flight")
+
+    with app.app_context():
+        try:
+            for method in args.method or [app.config.get("PASSWORD_HASH_METHOD")]:
+                app.config["PASSWORD_HASH_METHOD"] = method
+                password_hasher.init_app(app)
+                _seed(args.users)
+                _run(app, password_hasher.current_method, args.users, args.concurrency)
+        finally:
+            User.query.filter(User.email.like("bench-login-%@example.invalid")).delete(synchronize_session=False)
+            db.session.commit()
+            password_hasher.shutdown()
+
+
+if __name__ == "__main__":
+    main()
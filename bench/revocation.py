@@ -0,0 +1,66 @@
+"""Per-request cost of the JWT revocation check: DB query vs in-process set.
+
+Runs in-process with the Flask test client against the configured database,
+timing the same GET endpoints with the old per-request blocklist query
+swapped in and with the synced ``revocation_checker``.
+
+    python -m bench.revocation --user-id 1 --role teacher -n 500
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from app.extensions import jwt, revocation_checker
+from app.models import TokenBlocklist
+
+DEFAULT_PATHS = ["/api/users/me", "/api/courses", "/api/sessions", "/api/teachers/me"]
+
+
+def _query_callback(jwt_header, jwt_payload) -> bool:
+    return TokenBlocklist.query.filter_by(jti=jwt_payload["jti"]).first() is not None
+
+
+def _checker_callback(jwt_header, jwt_payload) -> bool:
+    return revocation_checker.is_revoked(jwt_payload["jti"])
+
+
+def _time(client, path: str, headers: dict, n: int) -> float:
+    client.get(path, headers=headers)  # warm up
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        client.get(path, headers=headers)
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", required=True)
+    parser.add_argument("--role", default="teacher")
+    parser.add_argument("--path", action="append", help="GET path, repeatable")
+    parser.add_argument("-n", type=int, default=300)
+    args = parser.parse_args()
+
+    app = create_app()
+    client = app.test_client()
+    with app.app_context():
+        token = create_access_token(identity=str(args.user_id), additional_claims={"role": args.role})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    print(f"{'endpoint':<32}{'query (us)':>12}{'set (us)':>12}{'saved (us)':>12}")
+    for path in args.path or DEFAULT_PATHS:
+        jwt._token_in_blocklist_callback = _query_callback
+        before = _time(client, path, headers, args.n)
+        jwt._token_in_blocklist_callback = _checker_callback
+        after = _time(client, path, headers, args.n)
+        print(f"{path:<32}{before:>12.0f}{after:>12.0f}{before - after:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
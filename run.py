@@ -1,6 +1,8 @@
 from app import create_app
 
-app = create_app()
+# password-hash workers re-import this file as __mp_main__ (utils/hashing.py); they need no app
+if __name__ != "__mp_main__":
+    app = create_app()
 
 if __name__ == "__main__":
     app.run(debug=True)
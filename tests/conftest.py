@@ -0,0 +1,205 @@
+"""Fixtures: the app against a throwaway database on a running Postgres.
+
+The app depends on Postgres (ON CONFLICT, FOR UPDATE SKIP LOCKED, GROUPING
+SETS), so tests need a real server. pytest-postgresql's ``noproc`` fixture
+points at one; pass its address the usual way, e.g.::
+
+    pytest --postgresql-host=127.0.0.1 --postgresql-port=5432 --postgresql-user=postgres
+
+A ``attendance_test`` database is created for the run and dropped after it.
+Every test starts from empty tables and cold in-process caches.
+"""
+from __future__ import annotations
+
+import os
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from pytest_postgresql import factories
+from pytest_postgresql.janitor import DatabaseJanitor
+from sqlalchemy import event, text
+from sqlalchemy.engine import URL
+
+postgresql_server = factories.postgresql_noproc()
+
+TEST_DB = "attendance_test"
+
+
+def _database_url(pg) -> str:
+    # a host starting with "/" is a unix socket directory
+    if str(pg.host).startswith("/"):
+        return URL.create(
+            "postgresql", username=pg.user, password=pg.password or None,
+            database=TEST_DB, query={"host": pg.host, "port": str(pg.port)},
+        ).render_as_string(hide_password=False)
+    return URL.create(
+        "postgresql", username=pg.user, password=pg.password or None,
+        host=pg.host, port=int(pg.port), database=TEST_DB,
+    ).render_as_string(hide_password=False)
+
+
+@pytest.fixture(scope="session")
+def app(postgresql_server):
+    pg = postgresql_server
+    with DatabaseJanitor(user=pg.user, host=pg.host, port=pg.port, dbname=TEST_DB, password=pg.password):
+        # Config reads the environment at import time
+        os.environ.update(
+            DATABASE_URL=_database_url(pg),
+            SESSION_SWEEP_INTERVAL_SEC="0",
+            AT_RISK_REFRESH_INTERVAL_SEC="0",
+            BLOCKLIST_PRUNE_INTERVAL_SEC="0",
+            CHECKIN_WRITE_BEHIND="0",
+        )
+        from app import create_app
+        from app.extensions import db, password_hasher
+
+        app = create_app()
+        app.config["TESTING"] = True
+        with app.app_context():
+            db.create_all()
+        yield app
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        password_hasher.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def clean_state(app):
+    from app.extensions import (
+        course_stats, db, revocation_checker, roster_cache, semester_stats, session_cache,
+    )
+
+    yield
+    with app.app_context():
+        db.session.remove()
+        tables = ", ".join(t.name for t in db.metadata.sorted_tables)
+        db.session.execute(text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+        db.session.commit()
+    for cache in (session_cache, roster_cache, course_stats, semester_stats, revocation_checker):
+        cache.clear()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def queries(app):
+    """Statements sent to the database while the test runs (clear() before measuring)."""
+    from app.extensions import db
+
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(" ".join(statement.split()))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def make_user(app):
+    from app.extensions import db
+    from app.models import Student, User, UserRole
+
+    def make(role: str = "student", name: str | None = None, **profile) -> int:
+        with app.app_context():
+            n = db.session.query(User).count() + 1
+            user = User(
+                full_name=name or f"{role.title()} {n:03d}",
+                email=f"{role}{n}@example.test",
+                role=UserRole(role),
+                password_hash="!",  # tests authenticate with minted tokens
+            )
+            db.session.add(user)
+            db.session.flush()
+            if role == "student":
+                db.session.add(Student(user_id=user.id, student_no=f"S{user.id:05d}", **profile))
+            db.session.commit()
+            return user.id
+
+    return make
+
+
+@pytest.fixture
+def auth(app):
+    """user id -> Authorization header with a freshly minted access token."""
+    from app.extensions import db
+    from app.models import User
+    from app.routes.auth import issue_tokens
+
+    def headers(user_id: int) -> dict:
+        with app.app_context():
+            token = issue_tokens(db.session.get(User, user_id))["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+
+    return headers
+
+
+@pytest.fixture
+def make_course(app):
+    from app.extensions import db
+    from app.models import Course, Enrollment
+
+    def make(teacher_id: int, students=(), planned_sessions: int = 4, semester: str | None = "F26") -> int:
+        with app.app_context():
+            n = db.session.query(Course).count() + 1
+            course = Course(code=f"T{n:03d}", name=f"Course {n}", teacher_id=teacher_id,
+                            planned_sessions=planned_sessions, semester=semester)
+            db.session.add(course)
+            db.session.flush()
+            db.session.add_all(Enrollment(course_id=course.id, student_id=s) for s in students)
+            db.session.commit()
+            return course.id
+
+    return make
+
+
+@pytest.fixture
+def make_session(app):
+    """An attendance session row; open and just started unless told otherwise."""
+    from app.extensions import db
+    from app.models import AttendanceSession, Course
+
+    def make(course_id: int, *, is_active: bool = True, started_min_ago: float = 1, duration_min: float = 15,
+             lat: float = 31.95, lng: float = 35.91, radius_m: int = 50) -> int:
+        now = datetime.now(timezone.utc)
+        with app.app_context():
+            course = db.session.get(Course, course_id)
+            n = db.session.query(AttendanceSession).count() + 1
+            session = AttendanceSession(
+                course_id=course_id,
+                teacher_id=course.teacher_id,
+                session_date=date.today(),
+                starts_at=now - timedelta(minutes=started_min_ago),
+                ends_at=now - timedelta(minutes=started_min_ago) + timedelta(minutes=duration_min),
+                lat=lat, lng=lng, radius_m=radius_m,
+                is_active=is_active,
+                qr_token=f"test-qr-{n}",
+            )
+            db.session.add(session)
+            db.session.commit()
+            return session.id
+
+    return make
+
+
+@pytest.fixture
+def write_behind(app, tmp_path):
+    """Write-behind check-ins; the flusher thread idles, so only close paths and tests flush."""
+    from app.extensions import checkin_journal
+
+    app.config.update(CHECKIN_WRITE_BEHIND=True, CHECKIN_JOURNAL_DIR=str(tmp_path),
+                      CHECKIN_FLUSH_INTERVAL_MS=3_600_000)
+    checkin_journal.init_app(app)
+    yield checkin_journal
+    checkin_journal._shutdown()
+    checkin_journal.enabled = False
+    checkin_journal._queue.clear()
+    checkin_journal._pending.clear()
+    app.config.update(CHECKIN_WRITE_BEHIND=False, CHECKIN_JOURNAL_DIR=None, CHECKIN_FLUSH_INTERVAL_MS=200)
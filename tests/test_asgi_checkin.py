@@ -0,0 +1,111 @@
+"""The ASGI check-in answers like the Flask route it mirrors."""
+import asyncio
+import json
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def asgi(app):
+    from app.asgi import AsyncCheckinApp
+
+    asgi = AsyncCheckinApp(app)
+    yield asgi
+    asyncio.run(asgi.engine.dispose())
+
+
+def _call(asgi, headers: dict, body: dict, path="/api/attendance/checkin", method="POST"):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": json.dumps(body).encode(), "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    async def run():
+        scope = {
+            "type": "http", "method": method, "path": path,
+            "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        }
+        try:
+            await asgi(scope, receive, send)
+        finally:
+            await asgi.engine.dispose()  # connections belong to this event loop
+
+    asyncio.run(run())
+    return sent[0]["status"], json.loads(sent[1]["body"])
+
+
+def _flask(client, headers: dict, body: dict):
+    r = client.post("/api/attendance/checkin", headers=headers, json=body)
+    return r.status_code, r.get_json()
+
+
+@pytest.fixture
+def scene(make_user, make_course, make_session):
+    teacher = make_user("teacher")
+    students = [make_user("student") for _ in range(2)]
+    outsider = make_user("student")
+    course = make_course(teacher, students)
+    # one session per endpoint, so neither sees the other's records
+    make_session(course)
+    make_session(course)
+    return teacher, students, outsider
+
+
+HERE = {"lat": 31.95, "lng": 35.91}
+
+
+def _strip(body: dict) -> dict:
+    # ids and timestamps differ between the two calls
+    body = dict(body)
+    if "record" in body:
+        body["record"] = {k: v for k, v in body["record"].items()
+                          if k not in ("id", "session_id", "student_id", "checked_in_at")}
+    return body
+
+
+def test_checkin_and_duplicate_match_flask(client, auth, asgi, scene):
+    teacher, students, outsider = scene
+    headers = auth(students[0])
+
+    for attempt in range(2):  # 201, then 409 already checked in
+        flask = _flask(client, headers, {"qr_token": "test-qr-1", **HERE})
+        served = _call(asgi, headers, {"qr_token": "test-qr-2", **HERE})
+        assert served[0] == flask[0] == (201 if attempt == 0 else 409)
+        assert _strip(served[1]) == _strip(flask[1])
+
+
+@pytest.mark.parametrize("case, expected", [
+    ("teacher", 403),
+    ("not_enrolled", 403),
+    ("unknown_token", 404),
+    ("too_far", 403),
+    ("missing_fields", 400),
+])
+def test_rejections_match_flask(client, auth, asgi, scene, case, expected):
+    teacher, students, outsider = scene
+    headers, body = auth(students[1]), {"qr_token": "test-qr-1", **HERE}
+    if case == "teacher":
+        headers = auth(teacher)
+    elif case == "not_enrolled":
+        headers = auth(outsider)
+    elif case == "unknown_token":
+        body["qr_token"] = "nope"
+    elif case == "too_far":
+        body["lat"] = 32.5
+    elif case == "missing_fields":
+        del body["lat"]
+
+    flask = _flask(client, headers, body)
+    served = _call(asgi, headers, body)
+    assert served == flask
+    assert served[0] == expected
+
+
+def test_auth_and_routing(asgi, auth, scene):
+    teacher, students, outsider = scene
+    assert _call(asgi, {}, {})[0] == 401
+    assert _call(asgi, auth(students[0]), {}, path="/api/courses")[0] == 404
+    assert _call(asgi, auth(students[0]), {}, method="GET")[0] == 405
@@ -0,0 +1,43 @@
+from sqlalchemy import text
+
+
+def test_project_flags_unreachable_threshold(app, make_user, make_course, make_session):
+    from app.extensions import db
+    from app.models import AttendanceProjection, AttendanceRecord, AttendanceSession
+    from app.models.attendance_record import AttendanceStatus
+    from app.utils.at_risk import project
+    from app.utils.attendance_stats import increment
+    from app.utils.session_sweeper import close_sessions
+
+    teacher = make_user("teacher")
+    behind, fine = make_user("student"), make_user("student")
+    course = make_course(teacher, [behind, fine], planned_sessions=4)
+    sessions = [make_session(course) for _ in range(2)]
+
+    with app.app_context():
+        rows = [(s, fine, AttendanceStatus.present) for s in sessions]
+        db.session.add_all(AttendanceRecord(session_id=s, student_id=st, status=status) for s, st, status in rows)
+        increment(rows)
+        close_sessions(db.session.query(AttendanceSession.id, AttendanceSession.course_id).all())
+        db.session.commit()
+
+        # best case: 2 of 4 (50%) vs 4 of 4
+        assert project() == {"projected": 2, "at_risk": 1, "removed": 0}
+        flags = dict(db.session.query(AttendanceProjection.student_id, AttendanceProjection.at_risk).all())
+    assert flags == {behind: True, fine: False}
+
+
+def test_project_skips_while_another_run_holds_the_lock(app, make_user, make_course):
+    from app.extensions import db
+    from app.models import AttendanceProjection
+    from app.utils.at_risk import project
+
+    make_course(make_user("teacher"), [make_user("student")])
+
+    with app.app_context():
+        with db.engine.connect() as other:
+            other.execute(text("SELECT pg_advisory_xact_lock(hashtext('attendance_projections'))"))
+            assert project() == {"skipped": True}
+            other.rollback()
+        assert db.session.query(AttendanceProjection).count() == 0
+        assert project()["projected"] == 1
@@ -0,0 +1,72 @@
+import csv
+import io
+from datetime import date
+
+import pytest
+
+
+@pytest.fixture
+def graded(app, make_user, make_course, make_session, monkeypatch):
+    """Three students over two finished sessions and one still running."""
+    from app.extensions import db
+    from app.models import AttendanceRecord
+    from app.models.attendance_record import AttendanceStatus as S
+
+    monkeypatch.setitem(app.config, "STREAM_CHUNK_ROWS", 2)
+    teacher = make_user("teacher")
+    zed, amy = make_user("student", name="Zed"), make_user("student", name="Amy")
+    formula = make_user("student", name="+Aaron()")  # first in name order under any collation
+    course = make_course(teacher, [zed, amy, formula])
+    first, second = make_session(course, is_active=False), make_session(course, is_active=False)
+    running = make_session(course)
+    with app.app_context():
+        db.session.add_all([
+            AttendanceRecord(session_id=first, student_id=zed, status=S.present),
+            AttendanceRecord(session_id=first, student_id=amy, status=S.late),
+            AttendanceRecord(session_id=second, student_id=zed, status=S.absent),
+            AttendanceRecord(session_id=running, student_id=amy, status=S.present),
+        ])
+        db.session.commit()
+    return course, teacher, (zed, amy, formula), (first, second)
+
+
+def test_export_has_a_column_per_finished_session(app, client, auth, graded):
+    from app.extensions import db
+
+    course, teacher, (zed, amy, formula), (first, second) = graded
+    r = client.get(f"/api/courses/{course}/attendance/export.csv", headers=auth(teacher))
+    assert r.status_code == 200
+    assert r.is_streamed
+    assert r.mimetype == "text/csv"
+    assert f"course-{course}-attendance.csv" in r.headers["Content-Disposition"]
+
+    table = list(csv.reader(io.StringIO(r.get_data(as_text=True))))
+    today = date.today().isoformat()
+    assert table[0] == ["student_id", "student_no", "full_name", "email", f"{today} #{first}", f"{today} #{second}"]
+    # name order; no record in a finished session reads as absent
+    assert [row[2:3] + row[4:] for row in table[1:]] == [
+        ["'+Aaron()", "absent", "absent"],  # a formula is not left for a spreadsheet to run
+        ["Amy", "late", "absent"],
+        ["Zed", "present", "absent"],
+    ]
+    assert [int(row[0]) for row in table[1:]] == [formula, amy, zed]
+    assert table[1][1] == f"S{formula:05d}"
+
+    with app.app_context():
+        assert db.engine.pool.checkedout() == 0
+
+
+def test_export_of_a_course_without_finished_sessions(client, auth, make_user, make_course):
+    teacher = make_user("teacher")
+    course = make_course(teacher, [make_user("student", name="Only")])
+    table = list(csv.reader(io.StringIO(
+        client.get(f"/api/courses/{course}/attendance/export.csv", headers=auth(teacher)).get_data(as_text=True)
+    )))
+    assert table[0] == ["student_id", "student_no", "full_name", "email"]
+    assert [row[2] for row in table[1:]] == ["Only"]
+
+
+def test_export_is_for_the_course_teacher(client, auth, make_user, graded):
+    course, *_ = graded
+    assert client.get(f"/api/courses/{course}/attendance/export.csv",
+                      headers=auth(make_user("teacher"))).status_code == 403
@@ -0,0 +1,59 @@
+import base64
+
+import pytest
+
+
+def _unpack(encoded: str, sessions: int) -> list[int]:
+    """The decoding a client does from the published layout."""
+    packed = base64.b64decode(encoded)
+    return [(packed[j // 4] >> (2 * (j % 4))) & 0b11 for j in range(sessions)]
+
+
+@pytest.mark.parametrize("sessions", [0, 1, 4, 5, 9])
+def test_pack_round_trips_through_the_published_layout(sessions):
+    from app.models.attendance_record import AttendanceStatus as S
+    from app.utils.attendance_matrix import CODES, UNRECORDED, pack
+
+    cycle = [S.present, None, S.late, S.absent, S.absent, S.present, None, S.late, S.present]
+    statuses = cycle[:sessions]
+
+    encoded = pack(statuses)
+    assert len(base64.b64decode(encoded)) == (sessions + 3) // 4
+    assert _unpack(encoded, sessions) == [CODES[s] if s else UNRECORDED for s in statuses]
+
+
+def test_pack_byte_layout():
+    from app.models.attendance_record import AttendanceStatus as S
+    from app.utils.attendance_matrix import pack
+
+    # present=1, late=2, absent=3; session 0 in the low bits
+    assert base64.b64decode(pack([S.present, S.late, S.absent, None, S.late])) == bytes([0b00_11_10_01, 0b10])
+
+
+def test_matrix_rows_decode_to_the_records(app, client, auth, make_user, make_course, make_session):
+    from app.extensions import db
+    from app.models import AttendanceRecord
+    from app.models.attendance_record import AttendanceStatus as S
+
+    teacher = make_user("teacher")
+    bo, al = make_user("student", name="Bo"), make_user("student", name="Al")
+    course = make_course(teacher, [bo, al])
+    sessions = [make_session(course, is_active=False) for _ in range(5)]
+    make_session(course)  # still running: not a column
+    with app.app_context():
+        db.session.add_all([
+            AttendanceRecord(session_id=sessions[0], student_id=bo, status=S.late),
+            AttendanceRecord(session_id=sessions[4], student_id=bo, status=S.present),
+            AttendanceRecord(session_id=sessions[2], student_id=al, status=S.absent),
+        ])
+        db.session.commit()
+
+    body = client.get(f"/api/courses/{course}/attendance/matrix", headers=auth(teacher)).get_json()
+    assert body["sessions"] == sessions
+    assert body["students"] == [al, bo]
+    codes = {int(code): status for code, status in body["encoding"]["codes"].items()}
+    decoded = [[codes[c] for c in _unpack(row, len(sessions))] for row in body["rows"]]
+    assert decoded == [
+        ["unrecorded", "unrecorded", "absent", "unrecorded", "unrecorded"],
+        ["late", "unrecorded", "unrecorded", "unrecorded", "present"],
+    ]
@@ -0,0 +1,122 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import func, select
+
+
+def _grouped_records(course_id: int, finished_only: bool = False) -> dict:
+    """The counters recomputed straight from attendance_records."""
+    from app.extensions import db
+    from app.models import AttendanceRecord, AttendanceSession
+    from app.models.attendance_record import AttendanceStatus
+    from app.utils.attendance_stats import ATTENDED, finished_filter
+
+    status = AttendanceRecord.status
+    q = (
+        select(
+            AttendanceRecord.student_id,
+            func.count().filter(status.in_(ATTENDED)),
+            func.count().filter(status == AttendanceStatus.late),
+            func.count().filter(status == AttendanceStatus.absent),
+        )
+        .join(AttendanceSession, AttendanceSession.id == AttendanceRecord.session_id)
+        .where(AttendanceSession.course_id == course_id)
+        .group_by(AttendanceRecord.student_id)
+    )
+    if finished_only:
+        q = q.where(finished_filter())
+    return {student: tuple(counts) for student, *counts in db.session.execute(q)}
+
+
+def test_counters_reconcile_with_the_records(app, client, auth, make_user, make_course, make_session):
+    from app.extensions import db
+    from app.models import CourseStudentStats
+    from app.models.attendance_record import AttendanceStatus
+    from app.utils.attendance_stats import finished_attended, record_checkins
+
+    teacher = make_user("teacher")
+    regular, tardy, offline, missing = (make_user("student") for _ in range(4))
+    course = make_course(teacher, [regular, tardy, offline, missing])
+    here = {"lat": 31.95, "lng": 35.91}
+
+    # a closed session, checked into late: two scans, an absence replaced by an offline scan, an absence
+    closed = make_session(course, started_min_ago=12)
+    assert client.post("/api/attendance/checkin", headers=auth(regular),
+                       json={"qr_token": "test-qr-1", **here}).status_code == 201
+    assert client.post("/api/attendance/checkin", headers=auth(tardy),
+                       json={"qr_token": "test-qr-1", **here}).status_code == 201
+    scanned_offline = datetime.now(timezone.utc)
+    assert client.patch(f"/api/sessions/{closed}/close", headers=auth(teacher)).get_json()["marked_absent"] == 2
+    with app.app_context():
+        record_checkins([{"session_id": closed, "student_id": offline, "status": AttendanceStatus.late,
+                          "checked_in_at": scanned_offline}])
+        db.session.commit()
+
+    # and one still open, whose check-in is counted but not finished yet
+    make_session(course)
+    assert client.post("/api/attendance/checkin", headers=auth(regular),
+                       json={"qr_token": "test-qr-2", **here}).status_code == 201
+
+    with app.app_context():
+        counters = {s.student_id: (s.attended, s.late, s.absent)
+                    for s in db.session.query(CourseStudentStats).filter_by(course_id=course)}
+        assert counters == _grouped_records(course)
+
+        finished = {student: attended for student, (attended, _, _) in _grouped_records(course, True).items()}
+        assert finished_attended(course) == finished == {regular: 1, tardy: 1, offline: 1, missing: 0}
+
+
+def _counters(course_id: int) -> dict:
+    from app.extensions import db
+    from app.models import CourseStudentStats
+
+    return {s.student_id: (s.attended, s.late, s.absent)
+            for s in db.session.query(CourseStudentStats).filter_by(course_id=course_id)}
+
+
+def test_increment_folds_rows_per_course_and_student(app, make_user, make_course, make_session):
+    from app.extensions import db
+    from app.models.attendance_record import AttendanceStatus as S
+    from app.utils.attendance_stats import increment
+
+    a, b = make_user("student"), make_user("student")
+    course = make_course(make_user("teacher"), [a, b])
+    one, two, three = (make_session(course, is_active=False) for _ in range(3))
+
+    with app.app_context():
+        # one statement, several rows for the same counter, statuses as enum or value
+        increment([(one, a, S.present), (two, a, "late"), (three, a, S.absent), (one, b, S.late)])
+        increment([(two, b, S.present)])  # an existing counter row is added to
+        db.session.commit()
+        assert _counters(course) == {a: (2, 1, 1), b: (2, 1, 0)}
+
+        # an auto-absence upgraded to a check-in: the absence is taken back
+        increment([(three, a, S.late)], replacing=S.absent)
+        db.session.commit()
+        assert _counters(course)[a] == (3, 2, 0)
+
+
+def test_rebuild_repairs_drifted_counters(app, make_user, make_course, make_session):
+    from app.extensions import db
+    from app.models import AttendanceRecord, Course, CourseStudentStats
+    from app.models.attendance_record import AttendanceStatus as S
+    from app.utils.attendance_stats import rebuild
+
+    student = make_user("student")
+    courses = [make_course(make_user("teacher"), [student]) for _ in range(2)]
+    sessions = [make_session(c, is_active=False) for c in courses]
+
+    with app.app_context():
+        # records written behind the counters' back, plus a stray counter row
+        db.session.add_all(AttendanceRecord(session_id=s, student_id=student, status=S.late) for s in sessions)
+        db.session.add(CourseStudentStats(course_id=courses[0], student_id=student, attended=7, late=0, absent=3))
+        db.session.commit()
+        versions = dict(db.session.query(Course.id, Course.attendance_version))
+
+        assert rebuild(courses[0]) == 1
+        assert _counters(courses[0]) == {student: (1, 1, 0)}
+        assert _counters(courses[1]) == {}  # other courses are left alone
+
+        assert rebuild() == 2
+        assert [_counters(c) for c in courses] == [{student: (1, 1, 0)}] * 2
+        # cached reports of the rebuilt courses go stale
+        assert all(v > versions[c] for c, v in db.session.query(Course.id, Course.attendance_version))
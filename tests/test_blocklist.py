@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import text
+
+
+def _partition_of(jti: str) -> str:
+    from app.extensions import db
+
+    return db.session.execute(
+        text("SELECT tableoid::regclass::text FROM token_blocklist WHERE jti = :j"), {"j": jti}
+    ).scalar()
+
+
+def test_revoking_the_same_token_twice_keeps_one_row(app):
+    from app.extensions import db
+    from app.models import TokenBlocklist
+    from app.routes.auth import _revoke
+
+    claims = {"jti": "twice", "exp": int(datetime.now(timezone.utc).timestamp()) + 300}
+    with app.test_request_context():
+        _revoke(claims, "access")
+        _revoke(claims, "access")  # e.g. two concurrent logouts with one token
+        assert db.session.query(TokenBlocklist).filter_by(jti="twice").count() == 1
+
+
+def test_upgrade_brings_a_legacy_table_up_to_the_model(app):
+    from app.extensions import db
+    from app.utils.blocklist import purge_expired, upgrade_table
+
+    now = datetime.now(timezone.utc)
+    with app.app_context():
+        # the table as it was before expires_at existed
+        db.session.execute(text("DROP TABLE token_blocklist"))
+        db.session.execute(text("""
+            CREATE TABLE token_blocklist (
+                id SERIAL PRIMARY KEY,
+                jti VARCHAR(36) NOT NULL,
+                token_type VARCHAR(10) NOT NULL,
+                revoked_at TIMESTAMP WITH TIME ZONE NOT NULL
+            )
+        """))
+        db.session.execute(text("CREATE UNIQUE INDEX ix_token_blocklist_jti ON token_blocklist (jti)"))
+        db.session.execute(text(
+            "INSERT INTO token_blocklist (jti, token_type, revoked_at) VALUES ('stale', 'access', :old), ('fresh', 'access', :now)"
+        ), {"old": now - timedelta(days=60), "now": now})
+        db.session.commit()
+
+        upgrade_table()
+
+        assert db.session.execute(text("SELECT count(*) FROM token_blocklist WHERE expires_at IS NULL")).scalar() == 0
+        assert purge_expired() == 1
+        assert db.session.execute(text("SELECT jti FROM token_blocklist")).scalars().all() == ["fresh"]
+        # the same keys a fresh create_all() would give
+        constraints = db.session.execute(text(
+            "SELECT conname FROM pg_constraint WHERE conrelid = 'token_blocklist'::regclass AND contype IN ('p', 'u') ORDER BY conname"
+        )).scalars().all()
+        assert constraints == ["token_blocklist_pkey", "uq_token_blocklist_jti_expires_at"]
+
+
+def test_partitioned_blocklist_takes_rows_past_the_last_partition(app, client, auth, make_user):
+    from app.extensions import db
+    from app.models import TokenBlocklist
+    from app.utils import blocklist
+
+    now = datetime.now(timezone.utc)
+    with app.app_context():
+        db.session.add(TokenBlocklist(jti="live", token_type="access", expires_at=now + timedelta(minutes=5)))
+        db.session.commit()
+
+        blocklist.partition_table()
+        assert blocklist.is_partitioned()
+        assert _partition_of("live") == blocklist._partition_name(blocklist._month_start(now))
+
+        # well past BLOCKLIST_PARTITIONS_AHEAD, and nobody has run prune
+        far = now + timedelta(days=400)
+        db.session.add(TokenBlocklist(jti="far", token_type="refresh", expires_at=far))
+        db.session.commit()
+        assert _partition_of("far") == blocklist.DEFAULT_PARTITION
+
+        # its month's partition shows up later: the row moves over
+        blocklist.ensure_partitions(now=now, until=far)
+        assert _partition_of("far") == blocklist._partition_name(blocklist._month_start(far))
+
+        # expired rows in DEFAULT (months before the first partition) go at the next prune
+        db.session.add(TokenBlocklist(jti="old", token_type="access", expires_at=now - timedelta(days=60)))
+        db.session.commit()
+        assert _partition_of("old") == blocklist.DEFAULT_PARTITION
+        assert blocklist.prune()["purged_default"] == 1
+        assert _partition_of("old") is None
+
+    # ids still come from the table's own sequence
+    user = make_user("student")
+    headers = auth(user)
+    assert client.post("/api/auth/logout", headers=headers).status_code == 200
+    assert client.get("/api/students/me/attendance", headers=headers).status_code == 401
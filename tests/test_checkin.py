@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+
+@pytest.fixture
+def scene(make_user, make_course, make_session):
+    teacher = make_user("teacher")
+    students = [make_user("student") for _ in range(2)]
+    course = make_course(teacher, students)
+    session = make_session(course)
+    return teacher, students, course, session
+
+
+def _raw_json(client, path, headers, body: str):
+    # Python's json accepts NaN/Infinity literals; send them verbatim
+    return client.post(path, data=body, headers=headers, content_type="application/json")
+
+
+def test_batch_rejects_non_finite_coordinates(client, auth, scene):
+    teacher, students, course, session = scene
+    now = datetime.now(timezone.utc).isoformat()
+
+    r = _raw_json(client, "/api/attendance/checkin/batch", auth(teacher), f"""{{
+        "qr_token": "test-qr-1",
+        "items": [
+            {{"student_id": {students[0]}, "lat": NaN, "lng": 35.91, "captured_at": "{now}"}},
+            {{"student_id": {students[1]}, "lat": 31.95, "lng": Infinity, "captured_at": "{now}"}}
+        ]
+    }}""")
+
+    assert r.status_code == 200
+    body = r.get_json()
+    assert body["counts"] == {"checked_in": 0, "duplicate": 0, "rejected": 2}
+    assert [x["error"] for x in body["results"]] == ["lat/lng must be numbers"] * 2
+
+
+def test_batch_nan_item_does_not_sink_the_batch(client, auth, scene):
+    teacher, students, course, session = scene
+    now = datetime.now(timezone.utc).isoformat()
+
+    r = _raw_json(client, "/api/attendance/checkin/batch", auth(teacher), f"""{{
+        "qr_token": "test-qr-1",
+        "items": [
+            {{"student_id": {students[0]}, "lat": NaN, "lng": NaN, "captured_at": "{now}"}},
+            {{"student_id": {students[1]}, "lat": 31.95, "lng": 35.91, "captured_at": "{now}"}}
+        ]
+    }}""")
+
+    assert r.status_code == 200
+    results = r.get_json()["results"]
+    assert results[0]["result"] == "rejected"
+    assert results[1]["result"] == "checked_in"
+
+
+def test_checkin_rejects_nan(client, auth, scene):
+    teacher, students, course, session = scene
+
+    r = _raw_json(client, "/api/attendance/checkin", auth(students[0]),
+                  '{"qr_token": "test-qr-1", "lat": NaN, "lng": 35.91}')
+
+    assert r.status_code == 400
+    assert r.get_json() == {"error": "lat/lng must be numbers"}
+
+
+def _batch(client, headers, items, qr_token="test-qr-1"):
+    r = client.post("/api/attendance/checkin/batch", headers=headers, json={"qr_token": qr_token, "items": items})
+    assert r.status_code == 200
+    return r.get_json()["results"]
+
+
+def test_student_static_token_judged_on_arrival(client, auth, make_user, make_course, make_session):
+    teacher = make_user("teacher")
+    student = make_user("student")
+    make_session(make_course(teacher, [student]), started_min_ago=10)
+    # claims a scan one minute into the session, ten minutes late
+    backdated = (datetime.now(timezone.utc) - timedelta(minutes=9)).isoformat()
+
+    [result] = _batch(client, auth(student), [{"lat": 31.95, "lng": 35.91, "captured_at": backdated}])
+
+    assert result["result"] == "checked_in"
+    assert result["status"] == "late"
+    assert result["checked_in_at"] > backdated
+
+
+def test_offline_items_land_after_the_sweeper_closed_the_session(app, client, auth, make_user, make_course,
+                                                                 make_session):
+    from app.extensions import db
+    from app.models import AttendanceRecord, CourseStudentStats
+    from app.utils.session_sweeper import sweep_expired
+
+    teacher = make_user("teacher")
+    synced, relayed_late, own_device = (make_user("student") for _ in range(3))
+    course = make_course(teacher, [synced, relayed_late, own_device])
+    session = make_session(course, started_min_ago=30, duration_min=15)
+    with app.app_context():
+        assert sweep_expired(grace_sec=0) == {"closed": 1, "marked_absent": 3}
+    started = datetime.now(timezone.utc) - timedelta(minutes=30)
+
+    results = _batch(client, auth(teacher), [
+        {"student_id": synced, "lat": 31.95, "lng": 35.91, "captured_at": (started + timedelta(minutes=2)).isoformat()},
+        {"student_id": relayed_late, "lat": 31.95, "lng": 35.91,
+         "captured_at": (started + timedelta(minutes=20)).isoformat()},
+    ])
+    [own] = _batch(client, auth(own_device), [
+        {"lat": 31.95, "lng": 35.91, "captured_at": (started + timedelta(minutes=2)).isoformat()},
+    ])
+
+    assert [r["result"] for r in results] == ["checked_in", "rejected"]
+    assert results[0]["status"] == "present"
+    assert results[1]["error"] == "captured_at outside the session window"
+    assert own["error"] == "check-in window closed"  # static token: judged on arrival, after the end
+
+    with app.app_context():
+        statuses = dict(db.session.query(AttendanceRecord.student_id, AttendanceRecord.status)
+                        .filter_by(session_id=session))
+        counters = {s: (a, ab) for s, a, ab in db.session.query(
+            CourseStudentStats.student_id, CourseStudentStats.attended, CourseStudentStats.absent)}
+    assert {s: v.value for s, v in statuses.items()} == {
+        synced: "present", relayed_late: "absent", own_device: "absent",
+    }
+    assert counters == {synced: (1, 0), relayed_late: (0, 1), own_device: (0, 1)}
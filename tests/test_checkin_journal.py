@@ -0,0 +1,81 @@
+import json
+import os
+
+import pytest
+from sqlalchemy import text
+
+
+@pytest.fixture
+def scene(make_user, make_course, make_session):
+    teacher = make_user("teacher")
+    students = [make_user("student") for _ in range(2)]
+    course = make_course(teacher, students)
+    return teacher, students, course, make_session
+
+
+def _checkin(client, auth, student, qr_token="test-qr-1"):
+    r = client.post("/api/attendance/checkin", headers=auth(student),
+                    json={"qr_token": qr_token, "lat": 31.95, "lng": 35.91})
+    assert r.status_code == 202
+    return r.get_json()["ticket"]
+
+
+def _statuses(app, session_id):
+    from app.extensions import db
+    from app.models import AttendanceRecord
+
+    with app.app_context():
+        return {s: st.value for s, st in db.session.query(AttendanceRecord.student_id, AttendanceRecord.status)
+                .filter_by(session_id=session_id)}
+
+
+def test_flush_writes_journaled_checkins(app, client, auth, scene, write_behind):
+    teacher, students, course, make_session = scene
+    session = make_session(course)
+    tickets = [_checkin(client, auth, s) for s in students]
+    assert _statuses(app, session) == {}
+
+    write_behind.flush()
+
+    assert _statuses(app, session) == {s: "present" for s in students}
+    assert [write_behind.status(t) for t in tickets] == ["persisted", "persisted"]
+    assert os.fstat(write_behind._fd).st_size == 0
+
+
+def test_unwritable_entry_does_not_block_the_queue(app, client, auth, scene, write_behind):
+    from app.extensions import db
+
+    teacher, students, course, make_session = scene
+    gone, kept = make_session(course), make_session(course)
+    doomed = _checkin(client, auth, students[0], "test-qr-1")
+    with app.app_context():
+        db.session.execute(text("DELETE FROM attendance_sessions WHERE id = :id"), {"id": gone})
+        db.session.commit()
+    later = _checkin(client, auth, students[1], "test-qr-2")
+
+    write_behind.flush()
+
+    assert write_behind.status(doomed) == "failed"
+    assert write_behind.status(later) == "persisted"
+    assert _statuses(app, kept) == {students[1]: "present"}
+    assert not write_behind._queue
+    assert os.fstat(write_behind._fd).st_size == 0
+
+
+def test_replays_orphaned_journal(app, scene, write_behind, tmp_path):
+    teacher, students, course, make_session = scene
+    session = make_session(course)
+    # left behind by a worker that died before flushing (nobody holds its lock); the last line is torn
+    entry = {
+        "ticket": f"{session}-{students[0]}-dead", "session_id": session, "student_id": students[0],
+        "status": "late", "checked_in_at": "2026-01-01T10:00:00+00:00",
+        "student_lat": 31.95, "student_lng": 35.91, "distance_m": 3,
+    }
+    orphan = tmp_path / "checkins-1-dead.jsonl"
+    orphan.write_text(json.dumps(entry) + "\n" + '{"torn')
+
+    write_behind._replay_orphans()
+    assert not orphan.exists()
+    write_behind.flush()
+
+    assert _statuses(app, session) == {students[0]: "late"}
@@ -0,0 +1,50 @@
+"""Closing a session while this worker still has journaled (write-behind) check-ins."""
+import pytest
+from sqlalchemy import event
+
+
+@pytest.fixture
+def lock_timeout(app):
+    """Turn a lock wait that would never end into an error (and a failed test)."""
+    from app.extensions import db
+
+    def on_checkout(dbapi_conn, record, proxy):
+        with dbapi_conn.cursor() as cur:
+            cur.execute("SET lock_timeout = '5s'")
+
+    def on_checkin(dbapi_conn, record):
+        with dbapi_conn.cursor() as cur:
+            cur.execute("RESET lock_timeout")
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "checkout", on_checkout)
+    event.listen(engine, "checkin", on_checkin)
+    yield
+    event.remove(engine, "checkout", on_checkout)
+    event.remove(engine, "checkin", on_checkin)
+
+
+def test_close_lands_pending_journal_entries(app, client, auth, write_behind, lock_timeout,
+                                             make_user, make_course, make_session):
+    from app.extensions import db
+    from app.models import AttendanceRecord
+
+    teacher = make_user("teacher")
+    present, absent = make_user("student"), make_user("student")
+    course = make_course(teacher, [present, absent])
+    session = make_session(course)
+
+    r = client.post("/api/attendance/checkin", headers=auth(present),
+                    json={"qr_token": "test-qr-1", "lat": 31.95, "lng": 35.91})
+    assert r.status_code == 202
+    assert write_behind.status(r.get_json()["ticket"]) == "pending"
+
+    r = client.patch(f"/api/sessions/{session}/close", headers=auth(teacher))
+    assert r.status_code == 200
+    assert r.get_json()["marked_absent"] == 1
+
+    with app.app_context():
+        statuses = dict(db.session.query(AttendanceRecord.student_id, AttendanceRecord.status)
+                        .filter_by(session_id=session).all())
+    assert {k: v.value for k, v in statuses.items()} == {present: "present", absent: "absent"}
@@ -0,0 +1,73 @@
+import pytest
+
+HERE = {"lat": 31.95, "lng": 35.91}
+
+
+@pytest.fixture
+def owned(make_user, make_course, auth):
+    teacher, student = make_user("teacher"), make_user("student")
+    return make_course(teacher, [student]), auth(teacher), auth(student)
+
+
+def _revalidate(client, path, headers, etag):
+    return client.get(path, headers={**headers, "If-None-Match": etag})
+
+
+@pytest.mark.parametrize("report", ["eligibility", "attendance/summary", "attendance/matrix"])
+def test_unchanged_report_is_not_recomputed(client, queries, owned, report):
+    course, teacher, _ = owned
+    path = f"/api/courses/{course}/{report}"
+    first = client.get(path, headers=teacher)
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    queries.clear()
+    r = _revalidate(client, path, teacher, first.headers["ETag"])
+    assert r.status_code == 304
+    assert r.data == b""
+    assert r.headers["ETag"] == first.headers["ETag"]
+    assert [q for q in queries if "course_student_stats" in q or "attendance_records" in q] == []
+
+
+def test_weak_and_listed_tags_match(client, owned):
+    course, teacher, _ = owned
+    path = f"/api/courses/{course}/eligibility"
+    etag = client.get(path, headers=teacher).headers["ETag"]
+
+    assert _revalidate(client, path, teacher, f"W/{etag}").status_code == 304
+    assert _revalidate(client, path, teacher, f'"stale", {etag}').status_code == 304
+    assert _revalidate(client, path, teacher, '"stale"').status_code == 200
+
+
+def test_a_finished_session_changes_the_tag(client, make_session, owned):
+    course, teacher, student = owned
+    path = f"/api/courses/{course}/eligibility"
+    etag = client.get(path, headers=teacher).headers["ETag"]
+
+    session = make_session(course)
+    assert client.post("/api/attendance/checkin", headers=student, json={"qr_token": "test-qr-1", **HERE}).status_code == 201
+    assert _revalidate(client, path, teacher, etag).status_code == 304  # still running: nothing finished yet
+
+    assert client.patch(f"/api/sessions/{session}/close", headers=teacher).status_code == 200
+    r = _revalidate(client, path, teacher, etag)
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+    assert r.get_json()["finished_sessions"] == 1
+
+
+def test_summary_tag_covers_the_name_and_the_representation(client, owned):
+    course, teacher, _ = owned
+    summary, eligibility = f"/api/courses/{course}/attendance/summary", f"/api/courses/{course}/eligibility"
+    tags = {path: client.get(path, headers=teacher).headers["ETag"] for path in (summary, eligibility)}
+    assert client.get(summary, headers=teacher, query_string={"stream": 1}).headers["ETag"] != tags[summary]
+
+    assert client.put(f"/api/courses/{course}", headers=teacher, json={"name": "Renamed"}).status_code == 200
+    assert _revalidate(client, summary, teacher, tags[summary]).status_code == 200
+    assert _revalidate(client, eligibility, teacher, tags[eligibility]).status_code == 304
+
+
+def test_permissions_come_before_the_tag(client, auth, make_user, owned):
+    course, teacher, _ = owned
+    path = f"/api/courses/{course}/eligibility"
+    etag = client.get(path, headers=teacher).headers["ETag"]
+    assert _revalidate(client, path, auth(make_user("teacher")), etag).status_code == 403
@@ -0,0 +1,84 @@
+import io
+
+import pytest
+from sqlalchemy import text
+
+
+@pytest.fixture
+def course(app, client, auth, make_user, make_course, make_session):
+    """Two students, one finished session that only the first attended."""
+    teacher = make_user("teacher")
+    attended, missed = make_user("student"), make_user("student")
+    course = make_course(teacher, [attended, missed], planned_sessions=2)
+    session = make_session(course)
+    assert client.post("/api/attendance/checkin", headers=auth(attended),
+                       json={"qr_token": "test-qr-1", "lat": 31.95, "lng": 35.91}).status_code == 201
+    assert client.patch(f"/api/sessions/{session}/close", headers=auth(teacher)).status_code == 200
+    return course, auth(teacher)
+
+
+def _aggregations(queries) -> list[str]:
+    return [q for q in queries if "course_student_stats" in q]
+
+
+def _eligibility(client, course, headers) -> dict:
+    r = client.get(f"/api/courses/{course}/eligibility", headers=headers)
+    assert r.status_code == 200
+    return {i["student"]["id"]: i["attendance_pct"] for i in r.get_json()["items"]}
+
+
+def test_reports_share_one_aggregation(client, queries, course):
+    course, headers = course
+    queries.clear()
+    assert client.get(f"/api/courses/{course}/eligibility", headers=headers).status_code == 200
+    assert len(_aggregations(queries)) == 1
+
+    queries.clear()
+    assert client.get(f"/api/courses/{course}/attendance/summary", headers=headers).status_code == 200
+    assert client.get(f"/api/courses/{course}/eligibility", headers=headers).status_code == 200
+    assert _aggregations(queries) == []
+
+
+def test_planned_sessions_change_the_key(client, course):
+    course, headers = course
+    assert sorted(_eligibility(client, course, headers).values()) == [0.0, 50.0]
+
+    r = client.patch(f"/api/courses/{course}/planned-sessions", headers=headers, json={"planned_sessions": 4})
+    assert r.status_code == 200
+    assert sorted(_eligibility(client, course, headers).values()) == [0.0, 25.0]
+
+
+def test_enrollment_changes_the_key(app, client, make_user, course):
+    from app.extensions import db
+    from app.models import User
+
+    course, headers = course
+    newcomer = make_user("student", name="Newcomer")
+    with app.app_context():
+        user = db.session.get(User, newcomer)
+        line = f"{user.email},{user.student_profile.student_no},{user.full_name}"
+    r = client.post("/api/enrollments/import", headers=headers, data={
+        "course_id": str(course),
+        "file": (io.BytesIO(f"email,student_no,full_name\n{line}\n".encode()), "roster.csv"),
+    })
+    assert r.status_code == 200, r.get_json()
+    assert _eligibility(client, course, headers)[newcomer] == 0.0
+
+
+def test_version_bumped_on_another_worker(app, client, queries, course):
+    from app.extensions import db
+
+    course, headers = course
+    before = _eligibility(client, course, headers)
+
+    # a counter fix and its version bump, committed elsewhere: nothing local was invalidated
+    with app.app_context():
+        db.session.execute(text("UPDATE course_student_stats SET attended = 2 WHERE course_id = :c"), {"c": course})
+        db.session.execute(text("UPDATE courses SET attendance_version = attendance_version + 1 WHERE id = :c"),
+                           {"c": course})
+        db.session.commit()
+
+    queries.clear()
+    after = _eligibility(client, course, headers)
+    assert len(_aggregations(queries)) == 1
+    assert before != after == {s: 100.0 for s in after}
@@ -0,0 +1,87 @@
+"""SQL each narrowed endpoint sends: no joined-in users rows, no password hashes.
+
+Before the loaders became opt-in, every query on courses/sessions/
+enrollments joined ``users`` (all columns, password_hash included) through
+``lazy="joined"`` relationships nobody read.
+"""
+import re
+
+import pytest
+
+
+@pytest.fixture
+def scene(make_user, make_course, make_session):
+    admin = make_user("admin")
+    teacher = make_user("teacher")
+    students = [make_user("student") for _ in range(3)]
+    course = make_course(teacher, students)
+    session = make_session(course)
+    return admin, teacher, course, session
+
+
+def _warm(client, headers):
+    # the first request of a user loads its token_version; measure the steady state
+    client.get("/api/courses", headers=headers)
+
+
+def _app_statements(queries) -> list[str]:
+    # the JWT revocation sync reads token_blocklist/users on its own schedule; not the endpoint's SQL
+    return [q for q in queries if "token_blocklist" not in q and "token_version_bumped_at" not in q]
+
+
+def _assert_narrow(statements, users_allowed: int = 0):
+    assert statements
+    assert not any("password_hash" in s for s in statements)
+    assert sum(" JOIN users " in s or "FROM users " in s for s in statements) == users_allowed
+
+
+@pytest.mark.parametrize("role", ["admin", "teacher"])
+def test_list_courses(client, auth, scene, queries, role):
+    admin, teacher, course, session = scene
+    headers = auth(admin if role == "admin" else teacher)
+    _warm(client, headers)
+    queries.clear()
+
+    assert client.get("/api/courses", headers=headers).status_code == 200
+    statements = _app_statements(queries)
+    _assert_narrow(statements)
+    assert len(statements) == 1
+
+
+@pytest.mark.parametrize("role", ["admin", "teacher"])
+def test_list_sessions(client, auth, scene, queries, role):
+    admin, teacher, course, session = scene
+    headers = auth(admin if role == "admin" else teacher)
+    _warm(client, headers)
+    queries.clear()
+
+    assert client.get("/api/sessions", headers=headers).status_code == 200
+    statements = _app_statements(queries)
+    _assert_narrow(statements)
+    assert len(statements) == 1
+
+
+def test_session_attendance(client, auth, scene, queries):
+    admin, teacher, course, session = scene
+    headers = auth(teacher)
+    _warm(client, headers)
+    queries.clear()
+
+    assert client.get(f"/api/sessions/{session}/attendance", headers=headers).status_code == 200
+    statements = _app_statements(queries)
+    # the roster needs names and emails: one users join, and only those columns
+    _assert_narrow(statements, users_allowed=1)
+    page = next(s for s in statements if " JOIN users " in s)
+    assert set(re.findall(r"\busers\.(\w+)", page)) == {"id", "full_name", "email"}
+
+
+def test_close_session(client, auth, scene, queries):
+    admin, teacher, course, session = scene
+    headers = auth(teacher)
+    _warm(client, headers)
+    queries.clear()
+
+    r = client.patch(f"/api/sessions/{session}/close", headers=headers)
+    assert r.status_code == 200
+    assert r.get_json()["marked_absent"] == 3
+    _assert_narrow(_app_statements(queries))
@@ -0,0 +1,170 @@
+"""The set-based import decides every line as the old row-by-row loop did."""
+import csv
+import io
+
+import pytest
+
+
+def _loop_import(course_id: int, reader) -> dict:
+    """The per-row import this replaced, with a savepoint per enrollment instead of a full rollback."""
+    from sqlalchemy.exc import IntegrityError
+
+    from app.extensions import db
+    from app.models import Enrollment, Student, User, UserRole
+
+    summary = {"created_users": 0, "updated_profiles": 0, "enrolled": 0, "already_enrolled": 0,
+               "skipped_invalid": 0, "errors": []}
+
+    def invalid(idx, message):
+        summary["skipped_invalid"] += 1
+        summary["errors"].append(f"Line {idx}: {message}")
+
+    for idx, row in enumerate(reader, start=2):
+        email = (row.get("email") or "").strip().lower()
+        student_no = (row.get("student_no") or "").strip()
+        full_name = (row.get("full_name") or "").strip()
+        department = (row.get("department") or "").strip() or None
+        year_level_raw = (row.get("year_level") or "").strip()
+        if not email or not student_no or not full_name:
+            invalid(idx, "missing email/student_no/full_name")
+            continue
+        year_level = None
+        if year_level_raw:
+            try:
+                year_level = int(year_level_raw)
+            except ValueError:
+                invalid(idx, "year_level must be integer")
+                continue
+
+        user = User.query.filter_by(email=email).first()
+        if user and user.role != UserRole.student:
+            invalid(idx, "email belongs to non-student user")
+            continue
+        # (the old loop created a new user before this check; see test_taken_student_no_creates_nobody)
+        taken = Student.query.filter(Student.student_no == student_no)
+        if user:
+            taken = taken.filter(Student.user_id != user.id)
+        if taken.first():
+            invalid(idx, "student_no already used by another student")
+            continue
+        if not user:
+            user = User(full_name=full_name, email=email, role=UserRole.student, must_change_password=True)
+            user.set_password(student_no)
+            db.session.add(user)
+            db.session.flush()
+            summary["created_users"] += 1
+
+        profile = db.session.get(Student, user.id) or Student(user_id=user.id)
+        db.session.add(profile)
+        profile.student_no, profile.department, profile.year_level = student_no, department, year_level
+        summary["updated_profiles"] += 1
+
+        try:
+            with db.session.begin_nested():
+                db.session.add(Enrollment(course_id=course_id, student_id=user.id))
+            summary["enrolled"] += 1
+        except IntegrityError:
+            summary["already_enrolled"] += 1
+    return summary
+
+
+def _state(course_id: int) -> dict:
+    """email -> (role, full_name, student_no, department, year_level, enrolled)."""
+    from app.extensions import db
+    from app.models import Enrollment, Student, User
+
+    enrolled = set(db.session.scalars(db.select(Enrollment.student_id).filter_by(course_id=course_id)))
+    rows = (
+        db.session.query(User, Student)
+        .outerjoin(Student, Student.user_id == User.id)
+        .order_by(User.email)
+    )
+    return {
+        u.email: (u.role.value, u.full_name, s and s.student_no, s and s.department, s and s.year_level,
+                  u.id in enrolled)
+        for u, s in rows
+    }
+
+
+def _both(app, course_id: int, lines: str) -> tuple:
+    """(summary, state) after each import, each run against the same starting data."""
+    from app.extensions import db
+    from app.utils.enrollment_import import import_students
+
+    results = []
+    with app.app_context():
+        for run in (_loop_import, import_students):
+            summary = run(course_id, csv.DictReader(io.StringIO(lines)))
+            db.session.flush()
+            results.append((summary, _state(course_id)))
+            db.session.rollback()
+    return results
+
+
+@pytest.fixture
+def course(app):
+    """A course with existing students ann (enrolled), ben and a teacher tess."""
+    from app.extensions import db
+    from app.models import Course, Enrollment, Student, User, UserRole
+
+    with app.app_context():
+        tess = User(full_name="Tess", email="tess@example.test", role=UserRole.teacher, password_hash="!")
+        ann = User(full_name="Ann", email="ann@example.test", role=UserRole.student, password_hash="!")
+        ben = User(full_name="Ben", email="ben@example.test", role=UserRole.student, password_hash="!")
+        db.session.add_all([tess, ann, ben])
+        db.session.flush()
+        db.session.add_all([Student(user_id=ann.id, student_no="A1"), Student(user_id=ben.id, student_no="B1")])
+        course = Course(code="IMP", name="Import", teacher_id=tess.id, planned_sessions=4)
+        db.session.add(course)
+        db.session.flush()
+        db.session.add(Enrollment(course_id=course.id, student_id=ann.id))
+        db.session.commit()
+        return course.id
+
+
+def test_matches_the_row_by_row_loop(app, course):
+    lines = "\n".join([
+        "email,student_no,full_name,department,year_level",
+        "ANN@example.test,A1,Ann,CS,2",          # existing, already enrolled, profile updated
+        "ben@example.test,A1,Ben,,",             # student_no of another student
+        "tess@example.test,T1,Tess,,",           # not a student
+        "new@example.test,N1,New,Math,1",        # created
+        "new@example.test,N1,New,Physics,2",     # same email again: last profile wins
+        "ben@example.test,B2,Ben,,",             # changes number, frees B1
+        "other@example.test,B1,Other,,",         # takes the freed B1
+        "bad@example.test,X1,Bad,,first",        # bad year_level
+        ",X2,Nameless,,",                        # missing email
+        "dup@example.test,N1,Dup,,",             # number given to a user created earlier in the file
+    ]) + "\n"
+
+    (loop, loop_state), (bulk, bulk_state) = _both(app, course, lines)
+
+    assert bulk == loop
+    assert bulk_state == loop_state
+    assert bulk == {
+        "created_users": 2, "updated_profiles": 5, "enrolled": 3, "already_enrolled": 2, "skipped_invalid": 5,
+        "errors": [
+            "Line 3: student_no already used by another student",
+            "Line 4: email belongs to non-student user",
+            "Line 9: year_level must be integer",
+            "Line 10: missing email/student_no/full_name",
+            "Line 11: student_no already used by another student",
+        ],
+    }
+    assert bulk_state["new@example.test"] == ("student", "New", "N1", "Physics", 2, True)
+    assert bulk_state["other@example.test"][2] == "B1"
+
+
+def test_taken_student_no_creates_nobody(app, course):
+    from app.extensions import db
+    from app.models import User
+    from app.utils.enrollment_import import import_students
+
+    with app.app_context():
+        summary = import_students(course, csv.DictReader(io.StringIO(
+            "email,student_no,full_name\nfresh@example.test,B1,Fresh\n"
+        )))
+        assert summary["created_users"] == 0
+        assert summary["errors"] == ["Line 2: student_no already used by another student"]
+        assert db.session.query(User).filter_by(email="fresh@example.test").count() == 0
+        db.session.rollback()
@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+CURRENT = "pbkdf2:sha256:2000"  # cheap stand-ins for a production cost
+OLDER = "pbkdf2:sha256:1000"
+
+
+@pytest.fixture
+def hasher(monkeypatch):
+    from app.extensions import password_hasher
+
+    monkeypatch.setattr(password_hasher, "method", CURRENT)
+    monkeypatch.setattr(password_hasher, "_current", None)
+    return password_hasher
+
+
+@pytest.fixture
+def account(app, make_user):
+    """(email, user id) of a student whose password was hashed with OLDER."""
+    from app.extensions import db
+    from app.models import User
+
+    user_id = make_user("student")
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        user.password_hash = generate_password_hash("correct horse", method=OLDER)
+        db.session.commit()
+        return user.email, user_id
+
+
+def _stored_hash(app, user_id: int) -> str:
+    from app.extensions import db
+    from app.models import User
+
+    with app.app_context():
+        return db.session.get(User, user_id).password_hash
+
+
+def _login(client, email, password):
+    return client.post("/api/auth/login", json={"email": email, "password": password})
+
+
+def test_login_upgrades_an_outdated_hash_once(app, client, hasher, account):
+    email, user_id = account
+
+    r = _login(client, email, "correct horse")
+    assert r.status_code == 200
+    assert r.get_json()["access_token"]
+    upgraded = _stored_hash(app, user_id)
+    assert upgraded.startswith(CURRENT + "$")
+
+    # the upgraded hash checks out, and is current, so it stays as it is
+    assert _login(client, email, "correct horse").status_code == 200
+    assert _stored_hash(app, user_id) == upgraded
+
+
+def test_wrong_password_leaves_the_hash_alone(app, client, hasher, account):
+    email, user_id = account
+    before = _stored_hash(app, user_id)
+    assert _login(client, email, "wrong horse").status_code == 401
+    assert _stored_hash(app, user_id) == before
+
+
+def test_full_pool_answers_503(client, hasher, account, monkeypatch):
+    monkeypatch.setattr(hasher, "_slots", threading.BoundedSemaphore(1))
+    hasher._slots.acquire()  # another login holds the only slot
+
+    r = _login(client, account[0], "correct horse")
+    assert r.status_code == 503
+    assert r.headers["Retry-After"] == "1"
+
+
+def test_unknown_email_is_refused_without_hashing(client, hasher, monkeypatch):
+    def verify(*args):
+        raise AssertionError("no hash for an unknown email")
+
+    monkeypatch.setattr(hasher, "verify", verify)
+    assert _login(client, "nobody@example.test", "whatever").status_code == 401
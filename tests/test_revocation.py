@@ -0,0 +1,91 @@
+from sqlalchemy import func, update
+
+
+def _version_reads(queries) -> list[str]:
+    # user_version()'s point lookup, as opposed to the sync's bumps query
+    return [q for q in queries if "users.token_version" in q and "users.id =" in q]
+
+
+def _force_sync():
+    from app.extensions import revocation_checker
+
+    revocation_checker._synced_at = float("-inf")
+
+
+def test_token_version_is_cached_past_the_sync_interval(client, auth, make_user, queries, monkeypatch):
+    import time
+
+    student = make_user("student")
+    headers = auth(student)
+    assert client.get("/api/students/me/attendance", headers=headers).status_code == 200
+
+    # a minute idle: the sync runs, the version is not re-read
+    monotonic = time.monotonic
+    monkeypatch.setattr(time, "monotonic", lambda: monotonic() + 60)
+    queries.clear()
+    assert client.get("/api/students/me/attendance", headers=headers).status_code == 200
+    assert _version_reads(queries) == []
+
+
+def test_logout_all_on_another_worker_arrives_by_sync(app, client, auth, make_user):
+    from app.extensions import db
+    from app.models import User
+
+    student = make_user("student")
+    headers = auth(student)
+    assert client.get("/api/students/me/attendance", headers=headers).status_code == 200
+
+    # another worker's "log out everywhere": only the row changes
+    with app.app_context():
+        db.session.execute(
+            update(User).where(User.id == student)
+            .values(token_version=User.token_version + 1, token_version_bumped_at=func.now())
+        )
+        db.session.commit()
+
+    _force_sync()
+    assert client.get("/api/students/me/attendance", headers=headers).status_code == 401
+    assert client.get("/api/students/me/attendance", headers=auth(student)).status_code == 200
+
+
+def test_logout_all_applies_locally_at_once(client, auth, make_user):
+    student = make_user("student")
+    headers = auth(student)
+
+    assert client.post("/api/auth/logout-all", headers=headers).status_code == 200
+    assert client.get("/api/students/me/attendance", headers=headers).status_code == 401
+
+
+def test_requests_wait_for_the_first_load(app):
+    import threading
+    from datetime import datetime, timedelta, timezone
+
+    from app.extensions import db, revocation_checker
+    from app.models import TokenBlocklist
+
+    # revoked on another worker, before this one has loaded anything
+    with app.app_context():
+        db.session.add(TokenBlocklist(jti="elsewhere", token_type="access",
+                                      expires_at=datetime.now(timezone.utc) + timedelta(minutes=5)))
+        db.session.commit()
+
+    answers = []
+
+    def request():
+        with app.app_context():
+            answers.append(revocation_checker.is_revoked("elsewhere"))
+
+    with revocation_checker._sync_lock:  # another thread's first load is under way
+        waiting = threading.Thread(target=request)
+        waiting.start()
+        waiting.join(0.5)
+        assert waiting.is_alive()
+    waiting.join(10)
+    assert answers == [True]
+
+    # once loaded, a sync in progress no longer holds requests up
+    revocation_checker._synced_at = 0.0  # due again
+    with revocation_checker._sync_lock:
+        with app.app_context():
+            assert revocation_checker.is_revoked("elsewhere")
+            assert not revocation_checker.is_revoked("other")
@@ -0,0 +1,72 @@
+from sqlalchemy import text
+
+
+def _roster(app, course_id: int):
+    """The roster as a caller holding the Course row sees it."""
+    from app.extensions import db, roster_cache
+    from app.models import Course
+
+    with app.app_context():
+        roster = roster_cache.get(course_id, db.session.get(Course, course_id).roster_version)
+    return [s.full_name for s in roster.students]
+
+
+def _enroll_elsewhere(app, course_id: int, student_id: int) -> None:
+    """An enrollment committed by another worker: the row and the version bump, nothing local."""
+    from app.extensions import db
+
+    with app.app_context():
+        db.session.execute(text("INSERT INTO enrollments (course_id, student_id, enrolled_at) VALUES (:c, :s, now())"),
+                           {"c": course_id, "s": student_id})
+        db.session.execute(text("UPDATE courses SET roster_version = roster_version + 1 WHERE id = :c"),
+                           {"c": course_id})
+        db.session.commit()
+
+
+def test_version_bump_on_another_worker_reloads(app, make_user, make_course):
+    from app.extensions import roster_cache
+
+    course = make_course(make_user("teacher"), [make_user("student", name="Ann")])
+    assert _roster(app, course) == ["Ann"]
+
+    _enroll_elsewhere(app, course, make_user("student", name="Ben"))
+    assert [s.full_name for s in roster_cache.peek(course).students] == ["Ann"]  # local copy untouched
+    assert _roster(app, course) == ["Ann", "Ben"]
+
+
+def test_checkin_confirms_a_miss_against_the_current_version(client, auth, make_user, make_course, make_session):
+    early = make_user("student")
+    course = make_course(make_user("teacher"), [early])
+    make_session(course)
+    here = {"qr_token": "test-qr-1", "lat": 31.95, "lng": 35.91}
+    assert client.post("/api/attendance/checkin", headers=auth(early), json=here).status_code == 201
+
+    newcomer = make_user("student")
+    _enroll_elsewhere(client.application, course, newcomer)
+    assert client.post("/api/attendance/checkin", headers=auth(newcomer), json=here).status_code == 201
+
+
+def test_renaming_a_student_refreshes_their_rosters(app, client, auth, make_user, make_course):
+    student = make_user("student", name="Old Name")
+    courses = [make_course(make_user("teacher"), [student]) for _ in range(2)]
+    assert [_roster(app, c) for c in courses] == [["Old Name"]] * 2
+
+    r = client.put("/api/users/me", headers=auth(student), json={"full_name": "New Name"})
+    assert r.status_code == 200
+    assert [_roster(app, c) for c in courses] == [["New Name"]] * 2
+
+
+def test_deleting_an_account_takes_it_off_the_roster(app, client, auth, make_user, make_course):
+    from app.extensions import db
+    from app.models import User
+
+    leaving, staying = make_user("student", name="Leaving"), make_user("student", name="Staying")
+    course = make_course(make_user("teacher"), [leaving, staying])
+    assert _roster(app, course) == ["Leaving", "Staying"]
+
+    with app.app_context():
+        db.session.get(User, leaving).set_password("secret1")
+        db.session.commit()
+    r = client.delete("/api/users/me", headers=auth(leaving), json={"password": "secret1"})
+    assert r.status_code == 200
+    assert _roster(app, course) == ["Staying"]
@@ -0,0 +1,106 @@
+import pytest
+from sqlalchemy import text
+
+
+@pytest.fixture
+def admin(make_user, auth):
+    return auth(make_user("admin"))
+
+
+@pytest.fixture
+def attend(app, make_session):
+    """Run a session of ``course`` that ``students`` attend, then close it."""
+    from app.extensions import db
+    from app.models import AttendanceSession
+    from app.models.attendance_record import AttendanceStatus
+    from app.utils.attendance_stats import record_checkins
+    from app.utils.session_sweeper import close_sessions
+
+    def finished(course: int, *students: int) -> int:
+        session = make_session(course)
+        with app.app_context():
+            record_checkins([
+                {"session_id": session, "student_id": s, "status": AttendanceStatus.present} for s in students
+            ])
+            close_sessions(db.session.query(AttendanceSession.id, AttendanceSession.course_id).filter_by(id=session).all())
+            db.session.commit()
+        return session
+
+    return finished
+
+
+@pytest.fixture
+def semester(make_user, make_course, attend):
+    """CS: 100%, 50% (year 1) and 100% (year 2); Math: 100%; one student without a department: 0%."""
+    cs1 = [make_user("student", department="CS", year_level=1) for _ in range(2)]
+    cs2 = make_user("student", department="CS", year_level=2)
+    math = make_user("student", department="Math", year_level=1)
+    nobody = make_user("student")
+
+    algorithms = make_course(make_user("teacher"), [*cs1, cs2], planned_sessions=2)
+    attend(algorithms, cs1[0], cs1[1], cs2)
+    attend(algorithms, cs1[0], cs2)
+
+    calculus = make_course(make_user("teacher"), [math, nobody], planned_sessions=1)
+    attend(calculus, math)
+
+    make_course(make_user("teacher"), [math], semester="S27")  # another semester: not counted
+    return algorithms, calculus
+
+
+def _get(client, headers, report, **params):
+    return client.get(f"/api/reports/{report}", headers=headers, query_string={"semester": "F26", **params})
+
+
+def test_institution_report(client, admin, semester):
+    r = _get(client, admin, "institution")
+    assert r.status_code == 200
+    body = r.get_json()
+    assert {k: body[k] for k in ("courses", "students", "enrollments", "eligible", "not_eligible", "departments")} \
+        == {"courses": 2, "students": 5, "enrollments": 5, "eligible": 3, "not_eligible": 2, "departments": 3}
+    assert body["eligible_rate_pct"] == 60.0
+    assert body["avg_attendance_pct"] == 70.0
+
+
+def test_department_report_groups_by_department_and_year(client, admin, semester):
+    items = _get(client, admin, "departments").get_json()["items"]
+
+    assert [(i["department"], i["enrollments"], i["eligible"], i["avg_attendance_pct"]) for i in items] == [
+        ("CS", 3, 2, 83.33), ("Math", 1, 1, 100.0), ("unassigned", 1, 0, 0.0),
+    ]
+    cs = items[0]
+    assert [(y["year_level"], y["students"], y["eligible"]) for y in cs["year_levels"]] == [(1, 2, 1), (2, 1, 1)]
+    assert [y["year_level"] for y in items[2]["year_levels"]] == [None]
+
+
+def test_reports_are_admin_only_and_need_a_semester(client, auth, make_user, admin):
+    assert client.get("/api/reports/institution?semester=F26", headers=auth(make_user("teacher"))).status_code == 403
+    assert client.get("/api/reports/departments", headers=admin).status_code == 400
+
+
+def test_report_revalidates_until_the_semester_changes(client, admin, semester, attend):
+    algorithms, calculus = semester
+    etag = _get(client, admin, "institution").headers["ETag"]
+
+    r = client.get("/api/reports/institution?semester=F26", headers={**admin, "If-None-Match": etag})
+    assert r.status_code == 304
+
+    attend(calculus)  # a finished session nobody attended
+    r = client.get("/api/reports/institution?semester=F26", headers={**admin, "If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.get_json()["avg_attendance_pct"] == 60.0  # math drops to 50%
+
+
+def test_course_replaced_by_an_identical_looking_one(app, client, admin, make_user, make_course):
+    from app.extensions import db
+
+    old = make_course(make_user("teacher"), [make_user("student", department="CS")])
+    assert [i["department"] for i in _get(client, admin, "departments").get_json()["items"]] == ["CS"]
+
+    # same course count, versions and planned sessions as before
+    with app.app_context():
+        db.session.execute(text("DELETE FROM courses WHERE id = :id"), {"id": old})
+        db.session.commit()
+    make_course(make_user("teacher"), [make_user("student", department="Math")])
+
+    assert [i["department"] for i in _get(client, admin, "departments").get_json()["items"]] == ["Math"]
@@ -0,0 +1,42 @@
+def _scan(client, auth, student, qr_token):
+    return client.post("/api/attendance/checkin", headers=auth(student),
+                       json={"qr_token": qr_token, "lat": 31.95, "lng": 35.91})
+
+
+def _session_reads(queries) -> list[str]:
+    return [q for q in queries if "FROM attendance_sessions" in q]
+
+
+def test_open_session_is_read_once(client, auth, queries, make_user, make_course, make_session):
+    first, second = make_user("student"), make_user("student")
+    make_session(make_course(make_user("teacher"), [first, second]))
+
+    assert _scan(client, auth, first, "test-qr-1").status_code == 201
+    queries.clear()
+    assert _scan(client, auth, second, "test-qr-1").status_code == 201
+    assert _session_reads(queries) == []
+
+
+def test_closing_forgets_the_session(client, auth, make_user, make_course, make_session):
+    teacher, early, late = make_user("teacher"), make_user("student"), make_user("student")
+    session = make_session(make_course(teacher, [early, late]))
+    assert _scan(client, auth, early, "test-qr-1").status_code == 201  # now cached
+
+    assert client.patch(f"/api/sessions/{session}/close", headers=auth(teacher)).status_code == 200
+
+    r = _scan(client, auth, late, "test-qr-1")
+    assert r.status_code == 400
+    assert r.get_json()["error"] == "session is closed"
+
+
+def test_starting_a_session_forgets_the_one_it_replaces(client, auth, make_user, make_course, make_session):
+    teacher, early, student = make_user("teacher"), make_user("student"), make_user("student")
+    course = make_course(teacher, [early, student])
+    make_session(course)
+    assert _scan(client, auth, early, "test-qr-1").status_code == 201  # now cached
+
+    r = client.post("/api/create-sessions", headers=auth(teacher), json={"course_id": course, "lat": 31.95, "lng": 35.91})
+    assert r.status_code == 201
+
+    assert _scan(client, auth, student, "test-qr-1").get_json()["error"] == "session is closed"
+    assert _scan(client, auth, student, r.get_json()["qr_token"]).status_code == 201
@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import text
+
+
+@pytest.fixture
+def roster(app, make_user, make_course, make_session):
+    """Five students whose name order differs from their id order; two checked in."""
+    from app.extensions import db
+    from app.models import AttendanceRecord
+    from app.models.attendance_record import AttendanceStatus
+
+    teacher = make_user("teacher")
+    names = ["Eve", "Bob", "Dan", "Amy", "Cat"]
+    students = {name: make_user("student", name=name) for name in names}
+    course = make_course(teacher, students.values())
+    session = make_session(course)
+    with app.app_context():
+        db.session.add_all([
+            AttendanceRecord(session_id=session, student_id=students["Bob"], status=AttendanceStatus.present),
+            AttendanceRecord(session_id=session, student_id=students["Eve"], status=AttendanceStatus.late),
+        ])
+        db.session.commit()
+    return teacher, course, session, students
+
+
+def _page(client, headers, session, **params):
+    r = client.get(f"/api/sessions/{session}/attendance", headers=headers, query_string=params)
+    assert r.status_code == 200, r.get_json()
+    body = r.get_json()
+    return [(i["student"]["full_name"], i["status"]) for i in body["items"]], body
+
+
+def test_pages_follow_name_order(client, auth, roster):
+    teacher, course, session, students = roster
+    headers = auth(teacher)
+
+    seen, cursor = [], None
+    while True:
+        items, body = _page(client, headers, session, limit=2, **({"cursor": cursor} if cursor else {}))
+        seen += items
+        assert body["counts"] == {"present": 1, "late": 1, "absent": 3, "total": 5}
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+
+    assert seen == [("Amy", "absent"), ("Bob", "present"), ("Cat", "absent"), ("Dan", "absent"), ("Eve", "late")]
+
+
+def test_status_filter(client, auth, roster):
+    teacher, course, session, students = roster
+
+    items, body = _page(client, auth(teacher), session, status="absent", limit=2)
+    assert items == [("Amy", "absent"), ("Cat", "absent")]
+    items, _ = _page(client, auth(teacher), session, status="absent", cursor=body["next_cursor"])
+    assert items == [("Dan", "absent")]
+
+
+def test_cursor_survives_unenrolling_its_student(app, client, auth, roster):
+    from app.extensions import db
+
+    teacher, course, session, students = roster
+    headers = auth(teacher)
+    items, body = _page(client, headers, session, limit=2)
+    assert items[-1][0] == "Bob"
+
+    with app.app_context():
+        db.session.execute(text("DELETE FROM enrollments WHERE student_id = :s"), {"s": students["Bob"]})
+        db.session.commit()
+
+    items, body = _page(client, headers, session, limit=2, cursor=body["next_cursor"])
+    assert [name for name, _ in items] == ["Cat", "Dan"]
+    assert body["counts"]["total"] == 4
+
+
+def test_malformed_cursor(client, auth, roster):
+    teacher, course, session, students = roster
+    r = client.get(f"/api/sessions/{session}/attendance?cursor=WzFd", headers=auth(teacher))  # [1]
+    assert r.status_code == 400
@@ -0,0 +1,69 @@
+import pytest
+from sqlalchemy import update
+
+
+@pytest.fixture
+def scene(make_user, make_course, make_session):
+    teacher = make_user("teacher")
+    students = [make_user("student") for _ in range(2)]
+    course = make_course(teacher, students)
+    session = make_session(course)
+    return teacher, students, course, session
+
+
+def _payload(client, auth, teacher, session) -> str:
+    r = client.get(f"/api/sessions/{session}/qr", headers=auth(teacher))
+    assert r.status_code == 200
+    return r.get_json()["payload"]
+
+
+def _close_elsewhere(app, session):
+    """Close the session the way another worker would: the row changes, this process's caches don't hear of it."""
+    from app.extensions import db, session_cache
+    from app.models import AttendanceSession
+
+    with app.app_context():
+        db.session.execute(update(AttendanceSession).where(AttendanceSession.id == session).values(is_active=False))
+        db.session.commit()
+    session_cache.clear()  # as after SESSION_CACHE_TTL_SEC, or on a worker that never cached it
+
+
+def _checkin(client, auth, student, payload):
+    return client.post("/api/attendance/checkin", headers=auth(student),
+                       json={"qr_token": payload, "lat": 31.95, "lng": 35.91})
+
+
+def test_signed_scan_accepted_while_open(client, auth, scene):
+    teacher, students, course, session = scene
+    payload = _payload(client, auth, teacher, session)
+
+    assert _checkin(client, auth, students[0], payload).status_code == 201
+
+
+def test_signed_scan_refused_after_close_on_another_worker(app, client, auth, scene):
+    teacher, students, course, session = scene
+    payload = _payload(client, auth, teacher, session)
+
+    _close_elsewhere(app, session)
+
+    r = _checkin(client, auth, students[0], payload)
+    assert r.status_code == 400
+    assert r.get_json() == {"error": "session is closed"}
+
+
+def test_signed_batch_item_lands_after_close_on_another_worker(app, client, auth, scene):
+    from datetime import datetime, timezone
+
+    teacher, students, course, session = scene
+    payload = _payload(client, auth, teacher, session)
+
+    _close_elsewhere(app, session)
+
+    # offline sync: scanned while the session was open, so it still counts
+    r = client.post("/api/attendance/checkin/batch", headers=auth(teacher), json={
+        "qr_token": payload,
+        "items": [{"student_id": students[0], "lat": 31.95, "lng": 35.91,
+                   "captured_at": datetime.now(timezone.utc).isoformat()}],
+    })
+    assert r.status_code == 200
+    assert r.get_json()["results"][0]["result"] == "checked_in"
@@ -0,0 +1,76 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(app, monkeypatch):
+    # several chunks per response, so chunk boundaries are exercised
+    monkeypatch.setitem(app.config, "STREAM_CHUNK_ROWS", 2)
+
+
+def _streamed(client, path, headers, **params):
+    from app.extensions import db
+
+    r = client.get(path, headers=headers, query_string={**params, "stream": 1})
+    assert r.status_code == 200
+    assert r.is_streamed
+    body = r.get_json()
+    # rows read while the body was sent went back to the pool with it
+    with client.application.app_context():
+        assert db.engine.pool.checkedout() == 0
+    return body
+
+
+def _paged(client, path, headers, **params) -> tuple[list, dict]:
+    items, cursor = [], None
+    while True:
+        r = client.get(path, headers=headers, query_string={**params, "limit": 2, **({"cursor": cursor} if cursor else {})})
+        assert r.status_code == 200
+        body = r.get_json()
+        items += body["items"]
+        cursor = body.pop("next_cursor")
+        if not cursor:
+            return items, body
+
+
+def test_session_list_streams_every_page(client, auth, make_user, make_course, make_session):
+    teacher = make_user("teacher")
+    courses = [make_course(teacher), make_course(teacher)]
+    for n in range(5):
+        make_session(courses[n % 2], is_active=False)
+    make_session(make_course(make_user("teacher")))  # someone else's
+
+    streamed = _streamed(client, "/api/sessions", auth(teacher))
+    paged, _ = _paged(client, "/api/sessions", auth(teacher))
+    assert len(streamed["items"]) == 5
+    assert streamed == {"items": paged}
+
+    filtered = _streamed(client, "/api/sessions", auth(teacher), course_id=courses[0])
+    assert [s["course_id"] for s in filtered["items"]] == [courses[0]] * 3
+
+
+def test_roster_stream_matches_the_pages_and_ends_with_counts(app, client, auth, make_user, make_course, make_session):
+    from app.extensions import db
+    from app.models import AttendanceRecord
+    from app.models.attendance_record import AttendanceStatus
+
+    teacher = make_user("teacher")
+    students = [make_user("student") for _ in range(5)]
+    session = make_session(make_course(teacher, students))
+    with app.app_context():
+        db.session.add(AttendanceRecord(session_id=session, student_id=students[2], status=AttendanceStatus.late))
+        db.session.commit()
+
+    path = f"/api/sessions/{session}/attendance"
+    streamed = _streamed(client, path, auth(teacher))
+    paged, rest = _paged(client, path, auth(teacher))
+    assert streamed == {"session": rest["session"], "items": paged, "counts": rest["counts"]}
+    assert streamed["counts"] == {"present": 0, "late": 1, "absent": 4, "total": 5}
+
+    # a filter narrows the items, not the counts
+    late = _streamed(client, path, auth(teacher), status="late")
+    assert [i["student"]["id"] for i in late["items"]] == [students[2]]
+    assert late["counts"] == streamed["counts"]
+
+
+def test_empty_collection_is_valid_json(client, auth, make_user):
+    assert _streamed(client, "/api/sessions", auth(make_user("admin"))) == {"items": []}
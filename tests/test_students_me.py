@@ -0,0 +1,71 @@
+"""/students/me/attendance: a fixed number of statements however many courses.
+
+It used to run several queries per enrolled course (sessions, records,
+counts); the history now comes from one joined query plus one lookup of the
+at-risk projection.
+"""
+from datetime import datetime, timezone
+
+import pytest
+
+STATEMENTS = 2  # history join + at-risk projection
+
+
+def _app_statements(queries) -> list[str]:
+    # the JWT revocation sync reads token_blocklist/users on its own schedule; not the endpoint's SQL
+    return [q for q in queries if "token_blocklist" not in q and "token_version_bumped_at" not in q]
+
+
+@pytest.fixture
+def mark(app):
+    from app.extensions import db
+    from app.models import AttendanceRecord
+    from app.models.attendance_record import AttendanceStatus
+
+    def add(session_id: int, student_id: int, status: str):
+        with app.app_context():
+            db.session.add(AttendanceRecord(
+                session_id=session_id, student_id=student_id, status=AttendanceStatus(status),
+                checked_in_at=datetime.now(timezone.utc) if status != "absent" else None,
+            ))
+            db.session.commit()
+
+    return add
+
+
+@pytest.mark.parametrize("n_courses", [1, 5])
+def test_statement_count_independent_of_courses(client, auth, queries, make_user, make_course, make_session,
+                                                mark, n_courses):
+    teacher = make_user("teacher")
+    student = make_user("student")
+    for _ in range(n_courses):
+        course = make_course(teacher, [student], planned_sessions=4)
+        for status in ("present", "late", "absent"):
+            mark(make_session(course, is_active=False, started_min_ago=60), student, status)
+        make_session(course)  # still open: not part of the history
+
+    headers = auth(student)
+    client.get("/api/students/me/attendance", headers=headers)  # loads the token_version
+    queries.clear()
+
+    resp = client.get("/api/students/me/attendance", headers=headers)
+    assert resp.status_code == 200
+    assert len(_app_statements(queries)) == STATEMENTS
+
+    body = resp.get_json()
+    assert len(body["courses"]) == n_courses
+    for course in body["courses"]:
+        assert course["finished_sessions"] == 3
+        assert course["attended"] == 2
+        assert [r["status"] for r in course["records"]] == ["present", "late", "absent"]
+    assert body["overall"]["progress"] == f"{3 * n_courses}/{4 * n_courses}"
+
+
+def test_course_without_finished_sessions(client, auth, make_user, make_course):
+    teacher = make_user("teacher")
+    student = make_user("student")
+    make_course(teacher, [student], planned_sessions=4)
+
+    body = client.get("/api/students/me/attendance", headers=auth(student)).get_json()
+    [course] = body["courses"]
+    assert course["records"] == [] and course["progress"] == "0/4"